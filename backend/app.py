@@ -1,5 +1,13 @@
+import contextvars
+import functools
+import hmac
+import json
 import logging
-from flask import Flask, request, jsonify
+import re
+import threading
+import time
+import uuid
+from flask import Flask, Response, abort, g, request, jsonify, send_file, send_from_directory
 from flask_cors import CORS
 from pathlib import Path
 from config import Config
@@ -7,7 +15,20 @@ from services.openai_service import OpenAIService
 from services.google_service import GoogleService
 from services.presentation_service import PresentationService
 from services.diagram_service import DiagramService
+from services.diagram_jobs import DiagramJobManager
+from services.bulk_service import BulkPresentationService
+from services.deck_store import DeckStore
+from services.pptx_service import PptxService
+from services.preview_service import PreviewService
+from utils.admission import AdmissionController, AdmissionRejected
+from utils.content_validator import ContentValidator
+from utils.deadline import Deadline, DeadlineExceeded
+from utils.metrics import COALESCED_REQUESTS, REGISTRY, REQUEST_DURATION, REQUESTS_IN_FLIGHT
+from utils.profiling import ProfilingController
+from utils.progress import ProgressStream
+from utils.single_flight import SingleFlight, normalize_key
 from utils.text_processor import TextProcessor
+from utils.tracing import detach_trace, end_trace, start_trace
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,46 +41,548 @@ CORS(app)
 # Initialize services
 openai_service = OpenAIService()
 TextProcessor.initialize()
+profiler = ProfilingController(Config.PROFILE_DIR)
+presentation_flights = SingleFlight()
+admission = AdmissionController(Config.ADMISSION_LANES, Config.ADMISSION_SLOTS)
+DiagramJobManager.admission = admission
+# create_presentation options that bulk items may not set
+BULK_UNSUPPORTED_OPTIONS = ('timeout_ms', 'async_diagrams', 'drive_copy')
+
+def is_admin():
+    token = request.headers.get('X-Admin-Token')
+    return bool(Config.ADMIN_TOKEN and token and hmac.compare_digest(token, Config.ADMIN_TOKEN))
+
+def admin_required(func):
+    """Restrict an endpoint to callers presenting Config.ADMIN_TOKEN"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not is_admin():
+            return jsonify({'error': 'Admin token required'}), 403
+        return func(*args, **kwargs)
+    return wrapper
+
+@app.before_request
+def start_request_instrumentation():
+    g.request_started = time.perf_counter()
+    g.metrics_endpoint = request.endpoint or 'unknown'
+    REQUESTS_IN_FLIGHT.inc(endpoint=g.metrics_endpoint)
+    
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    g.trace_root, g.trace_token = start_trace(
+        f"{request.method} {request.path}",
+        g.request_id,
+        attributes={'http.method': request.method, 'http.route': g.metrics_endpoint}
+    )
+    
+    # Admin and metrics endpoints are never profiled; the header form requires the admin token
+    g.profile_session = None
+    if not g.metrics_endpoint.startswith('admin_') and g.metrics_endpoint != 'metrics':
+        header_mode = request.headers.get('X-Profile') if is_admin() else None
+        try:
+            g.profile_session = profiler.start(f"{int(time.time())}_{g.metrics_endpoint}_{g.request_id}", header_mode)
+        except ValueError as e:
+            logger.warning(f"Profiling not started: {str(e)}")
+
+@app.after_request
+def record_response_status(response):
+    g.response_status = response.status_code
+    response.headers['X-Request-ID'] = g.get('request_id', '')
+    if response.is_streamed and 'request_started' in g:
+        # The body (SSE, NDJSON, files) is produced after the request context is gone;
+        # count the request, end its span and profile once the body has been sent
+        g.instrumentation_deferred = True
+        instrumentation = request_instrumentation()
+        response.call_on_close(lambda: finish_instrumentation(instrumentation, response.status_code))
+    return response
+
+@app.teardown_request
+def finish_request_instrumentation(exc):
+    if 'request_started' not in g:
+        return
+    if g.get('instrumentation_deferred'):
+        # The root span stays open for the stream but is no longer current in this thread
+        detach_trace(g.trace_token)
+        return
+    finish_instrumentation(request_instrumentation(), g.get('response_status', 500), exc)
+
+def request_instrumentation():
+    """The current request's metrics, trace and profile state, for finishing it later"""
+    return {
+        'started': g.request_started,
+        'endpoint': g.metrics_endpoint,
+        'trace_root': g.trace_root,
+        'trace_token': None if g.get('instrumentation_deferred') else g.trace_token,
+        'profile_session': g.get('profile_session')
+    }
+
+def finish_instrumentation(instrumentation, status, exc=None):
+    REQUESTS_IN_FLIGHT.dec(endpoint=instrumentation['endpoint'])
+    REQUEST_DURATION.observe(
+        time.perf_counter() - instrumentation['started'],
+        endpoint=instrumentation['endpoint'],
+        status=str(status)
+    )
+    
+    trace_root = instrumentation['trace_root']
+    if trace_root is not None:
+        trace_root.set_attribute('http.status_code', status)
+        end_trace(trace_root, instrumentation['trace_token'], error=exc or (f"HTTP {status}" if status >= 500 else None))
+    
+    if instrumentation['profile_session'] is not None:
+        try:
+            profiler.finish(instrumentation['profile_session'])
+        except Exception as e:
+            logger.error(f"Failed to write profile: {str(e)}")
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics endpoint"""
+    return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({'status': 'healthy'}), 200
 
+@app.route('/admin/profiling', methods=['GET', 'POST'])
+@admin_required
+def admin_profiling():
+    """Arm the profiler for the next N requests, or report its state"""
+    if request.method == 'POST':
+        data = request.get_json() or {}
+        try:
+            profiler.arm(
+                data.get('requests', 1),
+                mode=data.get('mode', 'cprofile'),
+                memory=data.get('memory', True)
+            )
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+    return jsonify(profiler.status()), 200
+
+@app.route('/admin/admission', methods=['GET'])
+@admin_required
+def admin_admission():
+    """Queued and running requests and the current wait estimate per admission lane"""
+    return jsonify(admission.status()), 200
+
+@app.route('/admin/profiles', methods=['GET'])
+@admin_required
+def admin_profiles():
+    """List captured profiles"""
+    return jsonify({'profiles': profiler.list_profiles()}), 200
+
+@app.route('/admin/profiles/<path:name>', methods=['GET'])
+@admin_required
+def admin_profile_download(name):
+    """Download one profile artifact"""
+    if not Path(Config.PROFILE_DIR).is_dir():
+        abort(404)
+    return send_from_directory(Path(Config.PROFILE_DIR).resolve(), name, as_attachment=True)
+
+def parse_presentation_request(data):
+    """Validate a create_presentation payload; returns (options, error message)"""
+    if not data:
+        return None, 'No data provided'
+    
+    options = {
+        'topic': data.get('topic'),
+        'description': data.get('description', ''),
+        'theme': data.get('theme') or 'modern',
+        'diagram_options': {
+            'profile': data.get('diagram_profile'),
+            'adapter': data.get('diagram_adapter')
+        },
+        'slide_count': data.get('slide_count'),
+        # Client-side timeout; the pipeline degrades rather than overrun it
+        'timeout_ms': data.get('timeout_ms'),
+        'received_at': time.monotonic(),
+        'async_diagrams': bool(data.get('async_diagrams', False)),
+        # Coalesced requesters can ask for their own Drive copy of the shared deck
+        'drive_copy': bool(data.get('drive_copy', False))
+    }
+    diagram_options = options['diagram_options']
+    
+    if not options['topic']:
+        return None, 'Topic is required'
+    
+    if options['theme'] not in Config.PRESENTATION_THEMES:
+        return None, f"Unknown theme '{options['theme']}'"
+    
+    slide_count = options['slide_count']
+    if slide_count is not None and not (isinstance(slide_count, int) and 1 <= slide_count <= Config.MAX_SLIDE_COUNT):
+        return None, f"slide_count must be an integer between 1 and {Config.MAX_SLIDE_COUNT}"
+    
+    timeout_ms = options['timeout_ms']
+    if timeout_ms is not None and not (isinstance(timeout_ms, (int, float)) and timeout_ms > 0):
+        return None, 'timeout_ms must be a positive number'
+    
+    if diagram_options['profile'] and diagram_options['profile'] not in Config.DIAGRAM_PROFILES:
+        return None, f"Unknown diagram profile '{diagram_options['profile']}'"
+    
+    if diagram_options['adapter'] and diagram_options['adapter'] not in DiagramService.list_adapters():
+        return None, f"Unknown diagram adapter '{diagram_options['adapter']}'"
+    
+    return options, None
+
+def build_presentation(options, progress=None):
+    """Generate content and build the deck; returns the API result dict
+    
+    With timeout_ms, stages run against a Deadline and the result's degraded
+    list says what was cut to meet it; DeadlineExceeded means the content
+    itself could not be produced in time.
+    """
+    progress = progress or (lambda event, **data: None)
+    deadline = Deadline(
+        None if options['timeout_ms'] is None
+        else options['timeout_ms'] / 1000 - Config.DEADLINE_RESPONSE_MARGIN,
+        started=options['received_at']
+    )
+    
+    # Generate presentation content
+    presentation_content = openai_service.create_presentation_content(
+        options['topic'], options['description'], options['slide_count'], deadline=deadline
+    )
+    progress('content_generated', title=presentation_content['title'], slides=len(presentation_content['slides']))
+    progress('previews', previews=PreviewService.render_deck(presentation_content, options['theme']))
+    
+    # Get Google credentials and create presentation
+    credentials = GoogleService.get_credentials()
+    presentation_service = PresentationService(credentials)
+    
+    presentation_id = presentation_service.create_presentation(
+        presentation_content,
+        theme_name=options['theme'],
+        diagram_options=options['diagram_options'],
+        async_diagrams=options['async_diagrams'],
+        progress=progress,
+        deadline=deadline
+    )
+    presentation_url = f"https://docs.google.com/presentation/d/{presentation_id}/edit"
+    
+    result = {
+        'success': True,
+        'presentation_url': presentation_url,
+        'presentation_id': presentation_id
+    }
+    if options['async_diagrams']:
+        result['diagram_status'] = DiagramJobManager.get_status(presentation_id)
+    if deadline.bounded:
+        result['degraded'] = deadline.degraded
+    
+    return result
+
+def presentation_lane(options):
+    """Admission lane of a deck request: diagrams generated within the request make it a diagram deck"""
+    return 'text_deck' if options['async_diagrams'] else 'diagram_deck'
+
+def content_lane(content):
+    """Admission lane for building generated content: a slide with a diagram makes it a diagram deck"""
+    return 'diagram_deck' if any(slide.get('diagram_prompt') for slide in content['slides']) else 'text_deck'
+
+def too_busy(error):
+    """429 response for a request the admission controller turned away"""
+    response = jsonify({'error': str(error), 'lane': error.lane})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
+
+def presentation_flight_key(options):
+    """Requests with equal keys produce interchangeable decks and may share one generation
+
+    timeout_ms is part of the key: a deck degraded to meet one client's
+    deadline is not handed to a client that allowed more time, and a
+    follower with the same timeout arrived later, so the leader's deck is
+    ready within its deadline too.
+    """
+    return normalize_key(
+        options['topic'],
+        options['description'],
+        options['theme'],
+        options['slide_count'],
+        options['diagram_options'],
+        options['async_diagrams'],
+        options['timeout_ms']
+    )
+
 @app.route('/create_presentation', methods=['POST'])
 def create_presentation():
-    """API endpoint to create presentation"""
+    """API endpoint to create presentation
+
+    Identical requests (see presentation_flight_key) arriving while one is
+    being generated wait for it and share its deck, or get a Drive copy of it
+    with drive_copy. Only the generating request takes an admission slot.
+    """
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
+        options, error = parse_presentation_request(request.get_json())
+        if error:
+            return jsonify({'error': error}), 400
         
-        topic = data.get('topic')
-        description = data.get('description', '')
+        def build():
+            with admission.admit(presentation_lane(options)):
+                return build_presentation(options)
         
-        if not topic:
-            return jsonify({'error': 'Topic is required'}), 400
+        result, shared = presentation_flights.do(presentation_flight_key(options), build)
+        COALESCED_REQUESTS.inc(role='follower' if shared else 'leader')
+        result = {**result, 'coalesced': shared}
         
-        # Generate presentation content
-        presentation_content = openai_service.create_presentation_content(topic, description)
+        if shared and options['drive_copy']:
+            presentation_service = PresentationService(GoogleService.get_credentials())
+            presentation_id = presentation_service.copy_presentation(result['presentation_id'])
+            result.update({
+                'presentation_id': presentation_id,
+                'presentation_url': f"https://docs.google.com/presentation/d/{presentation_id}/edit",
+                'copied_from': result['presentation_id']
+            })
         
-        # Get Google credentials and create presentation
-        credentials = GoogleService.get_credentials()
-        presentation_service = PresentationService(credentials)
+        return jsonify(result)
+    
+    except AdmissionRejected as e:
+        return too_busy(e)
+    except DeadlineExceeded as e:
+        logger.warning(f"Presentation creation gave up: {str(e)}")
+        return jsonify({'error': str(e)}), 504
+    except Exception as e:
+        logger.error(f"Presentation creation error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/create_presentation/stream', methods=['POST'])
+def create_presentation_stream():
+    """Create a presentation, streaming stage progress as server-sent events
+
+    Events: started, content_generated, previews (SVG slide thumbnails),
+    presentation_created, slide_created,
+    diagram_done / diagram_failed / diagram_skipped (deadline), diagrams_queued, then complete (the same
+    body /create_presentation returns) or error.
+    """
+    options, error = parse_presentation_request(request.get_json())
+    if error:
+        return jsonify({'error': error}), 400
+    
+    # Admission is decided before the stream starts so a rejection can still be a 429
+    try:
+        ticket = admission.acquire(presentation_lane(options))
+    except AdmissionRejected as e:
+        return too_busy(e)
+    
+    stream = ProgressStream()
+    profile_session = g.get('profile_session')
+    
+    def run():
+        started = time.perf_counter()
+        try:
+            # Profiled with the request: its own thread only waits on the stream
+            with profiler.profile_thread(profile_session):
+                stream.emit('complete', **build_presentation(options, progress=stream.emit))
+        except Exception as e:
+            logger.error(f"Presentation creation error: {str(e)}")
+            stream.emit('error', error=str(e))
+        finally:
+            admission.release(ticket, time.perf_counter() - started)
+            stream.close()
+    
+    # The pipeline runs in its own thread, in a copy of the request context so its spans join the trace
+    stream.emit('started', request_id=g.request_id)
+    context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(run,), name='presentation-stream', daemon=True).start()
+    
+    return Response(
+        stream.events(),
+        content_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/create_presentations/bulk', methods=['POST'])
+def create_presentations_bulk():
+    """Create many presentations through a shared pipeline, streaming one NDJSON result per deck
+
+    Body: {"items": [{"topic", "description", "theme", "slide_count"}, ...], "diagram_profile", "diagram_adapter"}.
+    Lines arrive as each deck's text is built, in completion order; each carries the item's index.
+    Diagrams are swapped in afterwards, with progress at /presentations/<id>/diagrams.
+    """
+    data = request.get_json()
+    if not data or not isinstance(data.get('items'), list) or not data['items']:
+        return jsonify({'error': 'A non-empty list of items is required'}), 400
+    
+    if len(data['items']) > Config.BULK_MAX_ITEMS:
+        return jsonify({'error': f"At most {Config.BULK_MAX_ITEMS} items per request"}), 400
+    
+    items = []
+    for index, item in enumerate(data['items']):
+        if not isinstance(item, dict):
+            return jsonify({'error': f"Item {index} must be an object"}), 400
+        # Bulk decks always get async diagrams and have no deadline or per-requester copies
+        unsupported = [key for key in BULK_UNSUPPORTED_OPTIONS if key in item]
+        if unsupported:
+            return jsonify({'error': f"Item {index}: {', '.join(unsupported)} not supported in bulk requests"}), 400
+        options, error = parse_presentation_request({
+            **item,
+            'diagram_profile': data.get('diagram_profile'),
+            'diagram_adapter': data.get('diagram_adapter')
+        })
+        if error:
+            return jsonify({'error': f"Item {index}: {error}"}), 400
+        items.append(options)
+    
+    try:
+        bulk_service = BulkPresentationService(
+            openai_service,
+            GoogleService.get_credentials(),
+            diagram_options=items[0]['diagram_options'],
+            admission=admission
+        )
+    except Exception as e:
+        logger.error(f"Bulk presentation error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    
+    return Response(
+        (json.dumps(result) + '\n' for result in bulk_service.run(items)),
+        content_type='application/x-ndjson'
+    )
+
+@app.route('/create_presentation/pptx', methods=['POST'])
+def create_presentation_pptx():
+    """Create a presentation as a downloadable .pptx file, without Google Slides"""
+    try:
+        options, error = parse_presentation_request(request.get_json())
+        if error:
+            return jsonify({'error': error}), 400
         
-        presentation_id = presentation_service.create_presentation(presentation_content)
-        presentation_url = f"https://docs.google.com/presentation/d/{presentation_id}/edit"
+        def build():
+            return PptxService().create_presentation(
+                presentation_content,
+                theme_name=options['theme'],
+                diagram_options=options['diagram_options']
+            )
         
-        return jsonify({
-            'success': True,
-            'presentation_url': presentation_url,
-            'presentation_id': presentation_id
-        })
+        # Whether diagrams are needed is only known once the content exists: text-only decks
+        # are built in the generation's text_deck slot, others move to the diagram_deck lane
+        with admission.admit('text_deck'):
+            presentation_content = openai_service.create_presentation_content(
+                options['topic'], options['description'], options['slide_count']
+            )
+            lane = content_lane(presentation_content)
+            if lane == 'text_deck':
+                pptx_file = build()
+        if lane == 'diagram_deck':
+            with admission.admit(lane):
+                pptx_file = build()
+        
+        filename = re.sub(r'[^A-Za-z0-9]+', '_', presentation_content['title']).strip('_') or 'presentation'
+        return send_file(
+            pptx_file,
+            mimetype='application/vnd.openxmlformats-officedocument.presentationml.presentation',
+            as_attachment=True,
+            download_name=f"{filename[:80]}.pptx"
+        )
     
+    except AdmissionRejected as e:
+        return too_busy(e)
     except Exception as e:
-        logger.error(f"Presentation creation error: {str(e)}")
+        logger.error(f"PPTX creation error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/themes/previews', methods=['GET'])
+def theme_previews():
+    """SVG sample of every theme, for the frontend's theme picker"""
+    return jsonify({
+        'previews': {theme_id: PreviewService.render_theme(theme_id) for theme_id in Config.PRESENTATION_THEMES}
+    }), 200
+
+@app.route('/preview_presentation', methods=['POST'])
+def preview_presentation():
+    """Render generated content as SVG slide thumbnails"""
+    data = request.get_json()
+    if not data or not isinstance(data.get('content'), dict) or not isinstance(data['content'].get('slides'), list):
+        return jsonify({'error': 'Presentation content is required'}), 400
+    
+    theme = data.get('theme') or 'modern'
+    if theme not in Config.PRESENTATION_THEMES:
+        return jsonify({'error': f"Unknown theme '{theme}'"}), 400
+    
+    try:
+        return jsonify({'previews': PreviewService.render_deck(data['content'], theme)}), 200
+    except (KeyError, TypeError, AttributeError) as e:
+        return jsonify({'error': f"Malformed presentation content: {str(e)}"}), 400
+
+@app.route('/presentations/<presentation_id>/slides', methods=['POST'])
+def update_slides(presentation_id):
+    """Edit or regenerate specific slides of an existing deck in place
+
+    Body: {"edits": [{"index", "content"}], "regenerate": [indices], "instructions"}.
+    Edits supply new slide content directly; regenerated slides are rewritten
+    by the LLM. Only changed text spans and changed diagrams are sent to Slides.
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        edits = data.get('edits', [])
+        regenerate = data.get('regenerate', [])
+        if not isinstance(edits, list) or not isinstance(regenerate, list):
+            return jsonify({'error': 'edits and regenerate must be lists'}), 400
+        
+        # Concurrent edits of one deck would each save over the other's stored content
+        with DeckStore.editing(presentation_id):
+            try:
+                record = DeckStore.load(presentation_id)
+            except ValueError:
+                record = None
+            if record is None:
+                return jsonify({'error': 'No stored content for this presentation'}), 404
+            
+            slide_count = len(record['content']['slides'])
+            indices = [edit.get('index') for edit in edits if isinstance(edit, dict)] + regenerate
+            if not indices:
+                return jsonify({'error': 'Nothing to edit or regenerate'}), 400
+            if not all(isinstance(index, int) and 0 <= index < slide_count for index in indices):
+                return jsonify({'error': f"Slide indices must be between 0 and {slide_count - 1}"}), 400
+            if len(indices) != len(edits) + len(regenerate) or len(set(indices)) != len(indices):
+                return jsonify({'error': 'Each slide index may appear once'}), 400
+            
+            new_slides = {edit['index']: edit.get('content') for edit in edits}
+            errors = [
+                error
+                for index, content in new_slides.items()
+                for error in ContentValidator.slide_errors(content, f"slide {index}")
+            ]
+            if errors:
+                return jsonify({'error': 'Invalid slide content', 'errors': errors}), 400
+            # Edited slides get the same length limits and fitting as generated ones
+            for content in new_slides.values():
+                ContentValidator.validate_slide_content(content)
+            TextProcessor.fit_deck({'slides': list(new_slides.values())})
+            
+            with admission.admit('text_deck'):
+                if regenerate:
+                    new_slides.update(
+                        openai_service.regenerate_slides(record['content'], regenerate, data.get('instructions', ''))
+                    )
+                
+                presentation_service = PresentationService(GoogleService.get_credentials())
+                summary = presentation_service.update_slides(presentation_id, new_slides)
+        
+        return jsonify({'success': True, 'presentation_id': presentation_id, **summary}), 200
+    
+    except AdmissionRejected as e:
+        return too_busy(e)
+    except Exception as e:
+        logger.error(f"Slide update error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/diagram_adapters', methods=['GET'])
+def diagram_adapters():
+    """List LoRA style adapters available for diagram generation"""
+    return jsonify({'adapters': DiagramService.list_adapters()}), 200
+
+@app.route('/presentations/<presentation_id>/diagrams', methods=['GET'])
+def diagram_status(presentation_id):
+    """Per-slide status of diagrams being generated in the background"""
+    status = DiagramJobManager.get_status(presentation_id)
+    if status is None:
+        return jsonify({'error': 'No background diagrams for this presentation'}), 404
+    return jsonify(status), 200
+
 def verify_environment():
     """Verify environment setup"""
     if not Config.OPENAI_API_KEY:
@@ -94,20 +617,38 @@ def generate_diagram():
         if not all([prompt, presentation_id, slide_id]):
             return jsonify({'error': 'Missing required parameters'}), 400
         
-        # Generate diagram
-        diagram_service = DiagramService()
-        image_path = diagram_service.generate_diagram(prompt)
+        resolution = data.get('resolution')
+        if resolution is not None and not DiagramService.valid_resolution(resolution):
+            return jsonify({
+                'error': f"resolution must be 'native' or one of: {', '.join(Config.DIAGRAM_RESOLUTIONS)}"
+            }), 400
         
-        # Insert into presentation
-        credentials = GoogleService.get_credentials()
-        presentation_service = PresentationService(credentials)
-        presentation_service.insert_diagram(presentation_id, slide_id, image_path)
+        with admission.admit('diagram'):
+            # Generate diagram
+            diagram_service = DiagramService.get_instance()
+            image_path, generation_stats = diagram_service.generate_diagram_with_stats(
+                prompt,
+                num_inference_steps=data.get('numInferenceSteps'),
+                profile=data.get('profile'),
+                scheduler=data.get('scheduler'),
+                resolution=resolution,
+                adapter=data.get('adapter')
+            )
+            
+            # Insert into presentation
+            credentials = GoogleService.get_credentials()
+            presentation_service = PresentationService(credentials)
+            presentation_service.insert_diagram(presentation_id, slide_id, image_path)
         
         return jsonify({
             'success': True,
-            'message': 'Diagram generated and inserted successfully'
+            'message': 'Diagram generated and inserted successfully',
+            'generation_stats': generation_stats,
+            'load_stats': diagram_service.load_stats
         })
         
+    except AdmissionRejected as e:
+        return too_busy(e)
     except Exception as e:
         logger.error(f"Diagram generation error: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -6,6 +6,22 @@ load_dotenv()
 
 class Config:
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+    OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4')
+    # Model name prefixes accepting response_format={"type": "json_object"}
+    OPENAI_JSON_MODE_MODELS = ('gpt-4o', 'gpt-4-turbo', 'gpt-4-1106', 'gpt-4-0125', 'gpt-3.5-turbo-1106', 'gpt-3.5-turbo-0125')
+    OPENAI_MAX_TOKENS = 4000
+    # Smallest completion budget for a whole deck (the fixed budget before sizing by slide count)
+    OPENAI_DECK_MIN_TOKENS = 3000
+    DEFAULT_SLIDE_COUNT = 8
+    MAX_SLIDE_COUNT = 15
+    # Per-request timeout (s) and retries with exponential backoff for transient LLM errors
+    OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '120'))
+    OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '2'))
+    OPENAI_RETRY_BACKOFF = 1.0
+    # Send a second identical request once the first exceeds this latency quantile (e.g. 0.95); 0 disables hedging
+    OPENAI_HEDGE_QUANTILE = float(os.getenv('OPENAI_HEDGE_QUANTILE', '0'))
+    OPENAI_HEDGE_MIN_SAMPLES = 20
+    OPENAI_MAX_IN_FLIGHT = 32
     CLIENT_SECRETS_FILE = "client_secrets.json"
     GOOGLE_SCOPES = [
         'https://www.googleapis.com/auth/presentations',
@@ -13,10 +29,94 @@ class Config:
     ]
     MAX_POINTS_PER_SLIDE = 10
     MAX_POINT_LENGTH = 200
+    # Slide body placeholder (PT) and font size, used to fit text to a slide
+    SLIDE_BODY_SIZE = (660, 270)
+    SLIDE_BODY_SIZE_WITH_DIAGRAM = (320, 270)
+    SLIDE_BODY_FONT_SIZE = 14
     FLASK_HOST = '127.0.0.1'
     FLASK_PORT = 5000
     DEBUG = False
 
+    # Google Slides writes (create/batchUpdate) per second across the process, with a burst allowance; 0 disables
+    SLIDES_WRITE_QPS = float(os.getenv('SLIDES_WRITE_QPS', '1.0'))
+    SLIDES_WRITE_BURST = 30
+
+    # Request deadlines (timeout_ms): stage durations assumed until some are observed (s)
+    DEADLINE_STAGE_DEFAULTS = {
+        'llm.completion': 30.0,
+        'slides.create': 1.0,
+        'slides.batch_update': 1.0,
+        'drive.upload': 2.0,
+        'diffusion.inference': 15.0,
+    }
+    # Diagram profile to fall back to under a tight deadline, and its cost relative to the usual diagram
+    DEADLINE_FAST_PROFILE = 'fast'
+    DEADLINE_FAST_PROFILE_FACTOR = 0.5
+    # Kept back from timeout_ms for sending the response
+    DEADLINE_RESPONSE_MARGIN = 0.5
+
+    # Admission control: slots shared by all lanes; per lane the priority weight, its slot cap, queue bound,
+    # longest acceptable estimated queue wait (s) and service time assumed until some are observed (s)
+    ADMISSION_SLOTS = int(os.getenv('ADMISSION_SLOTS', '8'))
+    ADMISSION_LANES = {
+        'diagram': {'weight': 4, 'concurrency': 2, 'max_queue': 20, 'max_wait': 30, 'service_estimate': 10},
+        'text_deck': {'weight': 2, 'concurrency': 6, 'max_queue': 50, 'max_wait': 60, 'service_estimate': 30},
+        'diagram_deck': {'weight': 1, 'concurrency': 2, 'max_queue': 10, 'max_wait': 120, 'service_estimate': 90},
+        # One slot per bulk work unit (LLM call, deck build, diagram batch); queues are bounded by the bulk pools
+        'bulk': {'weight': 0.5, 'concurrency': 3, 'max_queue': 50, 'max_wait': 300, 'service_estimate': 30},
+    }
+
+    # Reuse of content generated for a near-duplicate topic and description (cosine similarity, e.g. 0.75); 0 disables
+    CONTENT_REUSE_THRESHOLD = float(os.getenv('CONTENT_REUSE_THRESHOLD', '0'))
+    CONTENT_INDEX_FILE = os.getenv('CONTENT_INDEX_FILE', './content_index/index.json')
+    CONTENT_INDEX_SIZE = 1000
+    CONTENT_INDEX_DIMENSIONS = 2 ** 12
+
+    # Bulk deck generation
+    BULK_MAX_ITEMS = 200
+    BULK_LLM_CONCURRENCY = int(os.getenv('BULK_LLM_CONCURRENCY', '4'))
+    BULK_BUILD_CONCURRENCY = 2
+
+    # Content JSON and objectId maps of created decks, for incremental slide edits
+    DECK_STORE_DIR = os.getenv('DECK_STORE_DIR', './decks')
+
+    # Request tracing
+    TRACE_FILE = os.getenv('TRACE_FILE', './traces/traces.jsonl')
+    TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '1.0'))
+    TRACE_MAX_BYTES = 10 * 1024 * 1024
+    TRACE_BACKUP_COUNT = 5
+
+    # Admin endpoints (on-demand profiling); disabled unless a token is set
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+    PROFILE_DIR = os.getenv('PROFILE_DIR', './profiles')
+
+    # Diagram generation
+    DIAGRAM_MODEL_PATH = os.getenv('MODEL_PATH', './models/sd-ai2d-model')
+    DIAGRAM_DEFAULT_PROFILE = os.getenv('DIAGRAM_PROFILE', 'default')
+    DIAGRAM_PROFILES = {
+        # Matches the historical behaviour: pipeline scheduler, 5 steps, native resolution
+        'default': {'scheduler': 'default', 'num_inference_steps': 5, 'guidance_scale': 7.5},
+        'fast': {'scheduler': 'dpm++', 'num_inference_steps': 8, 'guidance_scale': 7.0, 'resolution': 'low'},
+        'balanced': {'scheduler': 'dpm++', 'num_inference_steps': 15, 'guidance_scale': 7.5, 'resolution': 'medium'},
+        'quality': {'scheduler': 'dpm++_karras', 'num_inference_steps': 30, 'guidance_scale': 7.5},
+        # Only useful with LCM-distilled weights or an LCM adapter
+        'lcm': {'scheduler': 'lcm', 'num_inference_steps': 4, 'guidance_scale': 1.0, 'resolution': 'low'},
+    }
+    # Long side (px) of reduced generation resolutions; the short side follows DIAGRAM_DISPLAY_SIZE
+    DIAGRAM_RESOLUTIONS = {'tiny': 256, 'low': 384, 'medium': 512, 'high': 640}
+    DIAGRAM_DISPLAY_SIZE = (350, 250)  # PT, as placed by PresentationService.insert_diagram
+    DIAGRAM_OUTPUT_SIZE = (700, 500)  # px, 2x the display size
+    DIAGRAM_UPSCALER = os.getenv('DIAGRAM_UPSCALER', 'lanczos')
+    DIAGRAM_SR_MODEL_PATH = os.getenv('DIAGRAM_SR_MODEL_PATH', './models/FSRCNN_x2.pb')
+    # Memory budget for the diffusion pipeline (GPU memory on CUDA, RSS on CPU); 0 disables
+    DIAGRAM_MEMORY_BUDGET_MB = int(os.getenv('DIAGRAM_MEMORY_BUDGET_MB', '0'))
+    DIAGRAM_MAX_BATCH_SIZE = 4
+    DIAGRAM_WARMUP = os.getenv('DIAGRAM_WARMUP', 'true').lower() == 'true'
+    DIAGRAM_PROMPT_CACHE_SIZE = 256
+    DIAGRAM_JOB_HISTORY_SIZE = 500
+    # Each subdirectory holds one LoRA adapter (pytorch_lora_weights.safetensors); its name selects it
+    DIAGRAM_ADAPTERS_DIR = os.getenv('DIAGRAM_ADAPTERS_DIR', './models/adapters')
+
     PRESENTATION_THEMES = {
         'modern': {
             'name': 'Modern Professional',
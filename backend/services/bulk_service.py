@@ -0,0 +1,204 @@
+import contextlib
+import contextvars
+import copy
+import logging
+import os
+import queue
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from services.diagram_jobs import DiagramJobManager
+from services.diagram_service import DiagramService
+from services.presentation_service import PresentationService
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+class BulkPresentationService:
+    """Builds many decks through one shared pipeline
+
+    LLM calls run concurrently; each deck is built as soon as its content is
+    ready, with placeholder images for diagrams, and its result is delivered
+    then. Diagram prompts from all decks go to a single worker that runs them
+    through the pipeline in pooled batches; their progress is tracked by
+    DiagramJobManager like any async deck's. Slides writes are paced by PresentationService's shared limiter.
+    With an admission controller, every LLM call, deck build and diagram batch
+    takes a slot in its low-weight bulk lane, so bulk work yields to
+    interactive requests; an item turned away fails with the rejection.
+    """
+
+    def __init__(self, openai_service, credentials, diagram_options=None, admission=None):
+        self.openai_service = openai_service
+        self.credentials = credentials
+        self.diagram_options = diagram_options or {}
+        self.admission = admission
+        # Captured in the request so worker spans join its trace
+        self._context = contextvars.copy_context()
+        self._results = queue.Queue()
+        self._diagram_queue = queue.Queue()
+        # Indices of items whose result has been put on _results (exactly one per item)
+        self._delivered = set()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _submit(self, executor, func, *args):
+        return executor.submit(self._context.copy().run, func, *args)
+
+    def _admit(self):
+        return self.admission.admit('bulk') if self.admission else contextlib.nullcontext()
+
+    def _presentation_service(self):
+        # Google API clients are not thread-safe: one service per worker thread
+        if not hasattr(self._local, 'service'):
+            self._local.service = PresentationService(self.credentials)
+        return self._local.service
+
+    def run(self, items):
+        """Process items (topic, description, theme); yields one result dict per item as its text deck is built
+
+        Queued diagrams are still generated after the last result.
+        """
+        llm_pool = ThreadPoolExecutor(max_workers=Config.BULK_LLM_CONCURRENCY, thread_name_prefix='bulk-llm')
+        build_pool = ThreadPoolExecutor(max_workers=Config.BULK_BUILD_CONCURRENCY, thread_name_prefix='bulk-build')
+        diagram_worker = threading.Thread(
+            target=self._context.copy().run,
+            args=(self._diagram_worker,),
+            name='bulk-diagrams',
+            daemon=True
+        )
+        diagram_worker.start()
+
+        try:
+            for index, item in enumerate(items):
+                future = self._submit(llm_pool, self._generate, item)
+                future.add_done_callback(
+                    lambda done, index=index, item=item: self._start_build(build_pool, index, item, done)
+                )
+
+            for _ in items:
+                yield self._results.get()
+        finally:
+            with self._lock:
+                self._closed = True
+            llm_pool.shutdown(wait=False, cancel_futures=True)
+            build_pool.shutdown(wait=False)
+            self._diagram_queue.put(None)
+
+    def _generate(self, item):
+        with self._admit():
+            return self.openai_service.create_presentation_content(
+                item['topic'], item['description'], item['slide_count']
+            )
+
+    def _start_build(self, build_pool, index, item, content_future):
+        """Done callback of an item's LLM call; no-op once the run has ended (client gone)"""
+        with self._lock:
+            if content_future.cancelled() or self._closed:
+                return
+            self._submit(build_pool, self._build, index, item, content_future)
+
+    def _deliver(self, result):
+        """Put an item's result on the queue unless one was already delivered for it"""
+        with self._lock:
+            if result['index'] in self._delivered:
+                return
+            self._delivered.add(result['index'])
+            result = copy.deepcopy(result)
+        self._results.put(result)
+
+    def _build(self, index, item, content_future):
+        result = {'index': index, 'topic': item['topic']}
+        try:
+            content = content_future.result()
+            queued = []
+
+            def diagram_sink(presentation_id, jobs):
+                queued.extend(jobs)
+                self._queue_diagrams(presentation_id, jobs)
+
+            with self._admit(), span('bulk.deck', deck_index=index):
+                presentation_id = self._presentation_service().create_presentation(
+                    content,
+                    theme_name=item['theme'],
+                    diagram_options=self.diagram_options,
+                    async_diagrams=True,
+                    diagram_sink=diagram_sink
+                )
+            result.update({
+                'success': True,
+                'presentation_id': presentation_id,
+                'presentation_url': f"https://docs.google.com/presentation/d/{presentation_id}/edit",
+                # Swapped in later; progress at /presentations/<presentation_id>/diagrams
+                'diagrams': len(queued)
+            })
+        except Exception as e:
+            # Diagrams already queued for this deck still run, but its result is this error
+            logger.error(f"Bulk deck {index} ({item['topic']}) failed: {str(e)}")
+            result.update({'success': False, 'error': str(e)})
+        self._deliver(result)
+
+    def _queue_diagrams(self, presentation_id, jobs):
+        DiagramJobManager.register(presentation_id, jobs)
+        with self._lock:
+            # A build still running when the client went away: the diagram worker has been told to stop
+            closed = self._closed
+            if not closed:
+                for job in jobs:
+                    self._diagram_queue.put({**job, 'presentation_id': presentation_id})
+        if closed:
+            for job in jobs:
+                self._diagram_failed({**job, 'presentation_id': presentation_id}, 'Bulk request ended before the diagram was queued')
+
+    def _diagram_failed(self, job, error):
+        DiagramJobManager.set_status(job['presentation_id'], job['slide_id'], 'failed', error)
+
+    def _diagram_worker(self):
+        diagram_service = None
+        while True:
+            job = self._diagram_queue.get()
+            if job is None:
+                return
+            jobs = [job]
+
+            try:
+                diagram_service = diagram_service or DiagramService.get_instance()
+            except Exception as e:
+                logger.error(f"Could not load diagram model for bulk generation: {str(e)}")
+                self._diagram_failed(job, str(e))
+                continue
+
+            # Pool whatever else is queued, across decks, into one pipeline batch
+            while len(jobs) < diagram_service.max_batch_size:
+                try:
+                    job = self._diagram_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    self._diagram_queue.put(None)
+                    break
+                jobs.append(job)
+
+            for job in jobs:
+                DiagramJobManager.set_status(job['presentation_id'], job['slide_id'], 'generating')
+            try:
+                with self._admit(), span('bulk.diagram_batch', batch_size=len(jobs)):
+                    images = diagram_service.generate_images([job['prompt'] for job in jobs], **self.diagram_options)
+            except Exception as e:
+                logger.error(f"Bulk diagram batch failed: {str(e)}")
+                for job in jobs:
+                    self._diagram_failed(job, str(e))
+                continue
+
+            for job, image in zip(jobs, images):
+                try:
+                    image_path = os.path.join(tempfile.gettempdir(), f"diagram_{uuid.uuid4().hex}.png")
+                    image.save(image_path)
+                    presentation_service = self._presentation_service()
+                    image_url = presentation_service.replace_diagram(job['presentation_id'], job['image_object_id'], image_path)
+                    DiagramJobManager.diagram_done(presentation_service, job['presentation_id'], job, image_url)
+                except Exception as e:
+                    logger.error(f"Error replacing diagram for slide {job['slide_index'] + 1}: {str(e)}")
+                    self._diagram_failed(job, str(e))
@@ -0,0 +1,195 @@
+import copy
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+import numpy as np
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r'[a-z0-9]+')
+_STOPWORDS = frozenset(
+    'a an and are as at by for from how in into is of on or the to what why with about its their our your'.split()
+)
+# Acronyms common in deck topics, expanded so they meet their spelled-out form
+_ACRONYMS = {
+    'ai': 'artificial intelligence',
+    'ml': 'machine learning',
+    'iot': 'internet of things',
+    'vr': 'virtual reality',
+    'ev': 'electric vehicle',
+    'evs': 'electric vehicles',
+    'hr': 'human resources',
+    'seo': 'search engine optimization',
+}
+# Interchangeable topic words, mapped to one spelling
+_SYNONYMS = {
+    'medicine': 'healthcare',
+    'medical': 'healthcare',
+    'health': 'healthcare',
+    'automobiles': 'cars',
+    'kids': 'children',
+}
+# Words that flip a topic's meaning while leaving most of its features in place ("non-renewable"
+# splits into "non" and "renewable"), and antonyms a single prefix or word apart
+_NEGATIONS = frozenset('non not no anti without against never nor'.split())
+_ANTONYM_PAIRS = (
+    ('healthy', 'unhealthy'), ('sustainable', 'unsustainable'), ('renewable', 'nonrenewable'),
+    ('legal', 'illegal'), ('advantages', 'disadvantages'), ('pros', 'cons'), ('benefits', 'drawbacks'),
+    ('increase', 'decrease'), ('success', 'failure'), ('rise', 'fall'),
+)
+_ANTONYMS = {word: opposite for pair in _ANTONYM_PAIRS for word, opposite in (pair, pair[::-1])}
+
+def _words(text):
+    words = []
+    for word in _WORD.findall(text.lower()):
+        for part in _ACRONYMS.get(word, word).split():
+            if part not in _STOPWORDS:
+                words.append(_SYNONYMS.get(part, part))
+    return words
+
+def _opposed(words, other_words):
+    """Whether two word sets differ in negation, as "renewable" and "non-renewable" or "healthy" and "unhealthy" do"""
+    if words & _NEGATIONS != other_words & _NEGATIONS:
+        return True
+    for first, second in ((words, other_words), (other_words, words)):
+        if any(_ANTONYMS.get(word) in second - first for word in first - second):
+            return True
+    return False
+
+def _features(text, dimensions):
+    """Hashed sublinear term frequencies: words, their character trigrams and acronym forms
+
+    Words are normalized first (_ACRONYMS expanded, _SYNONYMS mapped), so "AI
+    in healthcare" meets "artificial intelligence in medicine"; paraphrases
+    outside those lists are only caught by shared words. Trigrams match
+    inflections ("diagram"/"diagrams"); the initials of adjacent words are
+    hashed like short words to nudge unlisted acronyms towards their expansion.
+    """
+    words = _words(text)
+    tokens = [f"w:{word}" for word in words]
+    tokens += [f"a:{word}" for word in words if len(word) <= 4]
+    tokens += [f"a:{first[0]}{second[0]}" for first, second in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        tokens += [f"c:{padded[index:index + 3]}" for index in range(len(padded) - 2)]
+
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for token in tokens:
+        vector[zlib.crc32(token.encode()) % dimensions] += 1
+    return np.log1p(vector)
+
+class ContentIndex:
+    def __init__(self, path, capacity, dimensions):
+        """Bounded similarity index of generated deck content by topic and description
+
+        Queries are scored against every entry at once by TF-IDF cosine
+        similarity over hashed features. A match must also agree with the
+        query on negation, which similarity alone misses ("renewable energy"
+        and "non-renewable energy" score about 0.78). When full, the least
+        recently used entry is evicted. Entries, with the recency of lookups
+        since, persist to path as JSON on every add; vectors are rebuilt on
+        load.
+        """
+        self.path = path
+        self.capacity = capacity
+        self.dimensions = dimensions
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((capacity, dimensions), dtype=np.float32)
+        self._document_frequency = np.zeros(dimensions, dtype=np.float32)
+        self._entries = []
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._clock = 0
+        self._load()
+
+    def _vector(self, topic, description):
+        return _features(topic, self.dimensions) + _features(description or '', self.dimensions)
+
+    def _set(self, slot, entry, vector):
+        """Store entry in slot, replacing (and un-counting) whatever was there (lock held)"""
+        if slot < len(self._entries):
+            self._document_frequency -= self._vectors[slot] > 0
+            self._entries[slot] = entry
+        else:
+            self._entries.append(entry)
+        self._vectors[slot] = vector
+        self._document_frequency += vector > 0
+        self._clock += 1
+        self._last_used[slot] = entry.setdefault('last_used', self._clock)
+
+    def lookup(self, topic, description, slide_count):
+        """(entry, similarity) of the closest entry with the same slide count, or (None, best similarity)
+
+        The entry is a copy: topic, description, slide_count and content.
+        """
+        with self._lock:
+            count = len(self._entries)
+            if not count:
+                return None, 0.0
+            idf = np.log((1 + count) / (1 + self._document_frequency)) + 1
+            vectors = self._vectors[:count] * idf
+            query = self._vector(topic, description) * idf
+
+            norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query)
+            scores = np.divide(vectors @ query, norms, out=np.zeros(count, dtype=np.float32), where=norms > 0)
+            scores[[entry['slide_count'] != slide_count for entry in self._entries]] = 0.0
+
+            words = set(_words(f"{topic} {description or ''}"))
+            ranked = [int(index) for index in np.argsort(-scores) if scores[index] >= Config.CONTENT_REUSE_THRESHOLD]
+            best = next((index for index in ranked if not self._opposed(index, words)), None)
+            if best is None:
+                return None, float(scores.max())
+
+            self._clock += 1
+            # Persisted with the next add rather than rewriting the file on the request path
+            self._last_used[best] = self._entries[best]['last_used'] = self._clock
+            return copy.deepcopy(self._entries[best]), float(scores[best])
+
+    def _opposed(self, slot, words):
+        entry = self._entries[slot]
+        return _opposed(words, set(_words(f"{entry['topic']} {entry.get('description') or ''}")))
+
+    def add(self, topic, description, slide_count, content):
+        entry = {
+            'topic': topic,
+            'description': description or '',
+            'slide_count': slide_count,
+            'content': copy.deepcopy(content)
+        }
+        with self._lock:
+            count = len(self._entries)
+            slot = count if count < self.capacity else int(np.argmin(self._last_used[:count]))
+            self._set(slot, entry, self._vector(topic, description))
+            self._save()
+
+    def _save(self):
+        """Write-then-rename the entries, like DeckStore (lock held)"""
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump({'entries': self._entries}, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save content index: {str(e)}")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)['entries']
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable content index {self.path}: {str(e)}")
+            return
+
+        # Most recently used last, so a smaller capacity keeps the newest entries
+        entries = sorted(entries, key=lambda entry: entry.get('last_used', 0))[-self.capacity:]
+        with self._lock:
+            for slot, entry in enumerate(entries):
+                self._set(slot, entry, self._vector(entry['topic'], entry.get('description')))
+            self._clock = max([entry.get('last_used', 0) for entry in entries] + [self._clock])
+        logger.info(f"Loaded {len(entries)} content index entries")
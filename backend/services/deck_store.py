@@ -0,0 +1,64 @@
+import json
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class DeckStore:
+    """Persists each deck's content JSON and Slides objectId map, one JSON file per presentation
+
+    A record holds presentation_id, theme, diagram_options, content (the LLM
+    output) and slides: per content slide, its slide_id, title_id, body_id and
+    image_object_id (None without a diagram).
+    """
+
+    _lock = threading.Lock()
+    # presentation_id -> [lock, holders and waiters], for read-modify-write of one record
+    _record_locks = {}
+
+    @staticmethod
+    def _path(presentation_id):
+        if not re.fullmatch(r'[A-Za-z0-9_-]+', presentation_id or ''):
+            raise ValueError(f"Invalid presentation id '{presentation_id}'")
+        return os.path.join(Config.DECK_STORE_DIR, f"{presentation_id}.json")
+
+    @classmethod
+    @contextmanager
+    def editing(cls, presentation_id):
+        """Hold presentation_id's record for a load, change and save; edits of one deck run one at a time"""
+        with cls._lock:
+            entry = cls._record_locks.setdefault(presentation_id, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with cls._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del cls._record_locks[presentation_id]
+
+    @classmethod
+    def save(cls, record):
+        path = cls._path(record['presentation_id'])
+        with cls._lock:
+            os.makedirs(Config.DECK_STORE_DIR, exist_ok=True)
+            # Write-then-rename so a crash never leaves a truncated record
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(record, f)
+            os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, presentation_id):
+        """The stored record, or None for decks created before the store existed"""
+        path = cls._path(presentation_id)
+        with cls._lock:
+            if not os.path.exists(path):
+                return None
+            with open(path) as f:
+                return json.load(f)
@@ -0,0 +1,169 @@
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from services.diagram_service import DiagramService
+from utils.admission import AdmissionRejected
+from utils.lru_cache import LRUCache
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+class DiagramJobManager:
+    """Generates diagrams in the background and swaps them into placeholder images"""
+
+    # A single worker: diffusion inference is serialized by DiagramService anyway
+    _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='diagram-jobs')
+    # presentation_id -> {slide_id: status dict}, bounded so old decks are forgotten
+    _statuses = LRUCache(Config.DIAGRAM_JOB_HISTORY_SIZE)
+    # presentation_id -> IDs of Drive copies that get its diagrams too
+    _copies = LRUCache(Config.DIAGRAM_JOB_HISTORY_SIZE)
+    _lock = threading.Lock()
+    # The app's AdmissionController; each diagram takes a slot in its 'diagram' lane
+    admission = None
+    # Admission attempts per diagram before it is marked failed (a background job waits out a busy lane)
+    ADMISSION_ATTEMPTS = 3
+
+    @classmethod
+    def submit(cls, presentation_id, jobs, credentials, diagram_options=None):
+        """Queue diagram jobs for a presentation
+
+        Each job is a dict with slide_index, slide_id, image_object_id and prompt.
+        """
+        cls.register(presentation_id, jobs)
+        # Run in a copy of the caller's context so background spans join the request's trace
+        context = contextvars.copy_context()
+        cls._executor.submit(context.run, cls._run, presentation_id, jobs, credentials, diagram_options or {})
+        logger.info(f"Queued {len(jobs)} diagram(s) for presentation {presentation_id}")
+
+    @classmethod
+    def register(cls, presentation_id, jobs):
+        """Track jobs as pending without running them, for callers with their own diagram worker (bulk)
+
+        The caller reports progress through set_status and diagram_done.
+        """
+        statuses = {
+            job['slide_id']: {
+                'slide_index': job['slide_index'],
+                'image_object_id': job['image_object_id'],
+                'status': 'pending',
+                'error': None,
+                'updated_at': time.time()
+            }
+            for job in jobs
+        }
+        cls._statuses.put(presentation_id, statuses)
+
+    @classmethod
+    def add_copy(cls, presentation_id, copy_id):
+        """Swap presentation_id's remaining diagrams into copy_id as well (same object IDs)
+
+        Returns the statuses of diagrams already swapped into the source, with
+        their image_url, for the caller to apply to the copy itself. The copy
+        shares the source's status.
+        """
+        with cls._lock:
+            statuses = cls._statuses.get(presentation_id)
+            if statuses is None:
+                return []
+            cls._copies.put(presentation_id, cls._copies.get(presentation_id, []) + [copy_id])
+            cls._statuses.put(copy_id, statuses)
+            return [dict(status) for status in statuses.values() if status.get('image_url')]
+
+    @classmethod
+    def get_status(cls, presentation_id):
+        """Per-slide diagram status for a presentation, or None if unknown"""
+        statuses = cls._statuses.get(presentation_id)
+        if statuses is None:
+            return None
+
+        with cls._lock:
+            slides = sorted(
+                ({'slide_id': slide_id, **status} for slide_id, status in statuses.items()),
+                key=lambda status: status['slide_index']
+            )
+
+        counts = {}
+        for slide in slides:
+            counts[slide['status']] = counts.get(slide['status'], 0) + 1
+
+        return {
+            'presentation_id': presentation_id,
+            'complete': all(slide['status'] in ('done', 'failed') for slide in slides),
+            'counts': counts,
+            'slides': slides
+        }
+
+    @classmethod
+    def set_status(cls, presentation_id, slide_id, status, error=None, image_url=None):
+        statuses = cls._statuses.get(presentation_id)
+        if statuses is None:
+            return
+        with cls._lock:
+            statuses[slide_id].update({'status': status, 'error': error, 'updated_at': time.time()})
+            if image_url:
+                statuses[slide_id]['image_url'] = image_url
+
+    @classmethod
+    def diagram_done(cls, presentation_service, presentation_id, job, image_url):
+        """Mark job's diagram as swapped in (at image_url) and swap it into the deck's Drive copies too"""
+        # Recorded before reading the copies, so a copy added meanwhile replays it (add_copy)
+        cls.set_status(presentation_id, job['slide_id'], 'done', image_url=image_url)
+        with cls._lock:
+            copies = list(cls._copies.get(presentation_id, []))
+        for copy_id in copies:
+            try:
+                presentation_service.replace_image(copy_id, job['image_object_id'], image_url)
+            except Exception as e:
+                logger.error(f"Error replacing diagram in copy {copy_id}: {str(e)}")
+
+    @classmethod
+    @contextlib.contextmanager
+    def _admitted(cls):
+        """Hold a 'diagram' slot, retrying after each rejection's retry_after up to ADMISSION_ATTEMPTS times"""
+        if cls.admission is None:
+            yield
+            return
+        for attempt in range(cls.ADMISSION_ATTEMPTS):
+            try:
+                ticket = cls.admission.acquire('diagram')
+                break
+            except AdmissionRejected as e:
+                if attempt == cls.ADMISSION_ATTEMPTS - 1:
+                    raise
+                logger.info(f"Diagram job waiting {e.retry_after}s for admission ({e.reason})")
+                time.sleep(e.retry_after)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            cls.admission.release(ticket, time.perf_counter() - started)
+
+    @classmethod
+    def _run(cls, presentation_id, jobs, credentials, diagram_options):
+        # Imported here to avoid a circular import; Google API clients are not
+        # thread-safe, so the worker builds its own service
+        from services.presentation_service import PresentationService
+
+        try:
+            presentation_service = PresentationService(credentials)
+            diagram_service = DiagramService.get_instance()
+        except Exception as e:
+            logger.error(f"Could not start diagram jobs for presentation {presentation_id}: {str(e)}")
+            for job in jobs:
+                cls.set_status(presentation_id, job['slide_id'], 'failed', str(e))
+            return
+
+        for job in jobs:
+            cls.set_status(presentation_id, job['slide_id'], 'generating')
+            try:
+                with cls._admitted(), span('diagram_job', slide_index=job['slide_index']):
+                    image_path = diagram_service.generate_diagram(job['prompt'], **diagram_options)
+                    image_url = presentation_service.replace_diagram(presentation_id, job['image_object_id'], image_path)
+                cls.diagram_done(presentation_service, presentation_id, job, image_url)
+            except Exception as e:
+                logger.error(f"Error generating diagram for slide {job['slide_index'] + 1}: {str(e)}")
+                cls.set_status(presentation_id, job['slide_id'], 'failed', str(e))
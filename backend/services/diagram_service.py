@@ -1,66 +1,511 @@
 import datetime
 import os
+import threading
+import time
+import uuid
 import torch
+import diffusers
 from diffusers import StableDiffusionPipeline
 from pathlib import Path
 import logging
+from config import Config
+from utils.image_upscaler import ImageUpscaler
+from utils.lru_cache import LRUCache
+from utils.memory_monitor import MemoryMonitor
+from utils.metrics import record_cache, timed, track
+from utils.model_snapshot import is_snapshot, load_snapshot
 
 logger = logging.getLogger(__name__)
 
+# Scheduler name -> (diffusers class name, extra config overrides)
+SCHEDULERS = {
+    'default': (None, {}),
+    'ddim': ('DDIMScheduler', {}),
+    'pndm': ('PNDMScheduler', {}),
+    'dpm++': ('DPMSolverMultistepScheduler', {'algorithm_type': 'dpmsolver++'}),
+    'dpm++_karras': ('DPMSolverMultistepScheduler', {'algorithm_type': 'dpmsolver++', 'use_karras_sigmas': True}),
+    'euler': ('EulerDiscreteScheduler', {}),
+    'euler_a': ('EulerAncestralDiscreteScheduler', {}),
+    'unipc': ('UniPCMultistepScheduler', {}),
+    'lcm': ('LCMScheduler', {}),
+}
+
+# Rough fp16 working-set estimates for one 512x512 image with classifier-free guidance
+ATTENTION_BYTES_PER_IMAGE = 1536 * 1024 ** 2
+SLICED_ATTENTION_BYTES_PER_IMAGE = 512 * 1024 ** 2
+VAE_DECODE_BYTES_PER_IMAGE = 768 * 1024 ** 2
+TILED_VAE_DECODE_BYTES = 256 * 1024 ** 2
+
+class GeneratedImages(list):
+    """Images from DiagramService.generate_images, with the stats of each pipeline batch that made them"""
+
+    def __init__(self, images=(), stats=None):
+        super().__init__(images)
+        self.stats = stats or []
+
 class DiagramService:
-    def __init__(self, model_path="./models/sd-ai2d-model"):
-        """Initialize the diagram generation service"""
-        self.model_path = model_path
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, model_path=None, profile=None, memory_budget=None, warmup=None):
+        """Initialize the diagram generation service
+
+        memory_budget is in bytes; defaults to Config.DIAGRAM_MEMORY_BUDGET_MB.
+        warmup runs one tiny inference at load time; defaults to Config.DIAGRAM_WARMUP.
+        """
+        self._created_at = time.perf_counter()
+        self.model_path = model_path or Config.DIAGRAM_MODEL_PATH
+        self.default_profile = profile or Config.DIAGRAM_DEFAULT_PROFILE
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.memory_budget = memory_budget or Config.DIAGRAM_MEMORY_BUDGET_MB * 1024 ** 2 or None
+        self.max_batch_size = Config.DIAGRAM_MAX_BATCH_SIZE
+        self.memory_features = []
+        self.load_stats = {}
+        self.warmup = Config.DIAGRAM_WARMUP if warmup is None else warmup
         self.pipeline = None
+        self._default_scheduler = None
+        self._schedulers = {}
+        self._prompt_embeds = LRUCache(Config.DIAGRAM_PROMPT_CACHE_SIZE)
+        self._negative_prompt_embeds = None
+        self._loaded_adapters = set()
+        self._active_adapter = None
+        # The pipeline's scheduler is swapped per request, so calls are serialized
+        self._lock = threading.Lock()
         self._initialize_model()
-    
+
+    @classmethod
+    def get_instance(cls, model_path=None):
+        """Return a process-wide service per model path so weights and caches are loaded once"""
+        model_path = model_path or Config.DIAGRAM_MODEL_PATH
+        with cls._instances_lock:
+            if model_path not in cls._instances:
+                cls._instances[model_path] = cls(model_path=model_path)
+            return cls._instances[model_path]
+
+    @timed('diffusion.model_load')
     def _initialize_model(self):
         """Load the model"""
         try:
             logger.info(f"Loading diagram model from {self.model_path}...")
-            self.pipeline = StableDiffusionPipeline.from_pretrained(
-                self.model_path,
-                torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
-                safety_checker=None,
-            ).to(self.device)
-            logger.info("Diagram model loaded successfully")
+            torch_dtype = torch.float16 if self.device == "cuda" else torch.float32
+            started = time.perf_counter()
+
+            snapshot = is_snapshot(self.model_path)
+            if snapshot:
+                # Offloading needs the weights on the CPU first; otherwise map them straight to the device
+                self.pipeline = load_snapshot(
+                    self.model_path,
+                    torch_dtype=torch_dtype,
+                    device="cpu" if self.memory_budget else self.device
+                )
+            else:
+                self.pipeline = StableDiffusionPipeline.from_pretrained(
+                    self.model_path,
+                    torch_dtype=torch_dtype,
+                    safety_checker=None,
+                )
+            offloaded = self._apply_memory_budget()
+            if not offloaded:
+                self.pipeline = self.pipeline.to(self.device)
+            self._default_scheduler = self.pipeline.scheduler
+            # The unconditional (empty prompt) embedding is identical for every request
+            self._negative_prompt_embeds = self._encode_text([""])
+
+            self.load_stats = {
+                'snapshot': snapshot,
+                'load_seconds': time.perf_counter() - started,
+                'warmup_seconds': None,
+                'time_to_first_image_seconds': None,
+            }
+            if self.warmup:
+                self._warmup()
+
+            logger.info(
+                f"Diagram model loaded successfully in {self.load_stats['load_seconds']:.2f}s"
+                f"{' (snapshot)' if snapshot else ''}"
+            )
         except Exception as e:
             logger.error(f"Error loading diagram model: {str(e)}")
             raise
-    
+
+    def _warmup(self):
+        """Run one tiny inference so the first user request does not pay kernel setup"""
+        started = time.perf_counter()
+        with self._lock, torch.no_grad():
+            self.pipeline(
+                prompt_embeds=self._negative_prompt_embeds,
+                negative_prompt_embeds=self._negative_prompt_embeds,
+                num_inference_steps=1,
+                width=64,
+                height=64,
+            )
+        self.load_stats['warmup_seconds'] = time.perf_counter() - started
+        logger.info(f"Diagram model warmed up in {self.load_stats['warmup_seconds']:.2f}s")
+
+    def _module_bytes(self, module):
+        return sum(param.numel() * param.element_size() for param in module.parameters())
+
+    def _apply_memory_budget(self):
+        """Enable memory-saving features and cap the batch size to fit the budget
+
+        Returns True if submodule offloading was enabled (the pipeline must then
+        not be moved to the device explicitly).
+        """
+        if not self.memory_budget:
+            return False
+
+        dtype_scale = 1 if self.device == "cuda" else 2  # fp32 on CPU
+        attention = ATTENTION_BYTES_PER_IMAGE * dtype_scale
+        vae_decode = VAE_DECODE_BYTES_PER_IMAGE * dtype_scale
+
+        unet_bytes = self._module_bytes(self.pipeline.unet)
+        model_bytes = (
+            unet_bytes
+            + self._module_bytes(self.pipeline.vae)
+            + self._module_bytes(self.pipeline.text_encoder)
+        )
+        available = self.memory_budget - model_bytes
+        offloaded = False
+
+        if available < SLICED_ATTENTION_BYTES_PER_IMAGE * dtype_scale and self.device == "cuda":
+            # Weights do not fit alongside activations: keep them on the CPU until needed
+            if self.memory_budget - unet_bytes >= SLICED_ATTENTION_BYTES_PER_IMAGE:
+                self.pipeline.enable_model_cpu_offload()
+                self.memory_features.append('model_cpu_offload')
+                available = self.memory_budget - unet_bytes
+            else:
+                self.pipeline.enable_sequential_cpu_offload()
+                self.memory_features.append('sequential_cpu_offload')
+                available = self.memory_budget
+            offloaded = True
+        elif available <= 0:
+            logger.warning(
+                f"Diagram model needs ~{model_bytes / 1024 ** 2:.0f}MB, above the "
+                f"{self.memory_budget / 1024 ** 2:.0f}MB budget; offloading is only available on CUDA"
+            )
+
+        if available < attention * self.max_batch_size:
+            self.pipeline.enable_attention_slicing()
+            self.memory_features.append('attention_slicing')
+            attention = SLICED_ATTENTION_BYTES_PER_IMAGE * dtype_scale
+
+        if available < (attention + vae_decode) * self.max_batch_size:
+            # Decode the batch one image at a time
+            self.pipeline.enable_vae_slicing()
+            self.memory_features.append('vae_slicing')
+
+            if available < attention + vae_decode:
+                self.pipeline.enable_vae_tiling()
+                self.memory_features.append('vae_tiling')
+                vae_decode = TILED_VAE_DECODE_BYTES * dtype_scale
+
+            per_image = attention
+            fixed = vae_decode
+        else:
+            per_image = attention + vae_decode
+            fixed = 0
+
+        self.max_batch_size = max(1, min(self.max_batch_size, int((available - fixed) // per_image)))
+
+        logger.info(
+            f"Diagram memory budget {self.memory_budget / 1024 ** 2:.0f}MB: "
+            f"features={self.memory_features or ['none']}, max_batch_size={self.max_batch_size}"
+        )
+        return offloaded
+
+    def _get_scheduler(self, name):
+        """Get (and cache) a scheduler instance built from the model's scheduler config"""
+        if name not in SCHEDULERS:
+            raise ValueError(f"Unknown scheduler '{name}'. Available: {', '.join(SCHEDULERS)}")
+
+        class_name, overrides = SCHEDULERS[name]
+        if class_name is None:
+            return self._default_scheduler
+
+        if name not in self._schedulers:
+            scheduler_class = getattr(diffusers, class_name, None)
+            if scheduler_class is None:
+                raise ValueError(f"Scheduler '{name}' is not supported by the installed diffusers version")
+            self._schedulers[name] = scheduler_class.from_config(
+                self._default_scheduler.config,
+                **overrides
+            )
+        return self._schedulers[name]
+
+    @staticmethod
+    def list_adapters():
+        """Names of LoRA adapters found in Config.DIAGRAM_ADAPTERS_DIR"""
+        adapters_dir = Path(Config.DIAGRAM_ADAPTERS_DIR)
+        if not adapters_dir.is_dir():
+            return []
+        return sorted(
+            path.name for path in adapters_dir.iterdir()
+            if path.is_dir() and any(path.glob('*.safetensors'))
+        )
+
+    def _activate_adapter(self, name):
+        """Attach (loading on first use) or detach a LoRA adapter; caller holds the lock
+
+        The base weights stay loaded; switching adapters only changes which
+        LoRA layers are active. Adapters must be UNet-only, since cached prompt
+        embeddings come from the base text encoder.
+        """
+        if name == self._active_adapter:
+            return
+
+        if name is None:
+            self.pipeline.disable_lora()
+            self._active_adapter = None
+            return
+
+        if name not in self._loaded_adapters:
+            if name not in self.list_adapters():
+                raise ValueError(f"Unknown diagram adapter '{name}'. Available: {', '.join(self.list_adapters())}")
+
+            logger.info(f"Loading diagram adapter '{name}'")
+            self.pipeline.load_lora_weights(str(Path(Config.DIAGRAM_ADAPTERS_DIR) / name), adapter_name=name)
+            if name in getattr(self.pipeline.text_encoder, 'peft_config', {}):
+                self.pipeline.delete_adapters([name])
+                raise ValueError(f"Diagram adapter '{name}' modifies the text encoder, which is not supported")
+            self._loaded_adapters.add(name)
+
+        self.pipeline.set_adapters([name])
+        self.pipeline.enable_lora()
+        self._active_adapter = name
+
+    @staticmethod
+    def _normalize_prompt(prompt):
+        # The CLIP tokenizer lowercases and collapses whitespace, so these prompts embed identically
+        return ' '.join(prompt.split()).lower()
+
+    @torch.no_grad()
+    def _encode_text(self, texts):
+        """Run the CLIP text encoder on a list of texts"""
+        tokenizer = self.pipeline.tokenizer
+        device = getattr(self.pipeline, '_execution_device', self.device)
+        input_ids = tokenizer(
+            texts,
+            padding="max_length",
+            max_length=tokenizer.model_max_length,
+            truncation=True,
+            return_tensors="pt"
+        ).input_ids
+        return self.pipeline.text_encoder(input_ids.to(device))[0]
+
+    def _get_prompt_embeds(self, prompts):
+        """Look up prompt embeddings in the LRU cache, encoding all misses in one batch"""
+        keys = [self._normalize_prompt(prompt) for prompt in prompts]
+        embeds = {key: self._prompt_embeds.get(key) for key in set(keys)}
+        missing = [key for key, value in embeds.items() if value is None]
+        record_cache('prompt_embeds', hits=len(embeds) - len(missing), misses=len(missing))
+
+        if missing:
+            for key, value in zip(missing, self._encode_text(missing)):
+                value = value.unsqueeze(0)
+                self._prompt_embeds.put(key, value)
+                embeds[key] = value
+
+        return torch.cat([embeds[key] for key in keys])
+
+    @staticmethod
+    def resolution_for(long_side, aspect_size=None):
+        """Width/height with the display aspect ratio, rounded to the VAE's multiple of 8"""
+        display_width, display_height = aspect_size or Config.DIAGRAM_DISPLAY_SIZE
+        short_side = long_side * min(display_width, display_height) / max(display_width, display_height)
+        short_side = max(8, int(round(short_side / 8)) * 8)
+        long_side = int(round(long_side / 8)) * 8
+        if display_width >= display_height:
+            return long_side, short_side
+        return short_side, long_side
+
+    @staticmethod
+    def valid_resolution(resolution):
+        """Whether resolution is 'native' or a Config.DIAGRAM_RESOLUTIONS name (arbitrary sizes are not accepted)"""
+        return isinstance(resolution, str) and (resolution == 'native' or resolution in Config.DIAGRAM_RESOLUTIONS)
+
+    @staticmethod
+    def resolve_profile(profile=None, **overrides):
+        """Merge a named quality/latency profile with explicit per-request overrides"""
+        profile = profile or Config.DIAGRAM_DEFAULT_PROFILE
+        if profile not in Config.DIAGRAM_PROFILES:
+            raise ValueError(f"Unknown diagram profile '{profile}'. Available: {', '.join(Config.DIAGRAM_PROFILES)}")
+
+        settings = dict(Config.DIAGRAM_PROFILES[profile])
+        settings.update({key: value for key, value in overrides.items() if value is not None})
+        return settings
+
+    def generate_images(
+        self,
+        prompts,
+        profile=None,
+        scheduler=None,
+        num_inference_steps=None,
+        guidance_scale=None,
+        seed=None,
+        resolution=None,
+        upscaler=None,
+        adapter=None
+    ):
+        """Run the pipeline for a list of prompts in batches capped by the memory budget
+
+        With a reduced resolution (a Config.DIAGRAM_RESOLUTIONS name; 'native' keeps
+        the model's own size) images are generated at the display aspect ratio and upscaled
+        to Config.DIAGRAM_OUTPUT_SIZE. Returns GeneratedImages: the images, with
+        per-batch stats kept per call rather than on the shared service.
+        """
+        if not self.pipeline:
+            raise ValueError("Model not initialized")
+
+        settings = self.resolve_profile(
+            profile or self.default_profile,
+            scheduler=scheduler,
+            num_inference_steps=num_inference_steps,
+            guidance_scale=guidance_scale,
+            resolution=resolution,
+            upscaler=upscaler,
+            adapter=adapter
+        )
+
+        width = height = None
+        resolution = settings.get('resolution')
+        if resolution and resolution != 'native':
+            if not self.valid_resolution(resolution):
+                raise ValueError(f"Unknown diagram resolution '{resolution}'. Available: {', '.join(Config.DIAGRAM_RESOLUTIONS)}")
+            width, height = self.resolution_for(Config.DIAGRAM_RESOLUTIONS[resolution])
+
+        images = GeneratedImages()
+        for start in range(0, len(prompts), self.max_batch_size):
+            batch = prompts[start:start + self.max_batch_size]
+
+            generator = None
+            if seed is not None:
+                generator = [
+                    torch.Generator(device="cpu").manual_seed(seed + start + offset)
+                    for offset in range(len(batch))
+                ]
+
+            with self._lock:
+                self.pipeline.scheduler = self._get_scheduler(settings['scheduler'])
+                self._activate_adapter(settings.get('adapter'))
+
+                MemoryMonitor.reset_peak_rss()
+                if self.device == "cuda":
+                    torch.cuda.reset_peak_memory_stats()
+                started = time.perf_counter()
+
+                with track('diffusion.text_encode'):
+                    prompt_embeds = self._get_prompt_embeds(batch)
+                with track('diffusion.inference'):
+                    batch_images = self.pipeline(
+                        prompt_embeds=prompt_embeds,
+                        negative_prompt_embeds=self._negative_prompt_embeds.expand(len(batch), -1, -1),
+                        num_inference_steps=settings['num_inference_steps'],
+                        guidance_scale=settings['guidance_scale'],
+                        width=width,
+                        height=height,
+                        generator=generator,
+                    ).images
+
+                stats = {
+                    'batch_size': len(batch),
+                    'adapter': self._active_adapter,
+                    'seconds': time.perf_counter() - started,
+                    'resolution': list(batch_images[0].size),
+                    'peak_rss_bytes': MemoryMonitor.peak_rss(),
+                    'peak_cuda_bytes': torch.cuda.max_memory_allocated() if self.device == "cuda" else None,
+                }
+
+            if width:
+                with track('image.upscale'):
+                    batch_images = [
+                        ImageUpscaler.upscale(
+                            image,
+                            Config.DIAGRAM_OUTPUT_SIZE,
+                            method=settings.get('upscaler') or Config.DIAGRAM_UPSCALER,
+                            sr_model_path=Config.DIAGRAM_SR_MODEL_PATH
+                        )
+                        for image in batch_images
+                    ]
+            images.extend(batch_images)
+            images.stats.append(stats)
+
+            logger.info(
+                f"Generated {len(batch)} diagram(s) in {stats['seconds']:.2f}s, "
+                f"peak RSS {stats['peak_rss_bytes'] / 1024 ** 2:.0f}MB"
+            )
+
+        if self.load_stats.get('time_to_first_image_seconds') is None:
+            self.load_stats['time_to_first_image_seconds'] = time.perf_counter() - self._created_at
+            logger.info(f"Time to first diagram: {self.load_stats['time_to_first_image_seconds']:.2f}s")
+
+        return images
+
+    def generate_image(self, prompt, **kwargs):
+        """Run the pipeline for a single prompt and return the PIL image"""
+        return self.generate_images([prompt], **kwargs)[0]
+
     def generate_diagram(
         self,
         prompt,
-        num_inference_steps=5,
-        guidance_scale=7.5,
-        output_dir="./generated"
+        num_inference_steps=None,
+        guidance_scale=None,
+        output_dir="./generated",
+        profile=None,
+        scheduler=None,
+        resolution=None,
+        adapter=None
     ):
         """Generate a single diagram"""
+        return self.generate_diagram_with_stats(
+            prompt,
+            num_inference_steps=num_inference_steps,
+            guidance_scale=guidance_scale,
+            output_dir=output_dir,
+            profile=profile,
+            scheduler=scheduler,
+            resolution=resolution,
+            adapter=adapter
+        )[0]
+
+    def generate_diagram_with_stats(
+        self,
+        prompt,
+        num_inference_steps=None,
+        guidance_scale=None,
+        output_dir="./generated",
+        profile=None,
+        scheduler=None,
+        resolution=None,
+        adapter=None
+    ):
+        """Generate a single diagram; returns its file path and the stats of the pipeline run that made it"""
         try:
-            if not self.pipeline:
-                raise ValueError("Model not initialized")
-            
             # Create output directory
             os.makedirs(output_dir, exist_ok=True)
-            
+
             # Generate image
             logger.info(f"Generating diagram for prompt: {prompt}")
-            image = self.pipeline(
-                prompt,
+            images = self.generate_images(
+                [prompt],
+                profile=profile,
+                scheduler=scheduler,
                 num_inference_steps=num_inference_steps,
                 guidance_scale=guidance_scale,
-            ).images[0]
-            
-            # Save image with timestamp
+                resolution=resolution,
+                adapter=adapter,
+            )
+            image = images[0]
+
+            # Save image with timestamp (plus a random suffix, diagrams can finish in the same second)
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"diagram_{timestamp}.png"
+            filename = f"diagram_{timestamp}_{uuid.uuid4().hex[:8]}.png"
             filepath = os.path.join(output_dir, filename)
-            image.save(filepath)
-            
+            with track('image.encode'):
+                image.save(filepath)
+
             logger.info(f"Diagram saved to {filepath}")
-            return filepath
-            
+            return filepath, images.stats[0]
+
         except Exception as e:
             logger.error(f"Error generating diagram: {str(e)}")
             raise
\ No newline at end of file
@@ -5,11 +5,13 @@ from google.auth.transport.requests import Request
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from config import Config
+from utils.metrics import timed
 
 logger = logging.getLogger(__name__)
 
 class GoogleService:
     @staticmethod
+    @timed('google.credentials')
     def get_credentials():
         """Get and refresh Google API credentials"""
         try:
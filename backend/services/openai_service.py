@@ -1,85 +1,349 @@
+import contextvars
 import json
 import logging
-from openai import OpenAI
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from types import SimpleNamespace
+from openai import APIConnectionError, APITimeoutError, InternalServerError, OpenAI, RateLimitError
 from config import Config
+from services import prompt_templates
+from services.content_index import ContentIndex
+from utils.content_validator import ContentValidator
+from utils.deadline import Deadline
+from utils.json_repair import repair_json
+from utils.metrics import (
+    LLM_DURATION, LLM_HEDGES, LLM_REPAIRS, LLM_RETRIES, LLM_SLIDES, LLM_TOKENS, record_cache, track
+)
+from utils.text_processor import TextProcessor
 
 logger = logging.getLogger(__name__)
 
+# Transient failures worth another attempt; other errors (bad request, auth) are raised at once
+_RETRYABLE = (APIConnectionError, APITimeoutError, InternalServerError, RateLimitError)
+
+class _Abandoned(Exception):
+    """A hedged request whose counterpart answered first"""
+
+def _slides_bucket(count):
+    """Latency key for a request asking for count slides: 1-4, 5-8, 9-12 or 13+"""
+    if count > 12:
+        return '13+'
+    low = (max(count, 1) - 1) // 4 * 4 + 1
+    return f"{low}-{low + 3}"
+
 class OpenAIService:
+    # Runs requests that may be hedged; shared by all instances
+    _pool = ThreadPoolExecutor(max_workers=Config.OPENAI_MAX_IN_FLIGHT, thread_name_prefix='llm')
+    
     def __init__(self):
-        self.client = OpenAI(api_key=Config.OPENAI_API_KEY)
+        # Retries happen in _complete, with backoff and metrics, rather than inside the client
+        self.client = OpenAI(api_key=Config.OPENAI_API_KEY, timeout=Config.OPENAI_TIMEOUT, max_retries=0)
+        self.content_index = None
+        if Config.CONTENT_REUSE_THRESHOLD > 0:
+            self.content_index = ContentIndex(
+                Config.CONTENT_INDEX_FILE, Config.CONTENT_INDEX_SIZE, Config.CONTENT_INDEX_DIMENSIONS
+            )
+    
+    def _complete(self, prompt, max_tokens, purpose, slides, deadline=None):
+        """One chat completion with the versioned system prompt, retried with backoff on transient errors
+        
+        slides is the number of slides asked for; latency is tracked per slide
+        count bucket, so hedging compares like with like. With a deadline, each
+        request's timeout is capped at the remaining budget and no retry is
+        started that could not finish in time.
+        """
+        model = Config.OPENAI_MODEL
+        request = {
+            'model': model,
+            'messages': [
+                {"role": "system", "content": prompt_templates.SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            'temperature': 0.7,
+            'max_tokens': max_tokens
+        }
+        if prompt_templates.supports_json_mode(model):
+            request['response_format'] = {"type": "json_object"}
+        
+        deadline = deadline or Deadline()
+        deadline.check(f"llm {purpose}")
+        labels = {'model': model, 'version': prompt_templates.PROMPT_VERSION, 'purpose': purpose}
+        with track('llm.completion', **labels):
+            for attempt in range(Config.OPENAI_MAX_RETRIES + 1):
+                if deadline.bounded:
+                    request['timeout'] = deadline.timeout(Config.OPENAI_TIMEOUT)
+                try:
+                    return self._hedged_request(request, labels, _slides_bucket(slides))
+                except _RETRYABLE as e:
+                    delay = Config.OPENAI_RETRY_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5)
+                    if attempt == Config.OPENAI_MAX_RETRIES or not deadline.fits(delay):
+                        raise
+                    LLM_RETRIES.inc(purpose=purpose, error=type(e).__name__)
+                    logger.warning(f"LLM {purpose} request failed ({str(e)}), retrying in {delay:.1f}s")
+                    time.sleep(delay)
+    
+    def _hedged_request(self, request, labels, slides):
+        """Send the request, and an identical hedge once it exceeds the configured latency quantile
+        
+        The delay runs from when the original is actually sent, not from when
+        it was queued for a pool thread. The first successful response wins;
+        the other is cancelled if still queued, or else abandoned: both are
+        streamed so the loser can close its response after the next chunk.
+        """
+        delay = None
+        if Config.OPENAI_HEDGE_QUANTILE:
+            delay = LLM_DURATION.quantile(
+                Config.OPENAI_HEDGE_QUANTILE, min_count=Config.OPENAI_HEDGE_MIN_SAMPLES, slides=slides, **labels
+            )
+        if delay is None:
+            return self._request(request, labels, slides)
+        
+        abandoned = threading.Event()
+        sent = threading.Event()
+        primary = self._pool.submit(contextvars.copy_context().run, self._request, request, labels, slides, abandoned, sent)
+        sent.wait()
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        
+        LLM_HEDGES.inc(purpose=labels['purpose'], outcome='sent')
+        hedge = self._pool.submit(contextvars.copy_context().run, self._request, request, labels, slides, abandoned)
+        errors = []
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        LLM_HEDGES.inc(purpose=labels['purpose'], outcome='won' if future is hedge else 'lost')
+                        return future.result()
+                    errors.append(future.exception())
+            raise errors[0]
+        finally:
+            abandoned.set()
+            for future in pending:
+                future.cancel()
     
-    def create_presentation_content(self, topic, description=""):
+    def _request(self, request, labels, slides, abandoned=None, sent=None):
+        """A single completion request; records its latency and token usage
+        
+        With abandoned (a threading.Event, for hedged requests) the reply is
+        streamed and the request gives up with _Abandoned once the event is
+        set. Streamed replies ask for usage in their final chunk; if none
+        comes, no tokens are recorded and the response's usage is None.
+        """
+        if sent is not None:
+            sent.set()
+        started = time.perf_counter()
+        if abandoned is None:
+            response = self.client.chat.completions.create(**request)
+            usage = response.usage
+        else:
+            response, usage = self._stream(request, abandoned)
+        elapsed = time.perf_counter() - started
+        LLM_DURATION.observe(elapsed, slides=slides, **labels)
+        
+        if usage is not None:
+            LLM_TOKENS.inc(usage.prompt_tokens, kind='prompt', **labels)
+            LLM_TOKENS.inc(usage.completion_tokens, kind='completion', **labels)
+            logger.info(f"LLM {labels['purpose']}: {usage.prompt_tokens} prompt + {usage.completion_tokens} "
+                        f"completion tokens in {elapsed:.2f}s")
+        return response
+    
+    def _stream(self, request, abandoned):
+        """Streamed completion collected into a (response, usage) pair shaped like the non-streamed one"""
+        # stream_options is passed as a body field: the pinned client predates the keyword
+        stream = self.client.chat.completions.create(
+            stream=True, extra_body={'stream_options': {'include_usage': True}}, **request
+        )
+        parts = []
+        usage = None
+        try:
+            for chunk in stream:
+                if abandoned.is_set():
+                    raise _Abandoned()
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                # Only the final chunk (with no choices) carries usage
+                chunk_usage = getattr(chunk, 'usage', None)
+                if chunk_usage:
+                    usage = chunk_usage
+        finally:
+            stream.response.close()
+        if isinstance(usage, dict):
+            # Not a declared field of this client version's chunk model
+            usage = SimpleNamespace(prompt_tokens=usage['prompt_tokens'], completion_tokens=usage['completion_tokens'])
+        message = SimpleNamespace(content=''.join(parts))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage), usage
+    
+    def create_presentation_content(self, topic, description="", slide_count=None, deadline=None):
         """Generate detailed presentation content with varied text formatting"""
         try:
-            logger.info(f"Generating content for topic: {topic}")
-            
-            prompt = f"""Create a detailed presentation outline for the topic: {topic}
-            Additional context: {description}
-            
-            Please provide rich, detailed content for each slide with varied text formatting.
-            Each slide should include a combination of these elements as appropriate:
-            1. A clear, concise title
-            2. An opening paragraph introducing the slide's topic
-            3. Detailed bullet points (4-6 points) with sub-bullets where relevant
-            4. Key statistics or data points
-            5. Specific examples or case studies
-            6. Concluding remarks or transition text
-            7. For visual slides, include a detailed diagram_prompt
-            
-            Format as JSON with the following structure:
-            {{
-                "title": "Main presentation title",
-                "slides": [
-                    {{
-                        "title": "Slide title",
-                        "content": [
-                            {{
-                                "type": "paragraph",
-                                "text": "Opening paragraph text..."
-                            }},
-                            {{
-                                "type": "bullets",
-                                "items": [
-                                    {{
-                                        "text": "Main bullet point",
-                                        "subitems": ["Sub-bullet 1", "Sub-bullet 2"]
-                                    }},
-                                    // More bullet points...
-                                ]
-                            }},
-                            {{
-                                "type": "stats",
-                                "items": ["Statistic 1: Value", "Statistic 2: Value"]
-                            }},
-                            {{
-                                "type": "conclusion",
-                                "text": "Concluding remark or transition"
-                            }}
-                        ],
-                        "diagram_prompt": "Optional. Detailed instructions for diagram generation"
-                    }}
-                ]
-            }}
-
-            Make the content substantial and informative, with proper flow between points.
-            """
-            
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=3000  # Increased for more detailed content
+            deadline = deadline or Deadline()
+            slide_count = slide_count or Config.DEFAULT_SLIDE_COUNT
+            
+            reused = self._reuse_content(topic, description, slide_count)
+            if reused is not None:
+                return reused
+            
+            logger.info(f"Generating {slide_count} slides for topic: {topic}")
+            
+            response = self._complete(
+                prompt_templates.deck_prompt(topic, description, slide_count),
+                prompt_templates.max_tokens_for(slide_count, Config.OPENAI_DECK_MIN_TOKENS),
+                purpose='deck',
+                slides=slide_count,
+                deadline=deadline
             )
             
             content = response.choices[0].message.content
-            parsed_content = json.loads(content)
+            with track('llm.json_parse'):
+                parsed_content, truncated = repair_json(content)
+            
+            errors = ContentValidator.presentation_errors(parsed_content)
+            if errors:
+                raise ValueError(f"Invalid content structure received from GPT-4: {'; '.join(errors)}")
+            # Sizes later budgets; see prompt_templates.tokens_per_slide. Only counted
+            # alongside the reply's completion tokens, so the ratio stays tokens per slide
+            if response.usage is not None:
+                LLM_SLIDES.inc(
+                    len(parsed_content['slides']),
+                    model=Config.OPENAI_MODEL, version=prompt_templates.PROMPT_VERSION, purpose='deck'
+                )
+            
+            slides, invalid = ContentValidator.split_slides(parsed_content)
+            if truncated:
+                LLM_REPAIRS.inc(kind='truncated')
+            if invalid:
+                LLM_REPAIRS.inc(len(invalid), kind='invalid_slide')
+            if (truncated or invalid) and not deadline.fits(Deadline.estimate('llm.completion')):
+                deadline.degrade('llm', 'follow_up_skipped', slides_kept=len(slides))
+                parsed_content['slides'] = slides
+            elif truncated or invalid:
+                # Keep the good slides and only ask again for what is missing
+                parsed_content['slides'] = self._complete_slides(
+                    parsed_content, slides, invalid, truncated, slide_count, deadline
+                )
             
-            if not isinstance(parsed_content, dict) or 'title' not in parsed_content or 'slides' not in parsed_content:
-                raise ValueError("Invalid content structure received from GPT-4")
+            if not parsed_content['slides']:
+                raise ValueError("No valid slides received from GPT-4")
             
+            # Fit over-long slides to their text boxes locally rather than asking again
+            with track('text.fit'):
+                TextProcessor.fit_deck(parsed_content)
+            
+            if self.content_index is not None:
+                self.content_index.add(topic, description, slide_count, parsed_content)
             return parsed_content
             
         except Exception as e:
             logger.error(f"Error generating presentation content: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+    
+    def _reuse_content(self, topic, description, slide_count):
+        """Content generated earlier for a near-duplicate request, retitled for this topic, or None"""
+        if self.content_index is None:
+            return None
+        with track('content.lookup'):
+            entry, similarity = self.content_index.lookup(topic, description, slide_count)
+        if entry is None:
+            record_cache('content_index', misses=1)
+            return None
+        
+        record_cache('content_index', hits=1)
+        logger.info(f"Reusing content generated for '{entry['topic']}' (similarity {similarity:.2f}) for topic: {topic}")
+        content = entry['content']
+        if entry['topic'].strip().lower() != topic.strip().lower():
+            # A paraphrased request names its own deck; the slides carry over unchanged
+            content['title'] = topic
+        return content
+    
+    def _complete_slides(self, content, slides, invalid, truncated, slide_count, deadline=None):
+        """Re-request malformed slides and, after truncation, the remaining ones; returns the merged slides"""
+        # Invalid slides are replaced in place; only the slides never received are continued
+        missing = max(0, slide_count - len(content['slides'])) if truncated else 0
+        if not invalid and not missing:
+            return slides
+        LLM_REPAIRS.inc(kind='rerequest')
+        logger.info(f"Re-requesting {len(invalid)} invalid slide(s) and {missing} missing slide(s)")
+        
+        outline = "\n".join(f"- {slide.get('title', '(untitled)') if isinstance(slide, dict) else '(invalid)'}"
+                             for slide in content['slides'])
+        tasks = []
+        if invalid:
+            broken = json.dumps([slide for _, slide, _ in invalid], separators=(',', ':'))
+            errors = "; ".join(error for _, _, slide_errors in invalid for error in slide_errors)
+            tasks.append(f"Rewrite these malformed slides so they match the structure ({errors}):\n{broken}\n"
+                         f'Return them in order as "replacements".')
+        if missing:
+            tasks.append(f'The previous reply was cut off after the slides listed above. Return the remaining {missing} '
+                         f'slide(s) of the {slide_count}-slide presentation as "continuation".')
+        
+        try:
+            response = self._complete(
+                prompt_templates.completion_prompt(content['title'], outline, "\n".join(tasks)),
+                prompt_templates.max_tokens_for(len(invalid) + missing),
+                purpose='follow_up',
+                slides=len(invalid) + missing,
+                deadline=deadline
+            )
+            with track('llm.json_parse'):
+                follow_up, _ = repair_json(response.choices[0].message.content)
+            if not isinstance(follow_up, dict):
+                raise ValueError("Follow-up reply is not a JSON object")
+        except Exception as e:
+            logger.error(f"Follow-up request failed, keeping {len(slides)} valid slide(s): {str(e)}")
+            return slides
+        
+        # Put valid replacements back at their original positions
+        replacements = iter(follow_up.get('replacements') or [])
+        invalid_indices = {index for index, _, _ in invalid}
+        merged = []
+        for index, slide in enumerate(content['slides']):
+            if index in invalid_indices:
+                slide = next(replacements, None)
+            if slide is not None and not ContentValidator.slide_errors(slide):
+                merged.append(ContentValidator.validate_slide_content(slide))
+        
+        for slide in (follow_up.get('continuation') or [])[:missing]:
+            if not ContentValidator.slide_errors(slide):
+                merged.append(ContentValidator.validate_slide_content(slide))
+        return merged
+    
+    def regenerate_slides(self, deck_content, indices, instructions=""):
+        """Rewrite selected slides of an existing deck; returns {index: new slide content}"""
+        try:
+            logger.info(f"Regenerating slides {indices} of: {deck_content['title']}")
+            
+            outline = "\n".join(
+                f"{index + 1}. {slide['title']}" for index, slide in enumerate(deck_content['slides'])
+            )
+            current = json.dumps([deck_content['slides'][index] for index in indices], separators=(',', ':'))
+            
+            response = self._complete(
+                prompt_templates.regenerate_prompt(deck_content['title'], outline, current, instructions, len(indices)),
+                prompt_templates.max_tokens_for(len(indices)),
+                purpose='regenerate',
+                slides=len(indices)
+            )
+            
+            with track('llm.json_parse'):
+                slides, _ = repair_json(response.choices[0].message.content)
+                slides = slides.get('slides') if isinstance(slides, dict) else None
+            
+            if not isinstance(slides, list) or len(slides) != len(indices):
+                raise ValueError("Invalid slide structure received from GPT-4")
+            for index, slide in zip(indices, slides):
+                errors = ContentValidator.slide_errors(slide, f"slide {index}")
+                if errors:
+                    raise ValueError(f"Invalid slide received from GPT-4: {'; '.join(errors)}")
+            
+            with track('text.fit'):
+                TextProcessor.fit_deck({'slides': slides})
+            return dict(zip(indices, slides))
+            
+        except Exception as e:
+            logger.error(f"Error regenerating slides: {str(e)}")
+            raise
@@ -0,0 +1,131 @@
+import io
+import logging
+from pptx import Presentation
+from pptx.dml.color import RGBColor
+from pptx.enum.text import MSO_AUTO_SIZE
+from pptx.util import Pt
+from config import Config
+from services.diagram_service import DiagramService
+from services.renderer import PresentationRenderer
+from utils.metrics import track
+
+logger = logging.getLogger(__name__)
+
+# Same page geometry as Google Slides (16:9, 720 x 405 PT)
+SLIDE_WIDTH, SLIDE_HEIGHT = 720, 405
+
+def rgb_dict_to_color(rgb_dict):
+    return RGBColor(
+        int(rgb_dict['red'] * 255),
+        int(rgb_dict['green'] * 255),
+        int(rgb_dict['blue'] * 255)
+    )
+
+class PptxService(PresentationRenderer):
+    """Renders decks to a local .pptx file, without any Google API calls"""
+
+    def _apply_background(self, slide, theme):
+        fill = slide.background.fill
+        if 'gradient_color' in theme:
+            fill.gradient()
+            fill.gradient_angle = 45
+            stops = fill.gradient_stops
+            stops[0].color.rgb = rgb_dict_to_color(theme['background_color'])
+            stops[1].color.rgb = rgb_dict_to_color(theme['gradient_color'])
+        else:
+            fill.solid()
+            fill.fore_color.rgb = rgb_dict_to_color(theme['background_color'])
+
+    def _add_text(self, slide, text, left, top, width, height, size, color, bold=False, line_spacing=None):
+        text_frame = slide.shapes.add_textbox(Pt(left), Pt(top), Pt(width), Pt(height)).text_frame
+        text_frame.word_wrap = True
+        text_frame.auto_size = MSO_AUTO_SIZE.TEXT_TO_FIT_SHAPE
+
+        for index, line in enumerate(text.split('\n')):
+            paragraph = text_frame.paragraphs[0] if index == 0 else text_frame.add_paragraph()
+            paragraph.text = line
+            if line_spacing:
+                paragraph.line_spacing = line_spacing
+            font = paragraph.font
+            font.size = Pt(size)
+            font.bold = bold
+            font.color.rgb = rgb_dict_to_color(color)
+
+    def _add_image(self, slide, image):
+        """Place a PIL image on the right side of a slide, fitted inside the diagram box"""
+        box_width, box_height = Config.DIAGRAM_DISPLAY_SIZE  # PT
+        scale = min(box_width / image.width, box_height / image.height)
+        width, height = image.width * scale, image.height * scale
+        left = SLIDE_WIDTH - box_width - 30 + (box_width - width) / 2
+        top = 150 + (box_height - height) / 2
+
+        stream = io.BytesIO()
+        with track('image.encode'):
+            image.save(stream, format='PNG')
+        stream.seek(0)
+        slide.shapes.add_picture(stream, Pt(left), Pt(top), Pt(width), Pt(height))
+
+    def _generate_diagrams(self, content, diagram_options):
+        """Diagram images by slide index, generated in one batched pipeline call"""
+        indices = [index for index, slide in enumerate(content['slides']) if slide.get('diagram_prompt')]
+        if not indices:
+            return {}
+
+        try:
+            images = DiagramService.get_instance().generate_images(
+                [content['slides'][index]['diagram_prompt'] for index in indices],
+                **(diagram_options or {})
+            )
+        except Exception as e:
+            logger.error(f"Error generating diagrams, rendering without them: {str(e)}")
+            return {}
+        return dict(zip(indices, images))
+
+    def create_presentation(self, content, theme_name='modern', diagram_options=None, progress=None):
+        """Render content to a .pptx file; returns it as an in-memory stream"""
+        progress = progress or (lambda event, **data: None)
+        theme = self._get_theme(theme_name)
+        primary = theme['primary_color']
+        secondary = theme.get('secondary_color', theme['primary_color'])
+
+        diagrams = self._generate_diagrams(content, diagram_options)
+        if diagrams:
+            progress('diagram_done', completed=len(diagrams), total=len(diagrams))
+
+        with track('pptx.render'):
+            presentation = Presentation()
+            presentation.slide_width = Pt(SLIDE_WIDTH)
+            presentation.slide_height = Pt(SLIDE_HEIGHT)
+            blank_layout = presentation.slide_layouts[6]
+
+            # Title slide
+            slide = presentation.slides.add_slide(blank_layout)
+            self._apply_background(slide, theme)
+            self._add_text(slide, content['title'], 40, 150, SLIDE_WIDTH - 80, 80, 36, primary, bold=True)
+
+            total_slides = len(content['slides'])
+            for index, slide_content in enumerate(content['slides']):
+                slide = presentation.slides.add_slide(blank_layout)
+                self._apply_background(slide, theme)
+                self._add_text(slide, slide_content['title'], 30, 25, SLIDE_WIDTH - 60, 50, 24, primary, bold=True)
+
+                # Two-column layout when the slide carries a diagram, as in the Slides backend
+                image = diagrams.get(index)
+                body_width = SLIDE_WIDTH - Config.DIAGRAM_DISPLAY_SIZE[0] - 90 if image else SLIDE_WIDTH - 60
+                self._add_text(
+                    slide,
+                    self._format_content(slide_content['content']),
+                    30, 90, body_width, SLIDE_HEIGHT - 110,
+                    14, secondary,
+                    line_spacing=1.5
+                )
+                if image is not None:
+                    self._add_image(slide, image)
+
+                progress('slide_created', slide_index=index, completed=index + 1, total=total_slides)
+
+        stream = io.BytesIO()
+        with track('pptx.save'):
+            presentation.save(stream)
+        stream.seek(0)
+        return stream
@@ -3,20 +3,67 @@ from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload
 from googleapiclient.errors import HttpError
 import os
+import tempfile
+import threading
+import uuid
+from PIL import Image, ImageDraw
 from config import Config
+from services.diagram_jobs import DiagramJobManager
 from services.diagram_service import DiagramService
+from services.deck_store import DeckStore
+from services.renderer import PresentationRenderer
 from utils.content_validator import ContentValidator
+from utils.deadline import Deadline
+from utils.metrics import API_CALLS_PER_DECK, STAGE_DURATION, track
+from utils.rate_limiter import TokenBucket
+from utils.tracing import span
 from utils.text_processor import TextProcessor
 
 logger = logging.getLogger(__name__)
 
-class PresentationService:
+def _utf16_length(text):
+    """Slides API text indices count UTF-16 code units"""
+    return len(text.encode('utf-16-le')) // 2
+
+def _text_diff(old, new):
+    """Smallest single edit turning old into new: (start, end, text) in UTF-16 units, or None if equal"""
+    if old == new:
+        return None
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[len(old) - 1 - suffix] == new[len(new) - 1 - suffix]:
+        suffix += 1
+    start = _utf16_length(old[:prefix])
+    end = _utf16_length(old[:len(old) - suffix])
+    return start, end, new[prefix:len(new) - suffix]
+
+class PresentationService(PresentationRenderer):
+    # Drive URL of the uploaded placeholder image, per images folder
+    _placeholder_urls = {}
+    _placeholder_lock = threading.Lock()
+    # Slides write quota is per user, so writes are paced across all requests in the process
+    _write_limiter = TokenBucket(Config.SLIDES_WRITE_QPS, Config.SLIDES_WRITE_BURST)
+
     def __init__(self, credentials):
         self.credentials = credentials
+        self.api_calls = 0
         self.service = build('slides', 'v1', credentials=credentials)
         self.drive_service = build('drive', 'v3', credentials=credentials)
         self.images_folder_id = self._get_or_create_images_folder()
 
+    def _execute(self, request, stage):
+        """Execute a Slides/Drive API request, timing it as a pipeline stage"""
+        self.api_calls += 1
+        if stage in ('slides.create', 'slides.batch_update'):
+            waited = PresentationService._write_limiter.acquire()
+            if waited:
+                STAGE_DURATION.observe(waited, stage='slides.quota_wait')
+        with track(stage):
+            return request.execute()
+
     def _rgb_to_text_color_dict(self, rgb_dict):
         """Convert RGB dictionary to proper Google Slides text color format"""
         return {
@@ -31,65 +78,70 @@ class PresentationService:
             'rgbColor': rgb_dict
         }
 
-    def _apply_theme(self, presentation_id, theme_name='modern'):
-        """Apply theme to the presentation with proper color formatting"""
-        try:
-            theme = Config.PRESENTATION_THEMES.get(theme_name, Config.PRESENTATION_THEMES['modern'])
-            
-            presentation = self.service.presentations().get(
-                presentationId=presentation_id
-            ).execute()
-            
-            slide_ids = [slide.get('objectId') for slide in presentation.get('slides', [])]
-            requests = []
-            
-            for slide_id in slide_ids:
-                if 'gradient_color' in theme:
-                    requests.append({
-                        'updatePageProperties': {
-                            'objectId': slide_id,
-                            'pageProperties': {
-                                'pageBackgroundFill': {
-                                    'gradientFill': {
-                                        'gradient': {
-                                            'type': 'LINEAR',
-                                            'stops': [
-                                                {
-                                                    'position': 0,
-                                                    'color': self._rgb_to_fill_color_dict(theme['background_color'])
-                                                },
-                                                {
-                                                    'position': 1,
-                                                    'color': self._rgb_to_fill_color_dict(theme['gradient_color'])
-                                                }
-                                            ]
+    def _background_request(self, slide_id, theme):
+        """updatePageProperties giving a slide the theme's background (gradient or solid)"""
+        if 'gradient_color' in theme:
+            return {
+                'updatePageProperties': {
+                    'objectId': slide_id,
+                    'pageProperties': {
+                        'pageBackgroundFill': {
+                            'gradientFill': {
+                                'gradient': {
+                                    'type': 'LINEAR',
+                                    'stops': [
+                                        {
+                                            'position': 0,
+                                            'color': self._rgb_to_fill_color_dict(theme['background_color'])
+                                        },
+                                        {
+                                            'position': 1,
+                                            'color': self._rgb_to_fill_color_dict(theme['gradient_color'])
                                         }
-                                    }
+                                    ]
                                 }
-                            },
-                            'fields': 'pageBackgroundFill.gradientFill'
+                            }
                         }
-                    })
-                else:
-                    requests.append({
-                        'updatePageProperties': {
-                            'objectId': slide_id,
-                            'pageProperties': {
-                                'pageBackgroundFill': {
-                                    'solidFill': {
-                                        'color': self._rgb_to_fill_color_dict(theme['background_color'])
-                                    }
-                                }
-                            },
-                            'fields': 'pageBackgroundFill.solidFill'
+                    },
+                    'fields': 'pageBackgroundFill.gradientFill'
+                }
+            }
+        return {
+            'updatePageProperties': {
+                'objectId': slide_id,
+                'pageProperties': {
+                    'pageBackgroundFill': {
+                        'solidFill': {
+                            'color': self._rgb_to_fill_color_dict(theme['background_color'])
                         }
-                    })
+                    }
+                },
+                'fields': 'pageBackgroundFill.solidFill'
+            }
+        }
+
+    def _apply_theme(self, presentation_id, theme_name='modern', slide_ids=None):
+        """Apply theme to the presentation with proper color formatting
+
+        slide_ids limits it to those slides (e.g. recreated ones); by default
+        every slide of the presentation is themed.
+        """
+        try:
+            theme = Config.PRESENTATION_THEMES.get(theme_name, Config.PRESENTATION_THEMES['modern'])
+            
+            if slide_ids is None:
+                presentation = self._execute(self.service.presentations().get(
+                    presentationId=presentation_id
+                ), 'slides.get')
+                slide_ids = [slide.get('objectId') for slide in presentation.get('slides', [])]
+            
+            requests = [self._background_request(slide_id, theme) for slide_id in slide_ids]
             
             if requests:
-                self.service.presentations().batchUpdate(
+                self._execute(self.service.presentations().batchUpdate(
                     presentationId=presentation_id,
                     body={'requests': requests}
-                ).execute()
+                ), 'slides.batch_update')
             
             logger.info(f"Applied theme {theme_name} to presentation {presentation_id}")
             
@@ -103,11 +155,11 @@ class PresentationService:
             folder_name = "SlidesAI_Images"
             query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
             
-            results = self.drive_service.files().list(
+            results = self._execute(self.drive_service.files().list(
                 q=query,
                 spaces='drive',
                 fields='files(id, name)'
-            ).execute()
+            ), 'drive.list')
             
             existing_folders = results.get('files', [])
             
@@ -120,10 +172,10 @@ class PresentationService:
                 'mimeType': 'application/vnd.google-apps.folder'
             }
             
-            folder = self.drive_service.files().create(
+            folder = self._execute(self.drive_service.files().create(
                 body=folder_metadata,
                 fields='id'
-            ).execute()
+            ), 'drive.create')
             
             folder_id = folder.get('id')
             logger.info(f"Created new images folder: {folder_id}")
@@ -159,39 +211,6 @@ class PresentationService:
         
         return ranges
 
-    def _format_content(self, content_blocks):
-        """Format varied content types into slide text"""
-        formatted_text = ""
-        
-        for block in content_blocks:
-            block_type = block.get('type', '')
-            
-            if block_type == 'paragraph':
-                formatted_text += f"{block['text']}\n\n"
-            
-            elif block_type == 'bullets':
-                for item in block['items']:
-                    if isinstance(item, dict):
-                        # Main bullet with sub-bullets
-                        formatted_text += f"• {item['text']}\n"
-                        for subitem in item.get('subitems', []):
-                            formatted_text += f"    ◦ {subitem}\n"
-                    else:
-                        # Simple bullet point
-                        formatted_text += f"• {item}\n"
-                formatted_text += "\n"
-            
-            elif block_type == 'stats':
-                formatted_text += "Key Statistics:\n"
-                for stat in block['items']:
-                    formatted_text += f"📊 {stat}\n"
-                formatted_text += "\n"
-            
-            elif block_type == 'conclusion':
-                formatted_text += f"\n{block['text']}\n"
-        
-        return formatted_text.strip()
-    
     def _create_text_style_request(self, object_id, range_info, style_type):
         """Create a properly formatted text style request"""
         base_request = {
@@ -249,8 +268,50 @@ class PresentationService:
         
         return base_request
     
+    def _title_style_requests(self, title_id, theme):
+        """Theme styling for a slide title"""
+        return [{
+            'updateTextStyle': {
+                'objectId': title_id,
+                'style': {
+                    'fontSize': {'magnitude': 24, 'unit': 'PT'},
+                    'bold': True,
+                    'foregroundColor': self._rgb_to_text_color_dict(theme['primary_color'])
+                },
+                'fields': 'fontSize,bold,foregroundColor'
+            }
+        }]
+    
+    def _body_style_requests(self, body_id, theme):
+        """Theme styling for a slide body"""
+        secondary_color = self._rgb_to_text_color_dict(theme.get('secondary_color', theme['primary_color']))
+        return [
+            {
+                'updateTextStyle': {
+                    'objectId': body_id,
+                    'style': {
+                        'fontSize': {'magnitude': 14, 'unit': 'PT'},
+                        'foregroundColor': secondary_color
+                    },
+                    'fields': 'fontSize,foregroundColor'
+                }
+            },
+            {
+                'updateParagraphStyle': {
+                    'objectId': body_id,
+                    'style': {
+                        'lineSpacing': 150,
+                        'spaceAbove': {'magnitude': 10, 'unit': 'PT'},
+                        'spaceBelow': {'magnitude': 10, 'unit': 'PT'},
+                        'indentStart': {'magnitude': 20, 'unit': 'PT'}
+                    },
+                    'fields': 'lineSpacing,spaceAbove,spaceBelow,indentStart'
+                }
+            }
+        ]
+    
     def _create_slide(self, presentation_id, index, slide_content, theme_name='modern'):
-        """Create a slide with themed formatting"""
+        """Create a slide with themed formatting and return its element object IDs"""
         try:
             theme = Config.PRESENTATION_THEMES.get(theme_name, Config.PRESENTATION_THEMES['modern'])
             
@@ -266,10 +327,10 @@ class PresentationService:
                 }
             }]
             
-            response = self.service.presentations().batchUpdate(
+            response = self._execute(self.service.presentations().batchUpdate(
                 presentationId=presentation_id,
                 body={'requests': requests}
-            ).execute()
+            ), 'slides.batch_update')
             
             slide_id = response.get('replies')[0]['createSlide']['objectId']
             slide_details = self._get_slide_details(presentation_id, slide_id)
@@ -277,10 +338,6 @@ class PresentationService:
             
             formatted_text = self._format_content(slide_content['content'])
             
-            # Convert colors to proper format for text
-            primary_color = self._rgb_to_text_color_dict(theme['primary_color'])
-            secondary_color = self._rgb_to_text_color_dict(theme.get('secondary_color', theme['primary_color']))
-            
             text_requests = [
                 {
                     'insertText': {
@@ -293,41 +350,10 @@ class PresentationService:
                         'objectId': body_id,
                         'text': formatted_text
                     }
-                },
-                {
-                    'updateTextStyle': {
-                        'objectId': title_id,
-                        'style': {
-                            'fontSize': {'magnitude': 24, 'unit': 'PT'},
-                            'bold': True,
-                            'foregroundColor': primary_color
-                        },
-                        'fields': 'fontSize,bold,foregroundColor'
-                    }
-                },
-                {
-                    'updateTextStyle': {
-                        'objectId': body_id,
-                        'style': {
-                            'fontSize': {'magnitude': 14, 'unit': 'PT'},
-                            'foregroundColor': secondary_color
-                        },
-                        'fields': 'fontSize,foregroundColor'
-                    }
-                },
-                {
-                    'updateParagraphStyle': {
-                        'objectId': body_id,
-                        'style': {
-                            'lineSpacing': 150,
-                            'spaceAbove': {'magnitude': 10, 'unit': 'PT'},
-                            'spaceBelow': {'magnitude': 10, 'unit': 'PT'},
-                            'indentStart': {'magnitude': 20, 'unit': 'PT'}
-                        },
-                        'fields': 'lineSpacing,spaceAbove,spaceBelow,indentStart'
-                    }
                 }
             ]
+            text_requests += self._title_style_requests(title_id, theme)
+            text_requests += self._body_style_requests(body_id, theme)
             
             if has_image:
                 text_requests.append({
@@ -345,57 +371,337 @@ class PresentationService:
                 })
             
             # Execute text updates
-            self.service.presentations().batchUpdate(
+            self._execute(self.service.presentations().batchUpdate(
                 presentationId=presentation_id,
                 body={'requests': text_requests}
-            ).execute()
+            ), 'slides.batch_update')
             
-            return slide_id
+            return {'slide_id': slide_id, 'title_id': title_id, 'body_id': body_id, 'image_object_id': None}
             
         except Exception as e:
             logger.error(f"Error creating slide {index + 1}: {str(e)}")
             raise
     
-    def create_presentation(self, content, theme_name='modern'):
-        """Create a new presentation with theme"""
+    def create_presentation(self, content, theme_name='modern', diagram_options=None, progress=None, *,
+                            async_diagrams=False, diagram_sink=None, deadline=None):
+        """Create a new presentation with theme
+
+        diagram_options are passed to DiagramService.generate_diagram (profile,
+        adapter, ...). With async_diagrams the deck is returned once the text slides exist;
+        diagram slides get a placeholder image that is swapped for the
+        generated diagram in the background (see DiagramJobManager).
+        progress, if given, is called as progress(event, **data) as each stage completes.
+        diagram_sink(presentation_id, jobs), if given, receives the async diagram jobs
+        instead of DiagramJobManager (used to pool diagrams across decks).
+        deadline, a utils.deadline.Deadline, makes synchronous diagrams degrade to
+        the fast profile or be skipped (the whole deck then being text-only) when
+        they no longer fit the remaining budget; see deadline.degraded.
+        """
+        progress = progress or (lambda event, **data: None)
+        deadline = deadline or Deadline()
         try:
+            deadline.check('slides')
+            api_calls_before = self.api_calls
+            total_slides = len(content['slides'])
+            total_diagrams = sum(1 for slide in content['slides'] if slide.get('diagram_prompt'))
+            diagrams_done = 0
+            
+            text_only = False
+            if total_diagrams and not async_diagrams and deadline.bounded:
+                text_cost = Deadline.estimate('slides.create') + Deadline.estimate('slides.batch_update', total_slides + 1)
+                if not deadline.fits(text_cost + self._diagram_cost() * Config.DEADLINE_FAST_PROFILE_FACTOR):
+                    deadline.degrade('diagrams', 'text_only', skipped=total_diagrams)
+                    text_only = True
+            
             # Create presentation
-            presentation = self.service.presentations().create(
+            presentation = self._execute(self.service.presentations().create(
                 body={'title': content['title']}
-            ).execute()
+            ), 'slides.create')
             
             presentation_id = presentation.get('presentationId')
+            progress('presentation_created', presentation_id=presentation_id)
             
             # Apply theme first
             self._apply_theme(presentation_id, theme_name)
 
             # Initialize diagram service if needed
-            diagram_service = DiagramService()
+            diagram_service = None if async_diagrams or text_only else DiagramService.get_instance()
+            diagram_jobs = []
+            slide_elements = []
+            # Slides as built; content itself is shared with coalesced and bulk callers and stays untouched
+            built_slides = list(content['slides'])
             
             # Create slides
             for index, slide_content in enumerate(content['slides']):
-                slide_id = self._create_slide(presentation_id, index, slide_content, theme_name)
-                
-                # Generate and insert diagram if needed
-                if 'diagram_prompt' in slide_content and slide_content['diagram_prompt']:
-                    try:
-                        image_path = diagram_service.generate_diagram(slide_content['diagram_prompt'])
-                        self.insert_diagram(presentation_id, slide_id, image_path)
-                    except Exception as e:
-                        logger.error(f"Error generating/inserting diagram for slide {index + 1}: {str(e)}")
+                with span('slide', slide_index=index):
+                    fitted_options = diagram_options or {}
+                    if slide_content.get('diagram_prompt') and not async_diagrams:
+                        if text_only:
+                            fitted_options = None
+                        else:
+                            fitted_options = self._fit_diagram(deadline, total_slides - index, diagram_options, index)
+                        if fitted_options is None:
+                            # Built with the full-width text layout, as if it never had a diagram
+                            slide_content = {key: value for key, value in slide_content.items() if key != 'diagram_prompt'}
+                            built_slides[index] = slide_content
+                            diagrams_done += 1
+                            progress('diagram_skipped', slide_index=index, completed=diagrams_done,
+                                     total=total_diagrams, reason='deadline')
+                    
+                    elements = self._create_slide(presentation_id, index, slide_content, theme_name)
+                    slide_elements.append(elements)
+                    slide_id = elements['slide_id']
+                    progress('slide_created', slide_index=index, completed=index + 1, total=total_slides)
+                    
+                    # Generate and insert diagram if needed
+                    if 'diagram_prompt' in slide_content and slide_content['diagram_prompt']:
+                        try:
+                            if async_diagrams:
+                                elements['image_object_id'] = self.insert_placeholder(presentation_id, slide_id)
+                                diagram_jobs.append({
+                                    'slide_index': index,
+                                    'slide_id': slide_id,
+                                    'image_object_id': elements['image_object_id'],
+                                    'prompt': slide_content['diagram_prompt']
+                                })
+                                continue
+                            
+                            image_path = diagram_service.generate_diagram(
+                                slide_content['diagram_prompt'],
+                                **fitted_options
+                            )
+                            elements['image_object_id'] = self.insert_diagram(presentation_id, slide_id, image_path)
+                            diagrams_done += 1
+                            progress('diagram_done', slide_index=index, completed=diagrams_done, total=total_diagrams)
+                        except Exception as e:
+                            logger.error(f"Error generating/inserting diagram for slide {index + 1}: {str(e)}")
+                            diagrams_done += 1
+                            progress('diagram_failed', slide_index=index, completed=diagrams_done,
+                                     total=total_diagrams, error=str(e))
+            
+            if diagram_jobs:
+                if diagram_sink:
+                    diagram_sink(presentation_id, diagram_jobs)
+                else:
+                    DiagramJobManager.submit(presentation_id, diagram_jobs, self.credentials, diagram_options)
+                progress('diagrams_queued', count=len(diagram_jobs))
             
+            API_CALLS_PER_DECK.observe(self.api_calls - api_calls_before)
+            self._store_deck(presentation_id, {**content, 'slides': built_slides}, theme_name, diagram_options, slide_elements)
             return presentation_id
             
         except Exception as e:
             logger.error(f"Error creating presentation: {str(e)}")
             raise
     
+    @staticmethod
+    def _diagram_cost():
+        """Expected seconds to generate, upload and insert one diagram"""
+        return sum(Deadline.estimate(stage) for stage in ('diffusion.inference', 'drive.upload', 'slides.batch_update'))
+    
+    def _fit_diagram(self, deadline, slides_left, diagram_options, slide_index):
+        """Diagram options that fit the remaining budget, or None to skip the diagram
+        
+        Time for the text of the slides not yet built is reserved first. A
+        diagram that no longer fits at its usual cost falls back to
+        Config.DEADLINE_FAST_PROFILE.
+        """
+        diagram_options = diagram_options or {}
+        if not deadline.bounded:
+            return diagram_options
+        
+        reserved = Deadline.estimate('slides.batch_update', slides_left)
+        cost = self._diagram_cost()
+        if deadline.fits(reserved + cost):
+            return diagram_options
+        if (diagram_options.get('profile') != Config.DEADLINE_FAST_PROFILE
+                and deadline.fits(reserved + cost * Config.DEADLINE_FAST_PROFILE_FACTOR)):
+            deadline.degrade('diagrams', 'fast_profile', slide_index=slide_index)
+            return {**diagram_options, 'profile': Config.DEADLINE_FAST_PROFILE}
+        deadline.degrade('diagrams', 'skipped', slide_index=slide_index)
+        return None
+    
+    def copy_presentation(self, presentation_id, title=None):
+        """Copy a presentation in Drive and return the new presentation ID
+
+        Drive copies keep the Slides object IDs, so the copy gets the source's
+        DeckStore record (making it editable through update_slides) and the
+        diagrams still pending for the source are swapped into it as well.
+        """
+        try:
+            body = {'name': title} if title else {}
+            copy = self._execute(self.drive_service.files().copy(
+                fileId=presentation_id,
+                body=body,
+                fields='id'
+            ), 'drive.copy')
+            copy_id = copy.get('id')
+            
+            record = DeckStore.load(presentation_id)
+            if record is not None:
+                self._store_deck(copy_id, record['content'], record['theme'], record.get('diagram_options'), record['slides'])
+            
+            # Diagrams that finished while the copy was made may have left it a placeholder
+            for job in DiagramJobManager.add_copy(presentation_id, copy_id):
+                self.replace_image(copy_id, job['image_object_id'], job['image_url'])
+            return copy_id
+            
+        except Exception as e:
+            logger.error(f"Error copying presentation {presentation_id}: {str(e)}")
+            raise
+    
+    def _store_deck(self, presentation_id, content, theme_name, diagram_options, slide_elements):
+        """Record content and object IDs so slides can be edited incrementally later"""
+        try:
+            DeckStore.save({
+                'presentation_id': presentation_id,
+                'theme': theme_name,
+                'diagram_options': diagram_options or {},
+                'content': content,
+                'slides': slide_elements
+            })
+        except Exception as e:
+            logger.warning(f"Could not store deck {presentation_id}: {str(e)}")
+    
+    def _text_edit_requests(self, object_id, old_text, new_text, style_requests):
+        """deleteText/insertText for the changed span of a text element"""
+        diff = _text_diff(old_text, new_text)
+        if diff is None:
+            return []
+        
+        start, end, text = diff
+        requests = []
+        if end > start:
+            requests.append({
+                'deleteText': {
+                    'objectId': object_id,
+                    'textRange': {'type': 'FIXED_RANGE', 'startIndex': start, 'endIndex': end}
+                }
+            })
+        if text:
+            requests.append({
+                'insertText': {
+                    'objectId': object_id,
+                    'insertionIndex': start,
+                    'text': text
+                }
+            })
+        # Inserted text inherits the style around it; a full replacement has none left to inherit
+        if text and start == 0 and end == _utf16_length(old_text):
+            requests += style_requests
+        return requests
+    
+    def update_slides(self, presentation_id, new_slides):
+        """Apply edited content to existing slides with minimal Slides requests
+
+        new_slides maps content slide index -> new slide content. Title and body
+        changes become deleteText/insertText of the changed span only, and
+        diagrams are regenerated only where diagram_prompt changed (replaceImage),
+        all in one batchUpdate. A slide gaining or losing its diagram changes
+        layout, so it is recreated.
+        """
+        record = DeckStore.load(presentation_id)
+        if record is None:
+            raise KeyError(f"No stored content for presentation {presentation_id}")
+        
+        theme = self._get_theme(record['theme'])
+        diagram_options = record.get('diagram_options') or {}
+        slides = record['content']['slides']
+        requests = []
+        changed_prompts = {}
+        recreate = []
+        summary = {'updated': [], 'recreated': [], 'diagrams_regenerated': [], 'unchanged': []}
+        
+        for index, new_content in sorted(new_slides.items()):
+            old_content, elements = slides[index], record['slides'][index]
+            old_prompt, new_prompt = old_content.get('diagram_prompt'), new_content.get('diagram_prompt')
+            
+            if bool(old_prompt) != bool(new_prompt) or (new_prompt and not elements.get('image_object_id')):
+                recreate.append(index)
+                continue
+            
+            slide_requests = self._text_edit_requests(
+                elements['title_id'], old_content['title'], new_content['title'],
+                self._title_style_requests(elements['title_id'], theme)
+            )
+            slide_requests += self._text_edit_requests(
+                elements['body_id'],
+                self._format_content(old_content['content']),
+                self._format_content(new_content['content']),
+                self._body_style_requests(elements['body_id'], theme)
+            )
+            if new_prompt and new_prompt != old_prompt:
+                changed_prompts[index] = new_prompt
+            
+            if slide_requests or index in changed_prompts:
+                summary['updated'].append(index)
+            else:
+                summary['unchanged'].append(index)
+            requests += slide_requests
+            slides[index] = new_content
+        
+        if changed_prompts:
+            indices = list(changed_prompts)
+            images = DiagramService.get_instance().generate_images(
+                [changed_prompts[index] for index in indices],
+                **diagram_options
+            )
+            for index, image in zip(indices, images):
+                image_path = os.path.join(tempfile.gettempdir(), f"diagram_{uuid.uuid4().hex}.png")
+                with track('image.encode'):
+                    image.save(image_path)
+                image_url = self._upload_image(image_path)
+                self._remove_local_image(image_path)
+                requests.append({
+                    'replaceImage': {
+                        'imageObjectId': record['slides'][index]['image_object_id'],
+                        'url': image_url,
+                        'imageReplaceMethod': 'CENTER_INSIDE'
+                    }
+                })
+                summary['diagrams_regenerated'].append(index)
+        
+        if requests:
+            self._execute(self.service.presentations().batchUpdate(
+                presentationId=presentation_id,
+                body={'requests': requests}
+            ), 'slides.batch_update')
+        
+        for index in recreate:
+            new_content = new_slides[index]
+            self._execute(self.service.presentations().batchUpdate(
+                presentationId=presentation_id,
+                body={'requests': [{'deleteObject': {'objectId': record['slides'][index]['slide_id']}}]}
+            ), 'slides.batch_update')
+            elements = self._create_slide(presentation_id, index, new_content, record['theme'])
+            if new_content.get('diagram_prompt'):
+                try:
+                    image_path = DiagramService.get_instance().generate_diagram(
+                        new_content['diagram_prompt'],
+                        **diagram_options
+                    )
+                    elements['image_object_id'] = self.insert_diagram(presentation_id, elements['slide_id'], image_path)
+                    summary['diagrams_regenerated'].append(index)
+                except Exception as e:
+                    logger.error(f"Error generating/inserting diagram for slide {index + 1}: {str(e)}")
+            record['slides'][index] = elements
+            slides[index] = new_content
+            summary['recreated'].append(index)
+        
+        if recreate:
+            # New slides start from the layout's background, not the theme's
+            self._apply_theme(presentation_id, record['theme'], [record['slides'][index]['slide_id'] for index in recreate])
+        
+        DeckStore.save(record)
+        summary['requests'] = len(requests)
+        return summary
+    
     def _get_slide_details(self, presentation_id, slide_id):
         """Get slide details including element IDs"""
-        slide_response = self.service.presentations().get(
+        slide_response = self._execute(self.service.presentations().get(
             presentationId=presentation_id,
             fields='slides'
-        ).execute()
+        ), 'slides.get')
         
         title_id = None
         body_id = None
@@ -466,83 +772,144 @@ class PresentationService:
             }
         ]
     
+    def _upload_image(self, image_path):
+        """Upload an image to the Drive images folder and return a publicly readable URL"""
+        media = MediaFileUpload(
+            image_path, 
+            mimetype='image/png',
+            resumable=True
+        )
+        
+        file_metadata = {
+            'name': os.path.basename(image_path),
+            'parents': [self.images_folder_id]
+        }
+        
+        file = self._execute(self.drive_service.files().create(
+            body=file_metadata,
+            media_body=media,
+            fields='id, webContentLink'
+        ), 'drive.upload')
+        
+        image_id = file.get('id')
+        
+        # Set public access permission
+        self._execute(self.drive_service.permissions().create(
+            fileId=image_id,
+            body={
+                'type': 'anyone',
+                'role': 'reader',
+                'allowFileDiscovery': False
+            }
+        ), 'drive.permissions')
+        
+        # Format the correct image URL
+        return f"https://drive.google.com/uc?export=view&id={image_id}"
+    
+    def _remove_local_image(self, image_path):
+        try:
+            os.remove(image_path)
+        except Exception as e:
+            logger.warning(f"Could not delete temporary image file: {str(e)}")
+    
+    def _create_image(self, presentation_id, slide_id, image_url):
+        """Place an image on the right side of a slide and return its object ID"""
+        # Calculate positions for right-side placement
+        image_width, image_height = Config.DIAGRAM_DISPLAY_SIZE  # PT
+        right_margin = 30  # PT
+        image_x = 720 - image_width - right_margin
+        
+        # Create image with positioning for right side
+        requests = [{
+            'createImage': {
+                'url': image_url,
+                'elementProperties': {
+                    'pageObjectId': slide_id,
+                    'size': {
+                        'width': {'magnitude': image_width, 'unit': 'PT'},
+                        'height': {'magnitude': image_height, 'unit': 'PT'}
+                    },
+                    'transform': {
+                        'scaleX': 1,
+                        'scaleY': 1,
+                        'translateX': image_x,
+                        'translateY': 150,
+                        'unit': 'PT'
+                    }
+                }
+            }
+        }]
+        
+        # Execute the image insertion
+        response = self._execute(self.service.presentations().batchUpdate(
+            presentationId=presentation_id,
+            body={'requests': requests}
+        ), 'slides.batch_update')
+        
+        return response.get('replies')[0]['createImage']['objectId']
+    
     def insert_diagram(self, presentation_id, slide_id, image_path):
-        """Insert a diagram into a slide on the right side"""
+        """Insert a diagram into a slide on the right side and return the image object ID"""
         try:
             # Upload image to Google Drive
-            media = MediaFileUpload(
-                image_path, 
-                mimetype='image/png',
-                resumable=True
-            )
+            image_url = self._upload_image(image_path)
+            image_object_id = self._create_image(presentation_id, slide_id, image_url)
             
-            file_metadata = {
-                'name': os.path.basename(image_path),
-                'parents': [self.images_folder_id]
-            }
+            # Clean up local file
+            self._remove_local_image(image_path)
             
-            file = self.drive_service.files().create(
-                body=file_metadata,
-                media_body=media,
-                fields='id, webContentLink'
-            ).execute()
-            
-            image_id = file.get('id')
-            
-            # Set public access permission
-            self.drive_service.permissions().create(
-                fileId=image_id,
-                body={
-                    'type': 'anyone',
-                    'role': 'reader',
-                    'allowFileDiscovery': False
-                }
-            ).execute()
+            return image_object_id
             
-            # Format the correct image URL
-            image_url = f"https://drive.google.com/uc?export=view&id={image_id}"
+        except Exception as e:
+            logger.error(f"Error inserting diagram: {str(e)}")
+            raise
+    
+    def _get_placeholder_url(self):
+        """Upload the placeholder image once per images folder and reuse its URL"""
+        with PresentationService._placeholder_lock:
+            if self.images_folder_id not in PresentationService._placeholder_urls:
+                image = Image.new('RGB', Config.DIAGRAM_OUTPUT_SIZE, (235, 235, 235))
+                draw = ImageDraw.Draw(image)
+                text = "Generating diagram..."
+                text_x = (image.width - draw.textlength(text)) / 2
+                draw.text((text_x, image.height / 2), text, fill=(130, 130, 130))
+                
+                image_path = os.path.join(tempfile.gettempdir(), f"diagram_placeholder_{uuid.uuid4().hex}.png")
+                image.save(image_path)
+                PresentationService._placeholder_urls[self.images_folder_id] = self._upload_image(image_path)
+                self._remove_local_image(image_path)
             
-            # Calculate positions for right-side placement
-            image_width = 350  # PT
-            image_height = 250  # PT
-            right_margin = 30  # PT
-            image_x = 720 - image_width - right_margin
+            return PresentationService._placeholder_urls[self.images_folder_id]
+    
+    def insert_placeholder(self, presentation_id, slide_id):
+        """Insert a lightweight placeholder where the diagram will go and return its object ID"""
+        try:
+            return self._create_image(presentation_id, slide_id, self._get_placeholder_url())
+        except Exception as e:
+            logger.error(f"Error inserting diagram placeholder: {str(e)}")
+            raise
+    
+    def replace_diagram(self, presentation_id, image_object_id, image_path):
+        """Swap a generated diagram into an existing image (e.g. a placeholder); returns its Drive URL"""
+        try:
+            image_url = self._upload_image(image_path)
+            self.replace_image(presentation_id, image_object_id, image_url)
+            self._remove_local_image(image_path)
+            return image_url
             
-            # Create image with positioning for right side
-            requests = [{
-                'createImage': {
+        except Exception as e:
+            logger.error(f"Error replacing diagram: {str(e)}")
+            raise
+    
+    def replace_image(self, presentation_id, image_object_id, image_url):
+        """Point an existing image at an already uploaded image URL"""
+        self._execute(self.service.presentations().batchUpdate(
+            presentationId=presentation_id,
+            body={'requests': [{
+                'replaceImage': {
+                    'imageObjectId': image_object_id,
                     'url': image_url,
-                    'elementProperties': {
-                        'pageObjectId': slide_id,
-                        'size': {
-                            'width': {'magnitude': image_width, 'unit': 'PT'},
-                            'height': {'magnitude': image_height, 'unit': 'PT'}
-                        },
-                        'transform': {
-                            'scaleX': 1,
-                            'scaleY': 1,
-                            'translateX': image_x,
-                            'translateY': 150,
-                            'unit': 'PT'
-                        }
-                    }
+                    'imageReplaceMethod': 'CENTER_INSIDE'
                 }
-            }]
-            
-            # Execute the image insertion
-            self.service.presentations().batchUpdate(
-                presentationId=presentation_id,
-                body={'requests': requests}
-            ).execute()
-            
-            # Clean up local file
-            try:
-                os.remove(image_path)
-            except Exception as e:
-                logger.warning(f"Could not delete temporary image file: {str(e)}")
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error inserting diagram: {str(e)}")
-            raise
\ No newline at end of file
+            }]}
+        ), 'slides.batch_update')
\ No newline at end of file
@@ -0,0 +1,117 @@
+import functools
+import textwrap
+from xml.sax.saxutils import escape
+from config import Config
+from services.renderer import PresentationRenderer
+
+# Slide canvas in SVG user units (16:9, the Google Slides default page)
+WIDTH, HEIGHT = 320, 180
+LINE_HEIGHT = 9
+
+def rgb_dict_to_string(rgb_dict):
+    r = int(rgb_dict['red'] * 255)
+    g = int(rgb_dict['green'] * 255)
+    b = int(rgb_dict['blue'] * 255)
+    return f"rgb({r},{g},{b})"
+
+class PreviewService:
+    """Renders generated content as SVG slide thumbnails, without any Google API calls"""
+
+    @staticmethod
+    def _background(theme, gradient_id, width=WIDTH, height=HEIGHT):
+        background = rgb_dict_to_string(theme['background_color'])
+        if 'gradient_color' not in theme:
+            return f'<rect width="{width}" height="{height}" fill="{background}" />'
+        gradient_color = rgb_dict_to_string(theme['gradient_color'])
+        return f"""<defs>
+                <linearGradient id="{gradient_id}" x1="0%" y1="0%" x2="100%" y2="100%">
+                    <stop offset="0%" style="stop-color:{background};stop-opacity:1" />
+                    <stop offset="100%" style="stop-color:{gradient_color};stop-opacity:1" />
+                </linearGradient>
+            </defs>
+            <rect width="{width}" height="{height}" fill="url(#{gradient_id})" />"""
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def render_theme(theme_id):
+        """Memoized SVG sample of a configured theme, as shown by the frontend's theme picker"""
+        theme = Config.PRESENTATION_THEMES[theme_id]
+        primary = rgb_dict_to_string(theme['primary_color'])
+        secondary = rgb_dict_to_string(theme.get('secondary_color', theme['primary_color']))
+        accent = rgb_dict_to_string(theme.get('accent_color', theme['primary_color']))
+
+        # Previews share one document, so each gradient needs its own id
+        return f"""
+        <svg viewBox="0 0 200 150" xmlns="http://www.w3.org/2000/svg">
+            {PreviewService._background(theme, f"grad_{theme_id}", 200, 150)}
+            
+            <!-- Title bar -->
+            <rect x="20" y="20" width="160" height="30" fill="{primary}" opacity="0.9" />
+            
+            <!-- Content blocks -->
+            <rect x="20" y="60" width="70" height="70" fill="{secondary}" opacity="0.7" />
+            <rect x="100" y="60" width="80" height="70" fill="{accent}" opacity="0.7" />
+            
+            <!-- Text lines representation -->
+            <rect x="30" y="25" width="80" height="4" fill="white" opacity="0.9" />
+            <rect x="30" y="70" width="50" height="2" fill="white" opacity="0.8" />
+            <rect x="30" y="80" width="40" height="2" fill="white" opacity="0.8" />
+            <rect x="110" y="70" width="60" height="2" fill="white" opacity="0.8" />
+            <rect x="110" y="80" width="50" height="2" fill="white" opacity="0.8" />
+        </svg>
+        """
+
+    @staticmethod
+    def render_slide(slide_content, theme, index=0):
+        """SVG thumbnail of one slide, laid out like PresentationService._create_slide"""
+        primary = rgb_dict_to_string(theme['primary_color'])
+        secondary = rgb_dict_to_string(theme.get('secondary_color', theme['primary_color']))
+        accent = rgb_dict_to_string(theme.get('accent_color', theme['primary_color']))
+        has_image = bool(slide_content.get('diagram_prompt'))
+
+        # Two-column layout when the slide carries a diagram
+        body_width = 150 if has_image else 280
+        chars_per_line = body_width // 4
+
+        elements = [
+            f'<text x="20" y="28" font-size="13" font-weight="bold" fill="{primary}">'
+            f'{escape(textwrap.shorten(slide_content.get("title", ""), 45, placeholder="…"))}</text>'
+        ]
+
+        y = 48
+        for indent, text, style in PresentationRenderer.content_lines(slide_content.get('content', [])):
+            wrapped = textwrap.wrap(text, chars_per_line - indent * 4) or ['']
+            for line in wrapped:
+                if y > HEIGHT - 10:
+                    break
+                weight = ' font-weight="bold"' if style == 'heading' else ''
+                italic = ' font-style="italic"' if style == 'emphasis' else ''
+                elements.append(
+                    f'<text x="{20 + indent * 10}" y="{y}" font-size="6.5"{weight}{italic} fill="{secondary}">'
+                    f'{escape(line)}</text>'
+                )
+                y += LINE_HEIGHT
+
+        if has_image:
+            elements.append(
+                f'<rect x="180" y="45" width="120" height="86" rx="3" fill="{accent}" opacity="0.25" '
+                f'stroke="{accent}" stroke-dasharray="4 2" />'
+            )
+            for offset, line in enumerate(textwrap.wrap(slide_content['diagram_prompt'], 28)[:5]):
+                elements.append(
+                    f'<text x="186" y="{60 + offset * 9}" font-size="6" fill="{primary}">{escape(line)}</text>'
+                )
+
+        return f"""<svg viewBox="0 0 {WIDTH} {HEIGHT}" xmlns="http://www.w3.org/2000/svg" font-family="sans-serif">
+            {PreviewService._background(theme, f"slide_grad_{index}")}
+            {''.join(elements)}
+        </svg>"""
+
+    @staticmethod
+    def render_deck(content, theme_name='modern'):
+        """SVG thumbnails for every slide of generated content"""
+        theme = Config.PRESENTATION_THEMES.get(theme_name, Config.PRESENTATION_THEMES['modern'])
+        return [
+            PreviewService.render_slide(slide_content, theme, index)
+            for index, slide_content in enumerate(content['slides'])
+        ]
@@ -0,0 +1,80 @@
+from config import Config
+from utils.metrics import LLM_SLIDES, LLM_TOKENS
+from utils.text_processor import TextProcessor
+
+# Bump when a template changes; token and latency metrics are labelled with it
+PROMPT_VERSION = 'v3'
+
+SYSTEM_PROMPT = "You write presentation decks. Reply with one JSON object only."
+
+# Slide structure in one line instead of an indented example document
+SLIDE_SCHEMA_HINT = (
+    'slide={"title":str,"content":[block],"diagram_prompt"?:str}; '
+    'block={"type":"paragraph"|"conclusion","text":str}|'
+    '{"type":"bullets","items":[str|{"text":str,"subitems":[str]}]}|'
+    '{"type":"stats","items":[str]}'
+)
+
+# Completion tokens per slide assumed until TOKENS_MIN_SLIDES deck slides have been measured,
+# headroom over the per-slide mean so longer slides are not cut off, and tokens for the deck envelope
+TOKENS_PER_SLIDE = 320
+TOKENS_MIN_SLIDES = 40
+TOKENS_HEADROOM = 1.5
+TOKENS_OVERHEAD = 120
+
+def slide_length_hint():
+    """Body length limit as TextProcessor.fit_deck enforces it, so slides arrive fitting rather than get cut"""
+    chars, lines = TextProcessor.slide_budget(False)
+    diagram_chars, diagram_lines = TextProcessor.slide_budget(True)
+    return (
+        f"Slide body: at most {lines} lines of {chars} characters, or {diagram_lines} lines of {diagram_chars} "
+        f"characters with a diagram_prompt; a blank line separates blocks."
+    )
+
+def deck_prompt(topic, description, slide_count):
+    return (
+        f"Topic: {topic}\n"
+        f"Context: {description or 'none'}\n"
+        f"Write {slide_count} slides. Each has a one-sentence opening paragraph, 3-5 short bullets and either "
+        f"a key stat or a closing remark. Give a detailed diagram_prompt only where a visual helps.\n"
+        f"{slide_length_hint()}\n"
+        f'Reply: {{"title":str,"slides":[slide]}}; {SLIDE_SCHEMA_HINT}'
+    )
+
+def completion_prompt(title, outline, tasks):
+    return (
+        f'Deck: "{title}"\n'
+        f"Existing slides:\n{outline}\n"
+        f"{tasks}\n"
+        f"{slide_length_hint()}\n"
+        f'Reply: {{"replacements":[slide],"continuation":[slide]}}; {SLIDE_SCHEMA_HINT}'
+    )
+
+def regenerate_prompt(title, outline, current, instructions, count):
+    return (
+        f'Revise slides of the deck "{title}". Keep what the instructions do not ask to change.\n'
+        f"Outline:\n{outline}\n"
+        f"Instructions: {instructions or 'Improve clarity and depth.'}\n"
+        f"Current slides: {current}\n"
+        f"{slide_length_hint()}\n"
+        f'Reply: {{"slides":[slide]}} with exactly {count} slides in order; {SLIDE_SCHEMA_HINT}'
+    )
+
+def tokens_per_slide(model=None):
+    """Mean completion tokens per slide of deck replies (LLM_TOKENS / LLM_SLIDES)
+
+    TOKENS_PER_SLIDE until TOKENS_MIN_SLIDES slides have been measured.
+    """
+    labels = {'model': model or Config.OPENAI_MODEL, 'version': PROMPT_VERSION, 'purpose': 'deck'}
+    slides = LLM_SLIDES.value(**labels)
+    if slides < TOKENS_MIN_SLIDES:
+        return TOKENS_PER_SLIDE
+    return LLM_TOKENS.value(kind='completion', **labels) / slides
+
+def max_tokens_for(slide_count, minimum=0):
+    """Completion budget for slide_count slides, at least minimum and capped at Config.OPENAI_MAX_TOKENS"""
+    budget = TOKENS_OVERHEAD + int(tokens_per_slide() * TOKENS_HEADROOM * slide_count)
+    return min(max(budget, minimum), Config.OPENAI_MAX_TOKENS)
+
+def supports_json_mode(model):
+    return model.startswith(Config.OPENAI_JSON_MODE_MODELS)
@@ -0,0 +1,54 @@
+import abc
+from config import Config
+
+class PresentationRenderer(abc.ABC):
+    """Base for backends that turn generated content into a deck (Google Slides, .pptx)"""
+
+    def _get_theme(self, theme_name):
+        return Config.PRESENTATION_THEMES.get(theme_name, Config.PRESENTATION_THEMES['modern'])
+
+    @staticmethod
+    def content_lines(content_blocks):
+        """(indent, text, style) lines of slide text, blank lines included; style is text, heading or emphasis"""
+        lines = []
+        
+        for block in content_blocks:
+            block_type = block.get('type', '')
+            
+            if block_type == 'paragraph':
+                lines += [(0, block['text'], 'text'), (0, '', 'text')]
+            
+            elif block_type == 'bullets':
+                for item in block['items']:
+                    if isinstance(item, dict):
+                        # Main bullet with sub-bullets
+                        lines.append((0, f"• {item['text']}", 'text'))
+                        for subitem in item.get('subitems', []):
+                            lines.append((1, f"◦ {subitem}", 'text'))
+                    else:
+                        # Simple bullet point
+                        lines.append((0, f"• {item}", 'text'))
+                lines.append((0, '', 'text'))
+            
+            elif block_type == 'stats':
+                lines.append((0, "Key Statistics:", 'heading'))
+                for stat in block['items']:
+                    lines.append((0, f"📊 {stat}", 'text'))
+                lines.append((0, '', 'text'))
+            
+            elif block_type == 'conclusion':
+                lines += [(0, '', 'text'), (0, block['text'], 'emphasis')]
+        
+        return lines
+
+    def _format_content(self, content_blocks):
+        """Format varied content types into slide text"""
+        return '\n'.join('    ' * indent + text for indent, text, _ in self.content_lines(content_blocks)).strip()
+
+    @abc.abstractmethod
+    def create_presentation(self, content, theme_name='modern', diagram_options=None, progress=None):
+        """Render content with a theme; returns a backend-specific handle to the deck
+
+        progress, if given, is called as progress(event, **data) as stages
+        complete. Backends may accept further keyword-only options.
+        """
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Backend modules import each other relative to the backend directory (config, services, utils)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,114 @@
+import threading
+import time
+import pytest
+from utils.admission import AdmissionController, AdmissionRejected
+
+def lane(weight=1, concurrency=1, max_queue=10, max_wait=60, service_estimate=10):
+    return {
+        'weight': weight,
+        'concurrency': concurrency,
+        'max_queue': max_queue,
+        'max_wait': max_wait,
+        'service_estimate': service_estimate
+    }
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condition not reached'
+        time.sleep(0.001)
+
+def queue_requests(controller, lanes, order):
+    """Start one thread per lane name that waits for admission, records it and releases at once"""
+    threads = []
+    for name in lanes:
+        def run(name=name):
+            ticket = controller.acquire(name)
+            order.append(name)
+            controller.release(ticket)
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        threads.append(thread)
+        queued = sum(1 for other in lanes[:len(threads)] if other == name)
+        wait_for(lambda name=name, queued=queued: controller.status()[name]['queued'] == queued)
+    return threads
+
+def test_free_slot_is_granted_without_queueing():
+    controller = AdmissionController({'test_free': lane()}, slots=1)
+    with controller.admit('test_free'):
+        assert controller.status()['test_free'] == {'queued': 0, 'active': 1, 'wait_estimate': 10.0}
+    assert controller.status()['test_free'] == {'queued': 0, 'active': 0, 'wait_estimate': 0.0}
+
+def test_waiting_lanes_are_served_in_proportion_to_weight():
+    controller = AdmissionController({'test_heavy': lane(weight=2), 'test_light': lane(weight=1)}, slots=1)
+    holder = controller.acquire('test_heavy')
+    order = []
+    threads = queue_requests(controller, ['test_heavy'] * 3 + ['test_light'] * 3, order)
+
+    controller.release(holder)
+    for thread in threads:
+        thread.join(timeout=5)
+    # The holder advanced the heavy lane's pass by 1/2, so the light lane goes first; then two heavy per light
+    assert order == ['test_light', 'test_heavy', 'test_heavy', 'test_light', 'test_heavy', 'test_light']
+
+def test_lane_concurrency_caps_its_share_of_the_slots():
+    controller = AdmissionController({'test_capped': lane(concurrency=1), 'test_other': lane()}, slots=4)
+    holder = controller.acquire('test_capped')
+    order = []
+    threads = queue_requests(controller, ['test_capped'], order)
+    assert order == []
+    with controller.admit('test_other'):
+        pass
+
+    controller.release(holder)
+    threads[0].join(timeout=5)
+    assert order == ['test_capped']
+
+def test_full_queue_is_rejected():
+    controller = AdmissionController({'test_full': lane(max_queue=1, max_wait=1000)}, slots=1)
+    holder = controller.acquire('test_full')
+    threads = queue_requests(controller, ['test_full'], [])
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire('test_full')
+    assert rejected.value.reason == 'queue_full'
+    assert rejected.value.retry_after == 20
+
+    controller.release(holder)
+    threads[0].join(timeout=5)
+
+def test_long_estimated_wait_is_rejected_with_retry_after():
+    controller = AdmissionController({'test_slow': lane(max_wait=5, service_estimate=12)}, slots=1)
+    with controller.admit('test_slow'):
+        with pytest.raises(AdmissionRejected) as rejected:
+            controller.acquire('test_slow')
+    assert (rejected.value.lane, rejected.value.reason, rejected.value.retry_after) == ('test_slow', 'wait_too_long', 12)
+    assert controller.status()['test_slow']['queued'] == 0
+
+def test_background_diagram_jobs_retry_a_rejected_admission(monkeypatch):
+    pytest.importorskip('torch')
+    from services import diagram_jobs
+    from services.diagram_jobs import DiagramJobManager
+
+    class Busy:
+        def __init__(self):
+            self.rejections = 2
+            self.released = []
+
+        def acquire(self, name):
+            if self.rejections:
+                self.rejections -= 1
+                raise AdmissionRejected(name, 'wait_too_long', 3)
+            return name
+
+        def release(self, ticket, service_time=None):
+            self.released.append(ticket)
+
+    sleeps = []
+    admission = Busy()
+    monkeypatch.setattr(DiagramJobManager, 'admission', admission)
+    monkeypatch.setattr(diagram_jobs.time, 'sleep', sleeps.append)
+    with DiagramJobManager._admitted():
+        pass
+    assert sleeps == [3, 3]
+    assert admission.released == ['diagram']
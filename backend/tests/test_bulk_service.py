@@ -0,0 +1,60 @@
+import time
+import pytest
+
+pytest.importorskip('googleapiclient')
+pytest.importorskip('torch')
+
+from services import bulk_service
+from services.bulk_service import BulkPresentationService
+from services.diagram_jobs import DiagramJobManager
+
+class FakeOpenAI:
+    def create_presentation_content(self, topic, description, slide_count):
+        return {'title': topic, 'slides': [{'type': 'content', 'title': topic, 'diagram_prompt': 'a cycle'}]}
+
+class FakePresentationService:
+    def __init__(self, credentials):
+        pass
+
+    def create_presentation(self, content, theme_name, diagram_options, async_diagrams, diagram_sink):
+        presentation_id = f"deck-{content['title']}"
+        diagram_sink(presentation_id, [
+            {'slide_index': 0, 'slide_id': 's0', 'image_object_id': 'img0', 'prompt': 'a cycle'}
+        ])
+        return presentation_id
+
+    def replace_diagram(self, presentation_id, image_object_id, image_path):
+        return f"https://example.com/{presentation_id}.png"
+
+class FakeImage:
+    def save(self, path):
+        pass
+
+class FakeDiagramService:
+    max_batch_size = 4
+
+    def generate_images(self, prompts, **options):
+        return [FakeImage() for _ in prompts]
+
+@pytest.fixture
+def bulk(monkeypatch):
+    monkeypatch.setattr(bulk_service, 'PresentationService', FakePresentationService)
+    monkeypatch.setattr(bulk_service.DiagramService, 'get_instance', classmethod(lambda cls: FakeDiagramService()))
+    return BulkPresentationService(FakeOpenAI(), credentials=None)
+
+def items(*topics):
+    return [{'topic': topic, 'description': '', 'theme': 'modern', 'slide_count': 1} for topic in topics]
+
+def test_results_arrive_with_the_text_deck_and_diagrams_are_tracked(bulk):
+    results = sorted(bulk.run(items('Bees', 'Rivers')), key=lambda result: result['index'])
+
+    assert [result['presentation_id'] for result in results] == ['deck-Bees', 'deck-Rivers']
+    assert all(result['success'] and result['diagrams'] == 1 for result in results)
+
+    deadline = time.monotonic() + 5
+    while not all(DiagramJobManager.get_status(result['presentation_id'])['complete'] for result in results):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    status = DiagramJobManager.get_status('deck-Bees')
+    assert status['counts'] == {'done': 1}
+    assert status['slides'][0]['image_url'] == 'https://example.com/deck-Bees.png'
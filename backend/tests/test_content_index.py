@@ -0,0 +1,107 @@
+import json
+import pytest
+from config import Config
+from services.content_index import ContentIndex, _opposed
+
+@pytest.fixture
+def threshold(monkeypatch):
+    monkeypatch.setattr(Config, 'CONTENT_REUSE_THRESHOLD', 0.75)
+    return 0.75
+
+def make_index(tmp_path, capacity=10):
+    return ContentIndex(str(tmp_path / 'index.json'), capacity, Config.CONTENT_INDEX_DIMENSIONS)
+
+def deck(title):
+    return {'title': title, 'slides': [{'type': 'content', 'title': title}]}
+
+def test_near_duplicate_topic_is_reused(tmp_path, threshold):
+    index = make_index(tmp_path)
+    index.add('Renewable energy', 'An overview for students', 8, deck('Renewable energy'))
+    entry, similarity = index.lookup('renewable energy', 'An overview for students', 8)
+    assert similarity >= threshold
+    assert entry['content'] == deck('Renewable energy')
+
+def test_negated_topic_is_not_reused(tmp_path, threshold):
+    index = make_index(tmp_path)
+    index.add('Renewable energy', '', 8, deck('Renewable energy'))
+    index.add('Ancient Rome', '', 8, deck('Rome'))
+    index.add('Coral reefs', '', 8, deck('Reefs'))
+    entry, similarity = index.lookup('Non-renewable energy', '', 8)
+    # Similar enough to pass the threshold on features alone
+    assert similarity >= threshold
+    assert entry is None
+
+def test_antonym_is_not_reused(tmp_path, threshold):
+    index = make_index(tmp_path)
+    index.add('Healthy eating habits', '', 8, deck('Healthy'))
+    assert index.lookup('Unhealthy eating habits', '', 8)[0] is None
+    assert index.lookup('Healthy eating habits', '', 8)[0] is not None
+
+def test_a_negated_entry_does_not_hide_a_matching_one(tmp_path, threshold):
+    index = make_index(tmp_path)
+    index.add('Non-renewable energy', '', 8, deck('Fossil'))
+    index.add('Renewable energy today', '', 8, deck('Renewable'))
+    entry, _ = index.lookup('Renewable energy', '', 8)
+    assert entry['content'] == deck('Renewable')
+
+def test_words_sharing_a_prefix_are_not_antonyms():
+    for word, other in [('insight', 'sight'), ('import', 'port'), ('display', 'play'), ('discount', 'count'), ('unit', 'it')]:
+        assert not _opposed({word, 'markets'}, {other, 'markets'})
+    assert _opposed({'legal', 'markets'}, {'illegal', 'markets'})
+    assert not _opposed({'benefits', 'drawbacks'}, {'benefits'})
+
+def test_acronym_and_synonym_paraphrase_is_reused(tmp_path, threshold):
+    index = make_index(tmp_path)
+    index.add('AI in healthcare', '', 8, deck('AI'))
+    index.add('Ancient Rome', '', 8, deck('Rome'))
+    entry, similarity = index.lookup('Artificial intelligence in medicine', '', 8)
+    assert similarity >= threshold
+    assert entry['content'] == deck('AI')
+    assert index.lookup('AI in education', '', 8)[0] is None
+
+def test_slide_count_must_match(tmp_path, threshold):
+    index = make_index(tmp_path)
+    index.add('Renewable energy', '', 8, deck('Renewable energy'))
+    assert index.lookup('Renewable energy', '', 10)[0] is None
+
+def test_least_recently_used_entry_is_evicted(tmp_path, threshold):
+    index = make_index(tmp_path, capacity=2)
+    index.add('Ancient Rome', '', 8, deck('Rome'))
+    index.add('Coral reefs', '', 8, deck('Reefs'))
+    assert index.lookup('Ancient Rome', '', 8)[0] is not None
+
+    index.add('Volcanoes', '', 8, deck('Volcanoes'))
+    assert index.lookup('Coral reefs', '', 8)[0] is None
+    assert index.lookup('Ancient Rome', '', 8)[0] is not None
+    assert index.lookup('Volcanoes', '', 8)[0] is not None
+
+def test_lookup_returns_a_copy(tmp_path, threshold):
+    index = make_index(tmp_path)
+    index.add('Ancient Rome', '', 8, deck('Rome'))
+    index.lookup('Ancient Rome', '', 8)[0]['content']['slides'].clear()
+    assert index.lookup('Ancient Rome', '', 8)[0]['content'] == deck('Rome')
+
+def test_lookups_do_not_rewrite_the_file(tmp_path, threshold):
+    index = make_index(tmp_path)
+    index.add('Ancient Rome', '', 8, deck('Rome'))
+    saved = (tmp_path / 'index.json').read_text()
+    index.lookup('Ancient Rome', '', 8)
+    assert (tmp_path / 'index.json').read_text() == saved
+
+def test_entries_persist_and_reload_most_recent_first(tmp_path, threshold):
+    index = make_index(tmp_path)
+    index.add('Ancient Rome', '', 8, deck('Rome'))
+    index.add('Coral reefs', '', 8, deck('Reefs'))
+    index.add('Volcanoes', '', 8, deck('Volcanoes'))
+    index.lookup('Ancient Rome', '', 8)
+    # Saves the lookup's recency too
+    index.add('Deserts', '', 8, deck('Deserts'))
+
+    reloaded = make_index(tmp_path, capacity=2)
+    assert reloaded.lookup('Ancient Rome', '', 8)[0]['content'] == deck('Rome')
+    assert reloaded.lookup('Deserts', '', 8)[0] is not None
+    assert reloaded.lookup('Volcanoes', '', 8)[0] is None
+
+def test_unreadable_file_starts_empty(tmp_path, threshold):
+    (tmp_path / 'index.json').write_text(json.dumps({'unexpected': []}))
+    assert make_index(tmp_path).lookup('Ancient Rome', '', 8) == (None, 0.0)
@@ -0,0 +1,47 @@
+from config import Config
+from utils.content_validator import ContentValidator
+
+def _slide(**overrides):
+    slide = {
+        'title': 'Solar',
+        'content': [
+            {'type': 'paragraph', 'text': 'Intro'},
+            {'type': 'bullets', 'items': ['a', {'text': 'b', 'subitems': ['c']}]},
+            {'type': 'stats', 'items': ['40%']},
+            {'type': 'conclusion', 'text': 'End'}
+        ],
+        'diagram_prompt': None
+    }
+    slide.update(overrides)
+    return slide
+
+def test_valid_slide_has_no_errors():
+    assert ContentValidator.slide_errors(_slide()) == []
+
+def test_errors_name_the_offending_path():
+    errors = ContentValidator.slide_errors(_slide(content=[{'type': 'bullets', 'items': [3]}]))
+    assert errors and errors[0].startswith('$.content[0].items[0]')
+    assert ContentValidator.slide_errors(_slide(content=[{'type': 'table'}])) == [
+        "$.content[0].type: expected one of paragraph, bullets, stats, conclusion, got 'table'"
+    ]
+    assert ContentValidator.slide_errors({'content': []}) == ['$.title: missing']
+
+def test_empty_text_is_invalid():
+    assert ContentValidator.slide_errors(_slide(title='  ')) == ['$.title: must not be empty']
+
+def test_split_slides_keeps_valid_ones_in_order():
+    content = {'title': 'Deck', 'slides': [_slide(), {'title': 'Broken'}, _slide(title='Two')]}
+    valid, invalid = ContentValidator.split_slides(content)
+    assert [slide['title'] for slide in valid] == ['Solar', 'Two']
+    assert [(index, errors) for index, _, errors in invalid] == [(1, ['$.slides[1].content: missing'])]
+
+def test_validate_slide_content_truncates_long_items():
+    long_item = 'x' * (Config.MAX_POINT_LENGTH + 10)
+    slide = ContentValidator.validate_slide_content(_slide(content=[{'type': 'bullets', 'items': [long_item]}]))
+    assert slide['content'][0]['items'][0] == 'x' * Config.MAX_POINT_LENGTH + '...'
+
+def test_presentation_envelope():
+    assert ContentValidator.presentation_errors({'title': 'Deck', 'slides': []}) == []
+    assert ContentValidator.presentation_errors({'title': 'Deck', 'slides': {}}) == [
+        '$.slides: expected array, got dict'
+    ]
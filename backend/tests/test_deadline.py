@@ -0,0 +1,56 @@
+import pytest
+from config import Config
+from utils import deadline as deadline_module
+from utils.deadline import Deadline, DeadlineExceeded
+from utils.metrics import DEGRADATIONS, STAGE_DURATION
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(deadline_module.time, 'monotonic', lambda: now[0])
+    return now
+
+def test_unbounded_deadline_never_runs_out(clock):
+    deadline = Deadline()
+    clock[0] += 1e6
+    assert not deadline.bounded
+    assert deadline.remaining() == float('inf')
+    assert deadline.fits(1e9)
+    assert deadline.timeout(120) == 120
+    deadline.check('llm.completion')
+
+def test_remaining_counts_down_from_started(clock):
+    deadline = Deadline(10, started=95.0)
+    assert deadline.bounded
+    assert deadline.remaining() == 5.0
+    assert deadline.fits(5.0) and not deadline.fits(5.5)
+    clock[0] += 20
+    assert deadline.remaining() == 0.0
+
+def test_check_raises_once_the_budget_is_spent(clock):
+    deadline = Deadline(2)
+    deadline.check('slides.create')
+    clock[0] += 2
+    with pytest.raises(DeadlineExceeded, match='slides.create'):
+        deadline.check('slides.create')
+
+def test_timeout_is_capped_by_the_remaining_budget(clock):
+    deadline = Deadline(30)
+    assert deadline.timeout(120) == 30
+    assert deadline.timeout(10) == 10
+
+def test_estimate_uses_the_configured_default_until_observed(monkeypatch):
+    monkeypatch.setitem(Config.DEADLINE_STAGE_DEFAULTS, 'test.deadline_stage', 4.0)
+    assert Deadline.estimate('test.deadline_stage', count=3) == 12.0
+    assert Deadline.estimate('test.unknown_stage') == 0.0
+
+    STAGE_DURATION.observe(1.0, stage='test.deadline_stage')
+    STAGE_DURATION.observe(3.0, stage='test.deadline_stage')
+    assert Deadline.estimate('test.deadline_stage', count=3) == 6.0
+
+def test_degrade_records_the_action_and_counts_it(clock):
+    deadline = Deadline(5)
+    before = DEGRADATIONS.value(stage='diffusion.inference', action='skipped')
+    deadline.degrade('diffusion.inference', 'skipped', slides=2)
+    assert deadline.degraded == [{'stage': 'diffusion.inference', 'action': 'skipped', 'slides': 2}]
+    assert DEGRADATIONS.value(stage='diffusion.inference', action='skipped') == before + 1
@@ -0,0 +1,61 @@
+import threading
+import time
+import pytest
+from config import Config
+from services.deck_store import DeckStore
+
+@pytest.fixture(autouse=True)
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'DECK_STORE_DIR', str(tmp_path / 'decks'))
+    return tmp_path / 'decks'
+
+def test_save_and_load_round_trip(store_dir):
+    record = {
+        'presentation_id': 'abc_123-X',
+        'theme': 'dark',
+        'diagram_options': {},
+        'content': {'title': 'Solar', 'slides': [{'title': 'Intro', 'content': []}]},
+        'slides': [{'slide_id': 's1', 'title_id': 't1', 'body_id': 'b1', 'image_object_id': None}]
+    }
+    DeckStore.save(record)
+    assert DeckStore.load('abc_123-X') == record
+    assert [path.name for path in store_dir.iterdir()] == ['abc_123-X.json']
+
+def test_unknown_deck_loads_as_none():
+    assert DeckStore.load('missing') is None
+
+@pytest.mark.parametrize('presentation_id', ['../etc/passwd', 'a/b', '', None])
+def test_rejects_ids_that_are_not_plain_names(presentation_id):
+    with pytest.raises(ValueError):
+        DeckStore.load(presentation_id)
+
+def test_edits_of_one_deck_run_one_at_a_time():
+    inside, overlapped = [], []
+
+    def edit(name):
+        with DeckStore.editing('deck'):
+            inside.append(name)
+            overlapped.append(len(inside) > 1)
+            time.sleep(0.02)
+            inside.remove(name)
+
+    threads = [threading.Thread(target=edit, args=(name,)) for name in 'abc']
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert overlapped == [False, False, False]
+    assert DeckStore._record_locks == {}
+
+def test_edits_of_different_decks_do_not_wait_for_each_other():
+    done = threading.Event()
+
+    def edit_other():
+        with DeckStore.editing('second'):
+            done.set()
+
+    with DeckStore.editing('first'):
+        thread = threading.Thread(target=edit_other)
+        thread.start()
+        assert done.wait(timeout=1)
+    thread.join()
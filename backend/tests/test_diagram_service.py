@@ -0,0 +1,25 @@
+import pytest
+
+pytest.importorskip('torch')
+pytest.importorskip('diffusers')
+
+from config import Config
+from services.diagram_service import DiagramService, GeneratedImages
+
+def test_only_named_resolutions_are_valid():
+    assert DiagramService.valid_resolution('native')
+    assert all(DiagramService.valid_resolution(name) for name in Config.DIAGRAM_RESOLUTIONS)
+    assert not DiagramService.valid_resolution(4096)
+    assert not DiagramService.valid_resolution('4096')
+    assert not DiagramService.valid_resolution(['low'])
+
+def test_resolutions_keep_the_display_aspect_in_multiples_of_eight():
+    width, height = DiagramService.resolution_for(Config.DIAGRAM_RESOLUTIONS['low'], aspect_size=(350, 250))
+    assert (width, height) == (384, 272)
+    assert width % 8 == 0 and height % 8 == 0
+
+def test_generated_images_carry_their_own_stats():
+    first = GeneratedImages(['a'], [{'seconds': 1.0}])
+    second = GeneratedImages(['b'])
+    assert first == ['a'] and first.stats == [{'seconds': 1.0}]
+    assert second.stats == []
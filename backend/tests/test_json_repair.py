@@ -0,0 +1,35 @@
+import pytest
+from utils.json_repair import close_truncated, extract_json, remove_trailing_commas, repair_json, strip_comments
+
+def test_extract_json_drops_fences_and_prose():
+    assert extract_json('Sure!\n```json\n{"a": 1}\n```\nEnjoy') == '{"a": 1}'
+
+def test_extract_json_ends_at_the_balanced_closing_brace():
+    # Trailing prose containing a brace used to be mistaken for part of the object
+    assert extract_json('{"a": {"b": [1, 2]}} Let me know if you need {more}.') == '{"a": {"b": [1, 2]}}'
+    assert repair_json('{"title": "T"} Note: slides use {"type": ...} blocks') == ({'title': 'T'}, False)
+
+def test_extract_json_ignores_braces_inside_strings():
+    assert extract_json('{"text": "a } b { c", "n": "\\"}"} trailing') == '{"text": "a } b { c", "n": "\\"}"}'
+
+def test_extract_json_keeps_a_truncated_object():
+    assert extract_json('Here: {"slides": [{"title": "A"}, {"tit') == '{"slides": [{"title": "A"}, {"tit'
+
+def test_extract_json_without_object():
+    with pytest.raises(ValueError):
+        extract_json('I cannot help with that.')
+
+def test_strip_comments_outside_strings():
+    assert strip_comments('{"url": "http://x/*y*/"} // note\n/* block */') == '{"url": "http://x/*y*/"} \n'
+
+def test_remove_trailing_commas():
+    assert remove_trailing_commas('{"a": [1, 2,], "b": "x,]",\n}') == '{"a": [1, 2], "b": "x,]"\n}'
+
+def test_close_truncated_keeps_complete_slides():
+    assert close_truncated('{"slides": [{"t": 1}, {"t": 2}, {"t": "thr') == '{"slides": [{"t": 1}, {"t": 2}]}'
+    with pytest.raises(ValueError):
+        close_truncated('{"slides": [{"t": "o')
+
+def test_repair_json_reports_truncation():
+    assert repair_json('{"slides": [{"t": 1,}, // first\n{"t": 2') == ({'slides': [{'t': 1}]}, True)
+    assert repair_json('{"slides": []}') == ({'slides': []}, False)
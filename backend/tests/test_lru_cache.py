@@ -0,0 +1,36 @@
+from utils.lru_cache import LRUCache
+
+def test_get_counts_hits_and_misses():
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    assert cache.get('a') == 1
+    assert cache.get('b', 'missing') == 'missing'
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert 'a' in cache and 'c' in cache
+    assert 'b' not in cache
+    assert len(cache) == 2
+
+def test_put_refreshes_existing_key():
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.put('a', 10)
+    cache.put('c', 3)
+    assert cache.get('a') == 10
+    assert 'b' not in cache
+
+def test_pop_and_clear():
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    assert cache.pop('a') == 1
+    assert cache.pop('a', 'gone') == 'gone'
+    cache.put('b', 2)
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,70 @@
+import pytest
+from utils.metrics import Histogram, MetricsRegistry, STAGE_DURATION, STAGE_ERRORS, track
+
+def test_counter_and_gauge_render_in_exposition_format():
+    registry = MetricsRegistry()
+    requests = registry.counter('test_requests_total', 'Requests', ['route'])
+    in_flight = registry.gauge('test_in_flight', 'In flight')
+    requests.inc(route='/a')
+    requests.inc(2, route='/a')
+    in_flight.inc()
+    in_flight.dec()
+
+    lines = registry.render().splitlines()
+    assert '# TYPE test_requests_total counter' in lines
+    assert 'test_requests_total{route="/a"} 3' in lines
+    assert 'test_in_flight 0' in lines
+
+def test_registering_a_name_twice_returns_the_existing_metric():
+    registry = MetricsRegistry()
+    assert registry.counter('test_total', 'A') is registry.counter('test_total', 'B')
+
+def test_labels_must_match_declaration():
+    counter = MetricsRegistry().counter('test_total', 'A', ['stage'])
+    with pytest.raises(ValueError):
+        counter.inc(other='x')
+
+def test_histogram_buckets_are_cumulative():
+    histogram = MetricsRegistry().histogram('test_seconds', 'Latency', buckets=(1, 5))
+    for value in (0.5, 2, 2, 10):
+        histogram.observe(value)
+
+    lines = histogram.render()
+    assert 'test_seconds_bucket{le="1"} 1' in lines
+    assert 'test_seconds_bucket{le="5"} 3' in lines
+    assert 'test_seconds_bucket{le="+Inf"} 4' in lines
+    assert 'test_seconds_count 4' in lines
+    assert histogram.mean() == pytest.approx(14.5 / 4)
+
+def test_label_values_are_escaped():
+    counter = MetricsRegistry().counter('test_total', 'A', ['path'])
+    counter.inc(path='a"b\\c')
+    assert 'test_total{path="a\\"b\\\\c"} 1' in counter.render()
+
+def test_track_records_duration_and_errors():
+    count = STAGE_DURATION.count(stage='test.stage')
+    errors = STAGE_ERRORS.value(stage='test.stage')
+
+    with track('test.stage'):
+        pass
+    with pytest.raises(RuntimeError):
+        with track('test.stage'):
+            raise RuntimeError('boom')
+
+    assert STAGE_DURATION.count(stage='test.stage') == count + 2
+    assert STAGE_ERRORS.value(stage='test.stage') == errors + 1
+
+def test_histogram_quantile_interpolates_within_buckets():
+    histogram = Histogram('test_quantile_seconds', 'Quantile', buckets=(1, 2, 4))
+    assert histogram.quantile(0.5) is None
+    for value in (0.5, 1.5, 1.5, 3):
+        histogram.observe(value)
+    assert histogram.quantile(0.25) == 1.0
+    assert histogram.quantile(0.5) == 1.5
+    assert histogram.quantile(1.0) == 4.0
+    assert histogram.quantile(0.5, min_count=5) is None
+
+def test_histogram_quantile_in_overflow_bucket_is_the_largest_bound():
+    histogram = Histogram('test_overflow_seconds', 'Overflow', buckets=(1, 2))
+    histogram.observe(10)
+    assert histogram.quantile(0.99) == 2
@@ -0,0 +1,140 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from config import Config
+from services import prompt_templates
+from services.openai_service import OpenAIService, _slides_bucket
+from utils.metrics import LLM_DURATION, LLM_HEDGES, LLM_TOKENS
+
+def _slide(title):
+    return {'title': title, 'content': [{'type': 'paragraph', 'text': f"About {title}."}]}
+
+def _reply(value):
+    text = value if isinstance(value, str) else json.dumps(value)
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))], usage=None)
+
+class FakeCompletions:
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.requests = []
+
+    def create(self, **request):
+        self.requests.append(request)
+        return _reply(self.replies.pop(0))
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(Config, 'OPENAI_API_KEY', 'test-key')
+    monkeypatch.setattr(Config, 'CONTENT_REUSE_THRESHOLD', 0)
+    monkeypatch.setattr(Config, 'OPENAI_HEDGE_QUANTILE', 0)
+    return OpenAIService()
+
+def _use_replies(service, *replies):
+    completions = FakeCompletions(replies)
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return completions
+
+def test_truncated_deck_asks_for_exactly_the_missing_slides(service):
+    truncated = json.dumps({'title': 'Solar', 'slides': [_slide('One'), _slide('Two'), _slide('Three')]})[:-20]
+    completions = _use_replies(
+        service,
+        truncated,
+        {'continuation': [_slide('Three'), _slide('Four'), _slide('Five'), _slide('Extra')]}
+    )
+
+    content = service.create_presentation_content('Solar', slide_count=5)
+
+    follow_up = completions.requests[1]['messages'][1]['content']
+    assert 'remaining 3 slide(s) of the 5-slide presentation' in follow_up
+    assert [slide['title'] for slide in content['slides']] == ['One', 'Two', 'Three', 'Four', 'Five']
+
+def test_complete_deck_needs_no_follow_up(service):
+    completions = _use_replies(service, {'title': 'Solar', 'slides': [_slide('One'), _slide('Two')]})
+    content = service.create_presentation_content('Solar', slide_count=2)
+    assert len(completions.requests) == 1
+    assert len(content['slides']) == 2
+
+def test_regenerate_rejects_a_bare_list(service):
+    _use_replies(service, [_slide('New')])
+    deck = {'title': 'Solar', 'slides': [_slide('Old')]}
+    with pytest.raises(ValueError, match='Invalid slide structure'):
+        service.regenerate_slides(deck, [0])
+
+def test_regenerate_returns_slides_by_index(service):
+    _use_replies(service, {'slides': [_slide('New')]})
+    deck = {'title': 'Solar', 'slides': [_slide('Old'), _slide('Kept')]}
+    assert service.regenerate_slides(deck, [0]) == {0: _slide('New')}
+
+def test_slide_count_buckets():
+    assert [_slides_bucket(count) for count in (1, 4, 5, 8, 12, 15)] == ['1-4', '1-4', '5-8', '5-8', '9-12', '13+']
+
+class FakeStream:
+    """Streamed reply of chunk texts, one every interval seconds, then a usage-only chunk if usage is given"""
+
+    def __init__(self, texts, interval, usage=None):
+        self.texts = texts
+        self.interval = interval
+        self.usage = usage
+        self.closed = threading.Event()
+        self.response = SimpleNamespace(close=self.closed.set)
+
+    def __iter__(self):
+        for text in self.texts:
+            time.sleep(self.interval)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+        if self.usage:
+            yield SimpleNamespace(choices=[], usage=self.usage)
+
+class HedgedCompletions:
+    def __init__(self, streams):
+        self.streams = list(streams)
+        self.requests = []
+
+    def create(self, stream=False, **request):
+        assert stream
+        self.requests.append(request)
+        return self.streams.pop(0)
+
+def test_slow_request_is_hedged_and_the_loser_closed(service, monkeypatch):
+    monkeypatch.setattr(Config, 'OPENAI_HEDGE_QUANTILE', 0.5)
+    monkeypatch.setattr(Config, 'OPENAI_MODEL', 'test-hedge-model')
+    labels = {'model': 'test-hedge-model', 'version': prompt_templates.PROMPT_VERSION, 'purpose': 'regenerate'}
+    for _ in range(Config.OPENAI_HEDGE_MIN_SAMPLES):
+        LLM_DURATION.observe(0.1, slides='1-4', **labels)
+
+    reply = json.dumps({'slides': [_slide('New')]})
+    slow = FakeStream(['{"sl'] * 200, interval=0.05)
+    fast = FakeStream([reply[:10], reply[10:]], interval=0)
+    completions = HedgedCompletions([slow, fast])
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    result = service.regenerate_slides({'title': 'Solar', 'slides': [_slide('Old')]}, [0])
+
+    assert result == {0: _slide('New')}
+    assert len(completions.requests) == 2
+    assert LLM_HEDGES.value(purpose='regenerate', outcome='won') >= 1
+    # The original is abandoned at its next chunk rather than read to the end
+    assert slow.closed.wait(1)
+
+def test_streamed_requests_record_usage_from_the_final_chunk(service, monkeypatch):
+    monkeypatch.setattr(Config, 'OPENAI_MODEL', 'test-stream-model')
+    labels = {'model': 'test-stream-model', 'version': prompt_templates.PROMPT_VERSION, 'purpose': 'regenerate'}
+    reply = json.dumps({'slides': [_slide('New')]})
+    completions = HedgedCompletions([
+        FakeStream([reply[:10], reply[10:]], interval=0, usage={'prompt_tokens': 120, 'completion_tokens': 40}),
+        FakeStream([reply[:10], reply[10:]], interval=0)
+    ])
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    request = {'model': 'test-stream-model', 'messages': []}
+
+    response = service._request(request, labels, '1-4', abandoned=threading.Event())
+    assert completions.requests[0]['extra_body'] == {'stream_options': {'include_usage': True}}
+    assert response.usage.completion_tokens == 40
+    assert LLM_TOKENS.value(kind='prompt', **labels) == 120
+    assert LLM_TOKENS.value(kind='completion', **labels) == 40
+
+    # A stream without usage records no tokens rather than counting chunks
+    assert service._request(request, labels, '1-4', abandoned=threading.Event()).usage is None
+    assert LLM_TOKENS.value(kind='completion', **labels) == 40
@@ -0,0 +1,44 @@
+import pytest
+from services.preview_service import PreviewService, rgb_dict_to_string
+from services.renderer import PresentationRenderer
+
+class _TextRenderer(PresentationRenderer):
+    def create_presentation(self, content, theme_name='modern', diagram_options=None, progress=None):
+        return [self._format_content(slide['content']) for slide in content['slides']]
+
+BLOCKS = [
+    {'type': 'paragraph', 'text': 'Solar output doubled.'},
+    {'type': 'bullets', 'items': ['Cheaper panels', {'text': 'Storage', 'subitems': ['Batteries']}]},
+    {'type': 'stats', 'items': ['40% growth']},
+    {'type': 'conclusion', 'text': 'Keep investing.'},
+]
+
+def test_format_content_joins_content_lines():
+    text = _TextRenderer()._format_content(BLOCKS)
+    assert text == (
+        "Solar output doubled.\n\n"
+        "• Cheaper panels\n• Storage\n    ◦ Batteries\n\n"
+        "Key Statistics:\n📊 40% growth\n\n\n"
+        "Keep investing."
+    )
+
+def test_slide_preview_shows_every_line_with_its_style():
+    theme = {'background_color': {'red': 1.0, 'green': 1.0, 'blue': 1.0}, 'primary_color': {'red': 0.0, 'green': 0.0, 'blue': 0.0}}
+    svg = PreviewService.render_slide({'title': 'Solar', 'content': BLOCKS}, theme)
+    for line in ('Solar output doubled.', '• Cheaper panels', '◦ Batteries', '📊 40% growth'):
+        assert f'>{line}</text>' in svg
+    assert 'font-weight="bold" fill="rgb(0,0,0)">Key Statistics:' in svg
+    assert 'font-style="italic" fill="rgb(0,0,0)">Keep investing.' in svg
+
+def test_theme_preview_uses_a_gradient_only_when_configured():
+    assert rgb_dict_to_string({'red': 1.0, 'green': 0.5, 'blue': 0.0}) == 'rgb(255,127,0)'
+    assert 'url(#grad_gradient_blue)' in PreviewService.render_theme('gradient_blue')
+    assert 'linearGradient' not in PreviewService.render_theme('modern')
+
+def test_renderer_requires_create_presentation():
+    class Incomplete(PresentationRenderer):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+    assert _TextRenderer().create_presentation({'slides': [{'content': BLOCKS[:1]}]}) == ['Solar output doubled.']
@@ -0,0 +1,40 @@
+import threading
+import time
+from utils.profiling import ProfilingController
+
+def pipeline_work(seconds=0.1):
+    """Stands in for the streamed pipeline: busy on a worker thread"""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+def run_in_worker(controller, session):
+    worker = threading.Thread(target=lambda: _profiled(controller, session))
+    worker.start()
+    worker.join()
+
+def _profiled(controller, session):
+    with controller.profile_thread(session):
+        pipeline_work()
+
+def test_cprofile_session_includes_worker_threads(tmp_path):
+    controller = ProfilingController(str(tmp_path))
+    session = controller.start('stream', header_mode='cprofile')
+    run_in_worker(controller, session)
+    files = controller.finish(session)
+
+    assert 'stream.txt' in files
+    assert 'pipeline_work' in (tmp_path / 'stream.txt').read_text()
+
+def test_sampling_session_includes_worker_threads(tmp_path):
+    controller = ProfilingController(str(tmp_path))
+    session = controller.start('stream', header_mode='sampling')
+    run_in_worker(controller, session)
+    controller.finish(session)
+
+    assert 'pipeline_work' in (tmp_path / 'stream.folded').read_text()
+    assert session.sampler.thread_ids == {threading.get_ident()}
+
+def test_without_a_session_nothing_is_profiled():
+    with ProfilingController('unused').profile_thread(None):
+        pipeline_work(0)
@@ -0,0 +1,33 @@
+import json
+import threading
+from utils.progress import ProgressStream, format_sse
+
+def test_format_sse():
+    assert format_sse('stage', {'name': 'llm', 'done': 1}) == 'event: stage\ndata: {"name": "llm", "done": 1}\n\n'
+
+def test_events_until_closed():
+    stream = ProgressStream()
+    stream.emit('started', request_id='abc')
+    stream.emit('slide', index=0)
+    stream.close()
+    events = list(stream.events())
+    assert len(events) == 2
+    assert events[0].startswith('event: started\n')
+    assert json.loads(events[1].split('data: ')[1]) == {'index': 0}
+
+def test_keepalive_while_producer_is_silent():
+    stream = ProgressStream(keepalive_seconds=0.01)
+    released = threading.Event()
+
+    def producer():
+        released.wait(1)
+        stream.emit('done')
+        stream.close()
+    threading.Thread(target=producer).start()
+
+    events = stream.events()
+    assert next(events) == ': keep-alive\n\n'
+    released.set()
+    remaining = list(events)
+    assert remaining[-1].startswith('event: done\n')
+    assert all(event.startswith(('event: done', ': keep-alive')) for event in remaining)
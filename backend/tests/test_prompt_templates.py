@@ -0,0 +1,37 @@
+import pytest
+from config import Config
+from services import prompt_templates
+from utils.metrics import LLM_SLIDES, LLM_TOKENS
+
+@pytest.fixture
+def model(monkeypatch, request):
+    # A model name of its own keeps the process-wide counters of other tests out
+    name = f"test-{request.node.name}"
+    monkeypatch.setattr(Config, 'OPENAI_MODEL', name)
+    return name
+
+def _measure(model, slides, completion_tokens):
+    labels = {'model': model, 'version': prompt_templates.PROMPT_VERSION, 'purpose': 'deck'}
+    LLM_SLIDES.inc(slides, **labels)
+    LLM_TOKENS.inc(completion_tokens, kind='completion', **labels)
+
+def test_default_deck_budget_is_not_below_the_old_limit(model):
+    assert prompt_templates.max_tokens_for(Config.DEFAULT_SLIDE_COUNT, Config.OPENAI_DECK_MIN_TOKENS) >= 3000
+    assert prompt_templates.max_tokens_for(1, Config.OPENAI_DECK_MIN_TOKENS) == Config.OPENAI_DECK_MIN_TOKENS
+
+def test_prior_is_used_until_enough_slides_are_measured(model):
+    _measure(model, prompt_templates.TOKENS_MIN_SLIDES - 1, 10000)
+    assert prompt_templates.tokens_per_slide() == prompt_templates.TOKENS_PER_SLIDE
+
+def test_budget_follows_measured_completion_tokens(model):
+    _measure(model, 50, 50 * 200)
+    assert prompt_templates.tokens_per_slide() == 200
+    assert prompt_templates.max_tokens_for(4) == prompt_templates.TOKENS_OVERHEAD + int(200 * prompt_templates.TOKENS_HEADROOM * 4)
+
+def test_budget_is_capped(model):
+    _measure(model, 50, 50 * 600)
+    assert prompt_templates.max_tokens_for(Config.MAX_SLIDE_COUNT, Config.OPENAI_DECK_MIN_TOKENS) == Config.OPENAI_MAX_TOKENS
+
+def test_json_mode_by_model_prefix():
+    assert prompt_templates.supports_json_mode('gpt-4o-mini')
+    assert not prompt_templates.supports_json_mode('gpt-4')
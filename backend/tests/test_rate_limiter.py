@@ -0,0 +1,30 @@
+import pytest
+from utils.rate_limiter import TokenBucket
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock; time.sleep advances it instead of blocking"""
+    now = [100.0]
+    monkeypatch.setattr('utils.rate_limiter.time.monotonic', lambda: now[0])
+    monkeypatch.setattr('utils.rate_limiter.time.sleep', lambda seconds: now.__setitem__(0, now[0] + seconds))
+    return now
+
+def test_burst_is_free(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+
+def test_waits_for_refill_once_burst_is_spent(clock):
+    bucket = TokenBucket(rate=2, capacity=1)
+    bucket.acquire()
+    assert bucket.acquire() == pytest.approx(0.5)
+
+def test_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(rate=1, capacity=2)
+    bucket.acquire(2)
+    clock[0] += 60
+    assert bucket.acquire(2) == 0.0
+    assert bucket.acquire() == pytest.approx(1.0)
+
+def test_zero_rate_disables_limiting(clock):
+    bucket = TokenBucket(rate=0, capacity=1)
+    assert all(bucket.acquire() == 0.0 for _ in range(10))
@@ -0,0 +1,69 @@
+import threading
+import time
+import pytest
+from utils.single_flight import SingleFlight, normalize_key
+
+def test_normalize_key_ignores_case_whitespace_and_dict_order():
+    assert normalize_key('  Solar  Power ', {'b': 'X', 'a': 1}) == normalize_key('solar power', {'a': 1, 'b': 'x'})
+    assert normalize_key('solar', 8) != normalize_key('solar', 10)
+
+def _concurrently(flights, key, func, callers):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(_call(flights, key, func))) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+def _wait_for_followers(flights, key, count):
+    while flights._calls.get(key) is None or flights._calls[key].followers < count:
+        time.sleep(0.001)
+
+def _call(flights, key, func):
+    try:
+        return flights.do(key, func)
+    except Exception as e:
+        return e
+
+def test_concurrent_callers_share_one_execution():
+    flights = SingleFlight()
+    release = threading.Event()
+    runs = []
+
+    def func():
+        runs.append(1)
+        release.wait(5)
+        return 'deck'
+
+    threads, results = _concurrently(flights, 'key', func, 4)
+    _wait_for_followers(flights, 'key', 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(runs) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+    assert {result for result, _ in results} == {'deck'}
+    assert flights.in_flight() == 0
+
+def test_followers_receive_the_leaders_error():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def func():
+        release.wait(5)
+        raise ValueError('LLM down')
+
+    threads, results = _concurrently(flights, 'key', func, 2)
+    _wait_for_followers(flights, 'key', 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert [str(error) for error in results] == ['LLM down', 'LLM down']
+
+def test_sequential_calls_run_again():
+    flights = SingleFlight()
+    assert flights.do('key', lambda: 1) == (1, False)
+    assert flights.do('key', lambda: 2) == (2, False)
+    with pytest.raises(KeyError):
+        flights.do('key', lambda: {}['missing'])
+    assert flights.in_flight() == 0
@@ -0,0 +1,23 @@
+import pytest
+
+pytest.importorskip('googleapiclient')
+pytest.importorskip('torch')
+
+from services.presentation_service import _text_diff, _utf16_length
+
+def test_equal_text_needs_no_edit():
+    assert _text_diff('Solar power', 'Solar power') is None
+
+def test_only_the_changed_span_is_replaced():
+    assert _text_diff('Solar power grows', 'Solar energy grows') == (6, 11, 'energy')
+
+def test_insertion_and_deletion():
+    assert _text_diff('• a\n• c', '• a\n• b\n• c') == (6, 6, 'b\n• ')
+    assert _text_diff('• a\n• b\n• c', '• a\n• c') == (6, 10, '')
+
+def test_full_replacement():
+    assert _text_diff('abc', 'xyz') == (0, 3, 'xyz')
+
+def test_indices_count_utf16_code_units():
+    assert _utf16_length('📊 40%') == 6
+    assert _text_diff('📊 40% growth', '📊 45% growth') == (4, 5, '5')
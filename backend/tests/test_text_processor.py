@@ -0,0 +1,77 @@
+import itertools
+import re
+import pytest
+from services import prompt_templates
+from services.renderer import PresentationRenderer
+from utils.text_processor import TextProcessor
+
+class _SentenceSplitter:
+    """Stands in for the punkt model, which needs a download"""
+
+    def tokenize(self, text):
+        return [sentence for sentence in re.split(r'(?<=\.)\s+', text) if sentence]
+
+@pytest.fixture(autouse=True)
+def tokenizer(monkeypatch):
+    monkeypatch.setattr(TextProcessor, '_tokenizer', _SentenceSplitter())
+
+def test_slide_budget_follows_the_body_placeholder():
+    assert TextProcessor.slide_budget(False) == (94, 12)
+    assert TextProcessor.slide_budget(True) == (45, 12)
+
+def test_prompt_asks_for_the_budget_fit_deck_enforces():
+    hint = prompt_templates.slide_length_hint()
+    assert '12 lines of 94 characters' in hint and '12 lines of 45 characters' in hint
+    assert hint in prompt_templates.deck_prompt('Solar', '', 8)
+
+def test_line_count_matches_rendered_layout():
+    blocks = [
+        {'type': 'paragraph', 'text': 'x' * 100},
+        {'type': 'bullets', 'items': ['a', {'text': 'b', 'subitems': ['c']}]},
+        {'type': 'conclusion', 'text': 'End'}
+    ]
+    # 2 paragraph lines + blank, 3 bullet lines + blank, conclusion + its blank
+    assert TextProcessor._line_count(blocks, 94) == 9
+
+class _TextRenderer(PresentationRenderer):
+    def create_presentation(self, content, theme_name='modern', diagram_options=None, progress=None):
+        return None
+
+def test_line_count_agrees_with_the_renderer_in_any_block_order():
+    blocks = [
+        {'type': 'paragraph', 'text': 'Intro'},
+        {'type': 'bullets', 'items': ['a', {'text': 'b', 'subitems': ['c']}]},
+        {'type': 'stats', 'items': ['40%']},
+        {'type': 'conclusion', 'text': 'End'}
+    ]
+    for order in itertools.permutations(blocks):
+        text = _TextRenderer()._format_content(list(order))
+        assert TextProcessor._line_count(list(order), 94) == len(text.split('\n'))
+
+def _long_slide(diagram_prompt=None):
+    sentences = ' '.join(f"Solar panel output rose {n} percent in region {n}." for n in range(12))
+    return {
+        'title': 'Solar',
+        'content': [
+            {'type': 'paragraph', 'text': sentences},
+            {'type': 'bullets', 'items': [f"Solar bullet number {n} about panels" for n in range(8)]}
+        ],
+        'diagram_prompt': diagram_prompt
+    }
+
+def test_fit_deck_shortens_only_overflowing_slides():
+    short = {'title': 'Short', 'content': [{'type': 'paragraph', 'text': 'Fits.'}]}
+    content = {'slides': [short, _long_slide(), _long_slide('A chart')]}
+
+    assert TextProcessor.fit_deck(content) == [1, 2]
+    assert content['slides'][0] == {'title': 'Short', 'content': [{'type': 'paragraph', 'text': 'Fits.'}]}
+    for slide in content['slides'][1:]:
+        chars, lines = TextProcessor.slide_budget(bool(slide['diagram_prompt']))
+        assert TextProcessor._line_count(slide['content'], chars) <= lines
+        # The first unit of each block survives
+        assert slide['content'][0]['text'].startswith('Solar panel output rose 0 percent')
+        assert slide['content'][1]['items'][0] == 'Solar bullet number 0 about panels'
+
+def test_summarize_keeps_short_text():
+    assert TextProcessor.summarize_long_content('One. Two.', max_sentences=3) == 'One. Two.'
+    assert len(TextProcessor._sentences(TextProcessor.summarize_long_content('A. B. C. D. E.', 2))) == 2
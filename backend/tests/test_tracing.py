@@ -0,0 +1,70 @@
+import contextvars
+import json
+import pytest
+from tools.trace_report import critical_path
+from utils import tracing
+
+class _Exporter:
+    def __init__(self):
+        self.spans = []
+
+    def info(self, line):
+        self.spans.append(json.loads(line))
+
+@pytest.fixture
+def exporter(monkeypatch):
+    exporter = _Exporter()
+    monkeypatch.setattr(tracing, '_get_exporter', lambda: exporter)
+    return exporter
+
+def test_span_is_child_of_current_root(exporter):
+    root, token = tracing.start_trace('GET /', 'req-1', sample_rate=1.0)
+    with tracing.span('stage') as child:
+        assert tracing.current_span() is child
+    tracing.end_trace(root, token)
+    assert tracing.current_span() is None
+    assert [span['name'] for span in exporter.spans] == ['stage', 'GET /']
+    assert exporter.spans[0]['parentSpanId'] == root.span_id
+
+def test_detached_root_stays_open_for_streamed_work(exporter):
+    root, token = tracing.start_trace('GET /stream', 'req-2', sample_rate=1.0)
+    context = contextvars.copy_context()
+    tracing.detach_trace(token)
+    assert tracing.current_span() is None
+    assert root.end_ns is None
+
+    def stream():
+        with tracing.span('llm.completion'):
+            pass
+    context.run(stream)
+    tracing.end_trace(root, None, error='HTTP 500')
+
+    assert [span['name'] for span in exporter.spans] == ['llm.completion', 'GET /stream']
+    assert exporter.spans[0]['parentSpanId'] == root.span_id
+    assert exporter.spans[1]['status'] == {'code': 'ERROR', 'message': 'HTTP 500'}
+
+def test_unsampled_request_has_no_spans(exporter):
+    root, token = tracing.start_trace('GET /', 'req-3', sample_rate=0)
+    with tracing.span('stage') as child:
+        assert child is None
+    tracing.end_trace(root, token)
+    assert exporter.spans == []
+
+def _span(span_id, start, end, parent=None):
+    return {'spanId': span_id, 'parentSpanId': parent, 'startTimeUnixNano': start, 'endTimeUnixNano': end}
+
+def _children(spans):
+    children = {}
+    for span in spans:
+        children.setdefault(span['parentSpanId'], []).append(span)
+    return children
+
+def test_critical_path_follows_sequential_blocking_children():
+    spans = [_span('root', 0, 100), _span('a', 0, 40, 'root'), _span('b', 10, 30, 'root'), _span('c', 40, 90, 'root')]
+    path = critical_path(spans[0], _children(spans))
+    assert [span['spanId'] for span in path] == ['root', 'a', 'c']
+
+def test_critical_path_keeps_children_ending_after_root():
+    spans = [_span('root', 0, 50), _span('setup', 0, 20, 'root'), _span('stream', 20, 300, 'root')]
+    path = critical_path(spans[0], _children(spans))
+    assert [span['spanId'] for span in path] == ['root', 'setup', 'stream']
@@ -0,0 +1,194 @@
+"""Offline scheduler x steps x resolution sweep for the diagram model.
+
+Reports mean latency and CLIP image/text similarity for every combination so the
+fastest setting that still looks acceptable can be picked for a profile.
+
+Run from the backend directory:
+    python -m tools.benchmark_diagrams --schedulers default dpm++ euler --steps 5 10 20
+    python -m tools.benchmark_diagrams --schedulers dpm++ --steps 8 --resolutions native low medium
+"""
+import argparse
+import json
+import logging
+import statistics
+import time
+import torch
+from transformers import CLIPModel, CLIPProcessor
+from config import Config
+from services.diagram_service import DiagramService, SCHEDULERS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROMPTS = [
+    "A labeled diagram of an animal cell showing organelles and membrane",
+    "A flowchart showing the steps of DNA replication with arrows",
+    "A diagram of the carbon cycle showing interactions between atmosphere, plants, and soil",
+    "A cross-section diagram of Earth's layers with labels"
+]
+
+class ClipScorer:
+    def __init__(self, model_name="openai/clip-vit-base-patch32", device="cpu"):
+        """Load the CLIP model used to score image/prompt agreement"""
+        self.device = device
+        self.model = CLIPModel.from_pretrained(model_name).to(device).eval()
+        self.processor = CLIPProcessor.from_pretrained(model_name)
+
+    @torch.no_grad()
+    def score(self, image, prompt):
+        """CLIP score: 100 * cosine similarity of image and text embeddings, floored at 0"""
+        inputs = self.processor(
+            text=[prompt],
+            images=[image],
+            return_tensors="pt",
+            padding=True,
+            truncation=True
+        ).to(self.device)
+        outputs = self.model(**inputs)
+        similarity = (outputs.image_embeds * outputs.text_embeds).sum(dim=-1).item()
+        return max(100 * similarity, 0.0)
+
+def _synchronize(device):
+    if device == "cuda":
+        torch.cuda.synchronize()
+
+def run_benchmark(
+    service,
+    scorer,
+    schedulers,
+    steps_list,
+    prompts,
+    resolutions=('native',),
+    upscaler=None,
+    repeats=1,
+    guidance_scale=7.5,
+    seed=0
+):
+    """Sweep scheduler x steps x resolution and collect latency / CLIP score per combination
+
+    Latency for reduced resolutions includes the upscale to the output size.
+    """
+    results = []
+
+    for resolution in resolutions:
+        for scheduler in schedulers:
+            # Warm up once per scheduler/resolution so kernel setup is not billed to the first sample
+            service.generate_image(
+                prompts[0],
+                scheduler=scheduler,
+                num_inference_steps=1,
+                guidance_scale=guidance_scale,
+                resolution=resolution
+            )
+
+            for steps in steps_list:
+                latencies = []
+                scores = []
+                generated_size = None
+
+                for prompt in prompts:
+                    for repeat in range(repeats):
+                        _synchronize(service.device)
+                        start = time.perf_counter()
+                        images = service.generate_images(
+                            [prompt],
+                            scheduler=scheduler,
+                            num_inference_steps=steps,
+                            guidance_scale=guidance_scale,
+                            seed=seed + repeat,
+                            resolution=resolution,
+                            upscaler=upscaler
+                        )
+                        _synchronize(service.device)
+                        latencies.append(time.perf_counter() - start)
+                        scores.append(scorer.score(images[0], prompt))
+                        generated_size = images.stats[0]['resolution']
+
+                result = {
+                    'resolution': resolution,
+                    'generated_size': generated_size,
+                    'scheduler': scheduler,
+                    'num_inference_steps': steps,
+                    'mean_latency_s': statistics.mean(latencies),
+                    'p50_latency_s': statistics.median(latencies),
+                    'mean_clip_score': statistics.mean(scores),
+                }
+                logger.info(
+                    f"{resolution:>8} {scheduler:>14} {steps:>4} steps: "
+                    f"{result['mean_latency_s']:.2f}s, CLIP {result['mean_clip_score']:.2f}"
+                )
+                results.append(result)
+
+    return results
+
+def recommend(results, tolerance=0.95, min_clip_score=None):
+    """Fastest setting whose CLIP score is within tolerance of the best (or above an absolute floor)"""
+    if not results:
+        return None
+
+    threshold = min_clip_score
+    if threshold is None:
+        threshold = tolerance * max(result['mean_clip_score'] for result in results)
+
+    acceptable = [result for result in results if result['mean_clip_score'] >= threshold]
+    return min(acceptable, key=lambda result: result['mean_latency_s']) if acceptable else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark diagram schedulers and step counts")
+    parser.add_argument('--model-path', default=Config.DIAGRAM_MODEL_PATH)
+    parser.add_argument('--schedulers', nargs='+', default=['default', 'dpm++', 'euler', 'unipc'],
+                        choices=list(SCHEDULERS))
+    parser.add_argument('--steps', nargs='+', type=int, default=[4, 8, 15, 25])
+    parser.add_argument('--resolutions', nargs='+', default=['native'],
+                        choices=['native'] + list(Config.DIAGRAM_RESOLUTIONS))
+    parser.add_argument('--upscaler', choices=['lanczos', 'fsrcnn'], default=None)
+    parser.add_argument('--prompts-file', help="Text file with one prompt per line")
+    parser.add_argument('--repeats', type=int, default=1)
+    parser.add_argument('--guidance-scale', type=float, default=7.5)
+    parser.add_argument('--clip-model', default="openai/clip-vit-base-patch32")
+    parser.add_argument('--tolerance', type=float, default=0.95,
+                        help="Accept settings scoring at least this fraction of the best CLIP score")
+    parser.add_argument('--min-clip-score', type=float, help="Absolute CLIP score floor (overrides --tolerance)")
+    parser.add_argument('--output', help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    prompts = DEFAULT_PROMPTS
+    if args.prompts_file:
+        with open(args.prompts_file) as f:
+            prompts = [line.strip() for line in f if line.strip()]
+
+    service = DiagramService(model_path=args.model_path)
+    scorer = ClipScorer(args.clip_model, device=service.device)
+
+    results = run_benchmark(
+        service,
+        scorer,
+        args.schedulers,
+        args.steps,
+        prompts,
+        resolutions=args.resolutions,
+        upscaler=args.upscaler,
+        repeats=args.repeats,
+        guidance_scale=args.guidance_scale
+    )
+    best = recommend(results, tolerance=args.tolerance, min_clip_score=args.min_clip_score)
+
+    print(f"\n{'resolution':>10} {'scheduler':>14} {'steps':>6} {'mean s':>8} {'p50 s':>8} {'CLIP':>7}")
+    for result in sorted(results, key=lambda result: result['mean_latency_s']):
+        print(
+            f"{result['resolution']:>10} {result['scheduler']:>14} {result['num_inference_steps']:>6} "
+            f"{result['mean_latency_s']:>8.2f} {result['p50_latency_s']:>8.2f} {result['mean_clip_score']:>7.2f}"
+        )
+
+    if best:
+        print(f"\nRecommended: resolution={best['resolution']} scheduler={best['scheduler']} "
+              f"steps={best['num_inference_steps']} "
+              f"({best['mean_latency_s']:.2f}s, CLIP {best['mean_clip_score']:.2f})")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'results': results, 'recommended': best}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Package a diffusers pipeline into a fast-start snapshot.
+
+The snapshot is one memory-mappable safetensors file with all weights plus a
+snapshot.json holding resolved component configs. DiagramService loads it
+lazily when MODEL_PATH points at the output directory.
+
+Run from the backend directory:
+    python -m tools.package_model --model-path ./models/sd-ai2d-model --output ./models/sd-ai2d-snapshot
+"""
+import argparse
+import logging
+import time
+import torch
+from diffusers import StableDiffusionPipeline
+from config import Config
+from utils.model_snapshot import load_snapshot, save_snapshot
+
+DTYPES = {'float16': torch.float16, 'float32': torch.float32, 'bfloat16': torch.bfloat16}
+
+def main():
+    parser = argparse.ArgumentParser(description="Package the diagram model as a fast-start snapshot")
+    parser.add_argument('--model-path', default=Config.DIAGRAM_MODEL_PATH)
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--dtype', choices=list(DTYPES), default='float16',
+                        help="Storage dtype; store the dtype you serve with to avoid conversion at load")
+    parser.add_argument('--verify', action='store_true', help="Reload the snapshot and report the load time")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    started = time.perf_counter()
+    pipeline = StableDiffusionPipeline.from_pretrained(args.model_path, safety_checker=None)
+    print(f"Loaded {args.model_path} in {time.perf_counter() - started:.2f}s")
+
+    save_snapshot(pipeline, args.output, torch_dtype=DTYPES[args.dtype])
+    print(f"Snapshot written to {args.output}")
+
+    if args.verify:
+        started = time.perf_counter()
+        load_snapshot(args.output, torch_dtype=DTYPES[args.dtype])
+        print(f"Snapshot loaded in {time.perf_counter() - started:.2f}s")
+
+if __name__ == '__main__':
+    main()
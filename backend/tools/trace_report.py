@@ -0,0 +1,97 @@
+"""Print the span tree and critical path of one traced request.
+
+Run from the backend directory:
+    python -m tools.trace_report <request-id> [--file ./traces/traces.jsonl]
+"""
+import argparse
+import glob
+import json
+import sys
+from config import Config
+from utils.tracing import REQUEST_ID_ATTRIBUTE
+
+def load_spans(trace_file, request_id):
+    """All spans of the trace whose root carries request_id (current and rotated files)"""
+    spans = []
+    for path in sorted(glob.glob(f"{trace_file}*")):
+        with open(path) as f:
+            for line in f:
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    continue
+
+    trace_ids = {
+        span['traceId'] for span in spans
+        if span.get('attributes', {}).get(REQUEST_ID_ATTRIBUTE) == request_id
+    }
+    return [span for span in spans if span['traceId'] in trace_ids]
+
+def _duration_ms(span):
+    return (span['endTimeUnixNano'] - span['startTimeUnixNano']) / 1e6
+
+def critical_path(span, children):
+    """Spans that determine the end time of span, walking back from its end
+
+    At each step the child that finished last before the cursor is on the path;
+    the cursor then moves to that child's start. Children may outlive their
+    parent (background work started by a request), so the walk starts at
+    whichever ends last.
+    """
+    path = [span]
+    span_children = children.get(span['spanId'], [])
+    cursor = max([span['endTimeUnixNano']] + [child['endTimeUnixNano'] for child in span_children])
+    blocking = []
+    for child in sorted(span_children, key=lambda s: s['endTimeUnixNano'], reverse=True):
+        if child['endTimeUnixNano'] <= cursor:
+            blocking.append(child)
+            cursor = child['startTimeUnixNano']
+    for child in reversed(blocking):
+        path.extend(critical_path(child, children))
+    return path
+
+def print_tree(span, children, critical_ids, root_start, depth=0):
+    offset = (span['startTimeUnixNano'] - root_start) / 1e6
+    marker = '*' if span['spanId'] in critical_ids else ' '
+    status = '' if span['status']['code'] != 'ERROR' else f"  ERROR: {span['status']['message']}"
+    attributes = {k: v for k, v in span.get('attributes', {}).items() if not k.startswith('http.')}
+    details = f"  {attributes}" if attributes else ''
+    print(f"{marker} {offset:>9.1f}ms {_duration_ms(span):>9.1f}ms  {'  ' * depth}{span['name']}{details}{status}")
+    for child in sorted(children.get(span['spanId'], []), key=lambda s: s['startTimeUnixNano']):
+        print_tree(child, children, critical_ids, root_start, depth + 1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the critical path of a traced request")
+    parser.add_argument('request_id')
+    parser.add_argument('--file', default=Config.TRACE_FILE)
+    parser.add_argument('--tree', action='store_true', help="Also print the full span tree")
+    args = parser.parse_args()
+
+    spans = load_spans(args.file, args.request_id)
+    if not spans:
+        print(f"No spans found for request {args.request_id} (was it sampled?)")
+        sys.exit(1)
+
+    children = {}
+    for span in spans:
+        children.setdefault(span.get('parentSpanId'), []).append(span)
+    roots = children.get(None, [])
+    root = roots[0]
+
+    path = critical_path(root, children)
+    critical_ids = {span['spanId'] for span in path}
+    total = _duration_ms(root)
+
+    print(f"Request {args.request_id}: {root['name']} took {total:.1f}ms ({len(spans)} spans)\n")
+    print("Critical path (self time = time not covered by a child on the path):")
+    for span in path:
+        blocking_children = [s for s in children.get(span['spanId'], []) if s['spanId'] in critical_ids]
+        self_ms = _duration_ms(span) - sum(_duration_ms(s) for s in blocking_children)
+        print(f"  {span['name']:<40} {_duration_ms(span):>9.1f}ms  self {self_ms:>9.1f}ms  ({100 * self_ms / total:5.1f}%)")
+
+    if args.tree:
+        print("\nSpan tree (* = on critical path):")
+        print_tree(root, children, critical_ids, root['startTimeUnixNano'])
+
+if __name__ == '__main__':
+    main()
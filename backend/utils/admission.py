@@ -0,0 +1,135 @@
+import collections
+import math
+import threading
+import time
+from contextlib import contextmanager
+from utils.metrics import (
+    ADMISSION_ACTIVE, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED, ADMISSION_SERVICE_TIME, ADMISSION_WAIT
+)
+
+class AdmissionRejected(Exception):
+    def __init__(self, lane, reason, retry_after):
+        super().__init__(f"Too many {lane} requests queued ({reason}), retry in {retry_after}s")
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+
+class _Ticket:
+    __slots__ = ('lane', 'admitted')
+
+    def __init__(self, lane):
+        self.lane = lane
+        self.admitted = threading.Event()
+
+class AdmissionController:
+    def __init__(self, lanes, slots):
+        """Bounded per-lane queues in front of a shared pool of slots
+
+        lanes maps a workload class to {weight, concurrency, max_queue,
+        max_wait, service_estimate}. Free slots go to waiting lanes by stride
+        scheduling: each admission advances its lane's pass by 1/weight and
+        the lane with the lowest pass goes next, so heavier lanes are served
+        proportionally more often without starving the others. concurrency
+        caps a lane's share of the slots. A request is rejected when its lane's
+        queue is full or its estimated wait exceeds max_wait.
+        """
+        self.lanes = lanes
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._queues = {lane: collections.deque() for lane in lanes}
+        self._active = {lane: 0 for lane in lanes}
+        self._pass = {lane: 0.0 for lane in lanes}
+        self._virtual_time = 0.0
+        self._in_use = 0
+
+    def _service_time(self, lane):
+        return ADMISSION_SERVICE_TIME.mean(self.lanes[lane]['service_estimate'], lane=lane)
+
+    def _wait_estimate(self, lane):
+        """Seconds a new request in lane would queue (lock held)"""
+        queued = len(self._queues[lane])
+        if not queued and self._active[lane] < self.lanes[lane]['concurrency'] and self._in_use < self.slots:
+            return 0.0
+        return (queued + 1) / self.lanes[lane]['concurrency'] * self._service_time(lane)
+
+    def _dispatch(self):
+        """Hand free slots to waiting lanes, lowest pass first (lock held)"""
+        while self._in_use < self.slots:
+            ready = [
+                lane for lane, queue in self._queues.items()
+                if queue and self._active[lane] < self.lanes[lane]['concurrency']
+            ]
+            if not ready:
+                return
+            lane = min(ready, key=lambda name: self._pass[name])
+            ticket = self._queues[lane].popleft()
+            self._virtual_time = self._pass[lane]
+            self._pass[lane] += 1 / self.lanes[lane]['weight']
+            self._active[lane] += 1
+            self._in_use += 1
+            ADMISSION_QUEUE_DEPTH.set(len(self._queues[lane]), lane=lane)
+            ADMISSION_ACTIVE.set(self._active[lane], lane=lane)
+            ticket.admitted.set()
+
+    def _reject(self, lane, reason, wait):
+        ADMISSION_REJECTED.inc(lane=lane, reason=reason)
+        raise AdmissionRejected(lane, reason, max(1, math.ceil(wait)))
+
+    def acquire(self, lane):
+        """Block until a slot in lane is free; raises AdmissionRejected instead of queueing too long"""
+        config = self.lanes[lane]
+        started = time.perf_counter()
+        with self._lock:
+            wait = self._wait_estimate(lane)
+            if len(self._queues[lane]) >= config['max_queue']:
+                self._reject(lane, 'queue_full', wait)
+            if wait > config['max_wait']:
+                self._reject(lane, 'wait_too_long', wait)
+
+            ticket = _Ticket(lane)
+            if not self._queues[lane]:
+                # An idle lane does not bank credit from the time it was idle
+                self._pass[lane] = max(self._pass[lane], self._virtual_time)
+            self._queues[lane].append(ticket)
+            ADMISSION_QUEUE_DEPTH.set(len(self._queues[lane]), lane=lane)
+            self._dispatch()
+
+        if not ticket.admitted.wait(timeout=2 * config['max_wait']):
+            with self._lock:
+                if not ticket.admitted.is_set():
+                    self._queues[lane].remove(ticket)
+                    ADMISSION_QUEUE_DEPTH.set(len(self._queues[lane]), lane=lane)
+                    self._reject(lane, 'timeout', self._wait_estimate(lane))
+
+        ADMISSION_WAIT.observe(time.perf_counter() - started, lane=lane)
+        return ticket
+
+    def release(self, ticket, service_time=None):
+        if service_time is not None:
+            ADMISSION_SERVICE_TIME.observe(service_time, lane=ticket.lane)
+        with self._lock:
+            self._active[ticket.lane] -= 1
+            self._in_use -= 1
+            ADMISSION_ACTIVE.set(self._active[ticket.lane], lane=ticket.lane)
+            self._dispatch()
+
+    @contextmanager
+    def admit(self, lane):
+        """Run a block in one of lane's slots"""
+        ticket = self.acquire(lane)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(ticket, time.perf_counter() - started)
+
+    def status(self):
+        with self._lock:
+            return {
+                lane: {
+                    'queued': len(self._queues[lane]),
+                    'active': self._active[lane],
+                    'wait_estimate': round(self._wait_estimate(lane), 2)
+                }
+                for lane in self.lanes
+            }
@@ -1,29 +1,202 @@
+from config import Config
+
+_TYPES = {'string': str, 'array': list, 'object': dict, 'null': type(None)}
+
+def _compile(schema):
+    """Compile a small JSON-Schema subset into a validator: validator(value, path) -> list of errors
+
+    Supports type (name or list of names), minLength, minItems, items,
+    required, properties, anyOf and discriminator/variants (object variants
+    selected by the value of one field).
+    """
+    checks = []
+
+    if 'type' in schema:
+        names = schema['type'] if isinstance(schema['type'], list) else [schema['type']]
+        types = tuple(_TYPES[name] for name in names)
+        expected = ' or '.join(names)
+
+        def check_type(value, path):
+            if not isinstance(value, types):
+                return [f"{path}: expected {expected}, got {type(value).__name__}"]
+            return []
+        checks.append(check_type)
+
+    if 'minLength' in schema:
+        min_length = schema['minLength']
+        checks.append(lambda value, path: [f"{path}: must not be empty"]
+                      if isinstance(value, str) and len(value.strip()) < min_length else [])
+
+    if 'minItems' in schema:
+        min_items = schema['minItems']
+        checks.append(lambda value, path: [f"{path}: needs at least {min_items} item(s)"]
+                      if isinstance(value, list) and len(value) < min_items else [])
+
+    if 'required' in schema:
+        required = tuple(schema['required'])
+
+        def check_required(value, path):
+            if not isinstance(value, dict):
+                return []
+            return [f"{path}.{key}: missing" for key in required if key not in value]
+        checks.append(check_required)
+
+    if 'properties' in schema:
+        properties = {key: _compile(subschema) for key, subschema in schema['properties'].items()}
+
+        def check_properties(value, path):
+            if not isinstance(value, dict):
+                return []
+            errors = []
+            for key, validator in properties.items():
+                if key in value:
+                    errors += validator(value[key], f"{path}.{key}")
+            return errors
+        checks.append(check_properties)
+
+    if 'items' in schema:
+        item_validator = _compile(schema['items'])
+
+        def check_items(value, path):
+            if not isinstance(value, list):
+                return []
+            errors = []
+            for index, item in enumerate(value):
+                errors += item_validator(item, f"{path}[{index}]")
+            return errors
+        checks.append(check_items)
+
+    if 'anyOf' in schema:
+        options = [_compile(option) for option in schema['anyOf']]
+
+        def check_any(value, path):
+            attempts = [option(value, path) for option in options]
+            if any(not errors for errors in attempts):
+                return []
+            return min(attempts, key=len)
+        checks.append(check_any)
+
+    if 'discriminator' in schema:
+        field = schema['discriminator']
+        variants = {name: _compile(variant) for name, variant in schema['variants'].items()}
+
+        def check_variant(value, path):
+            if not isinstance(value, dict):
+                return []
+            validator = variants.get(value.get(field))
+            if validator is None:
+                return [f"{path}.{field}: expected one of {', '.join(variants)}, got {value.get(field)!r}"]
+            return validator(value, path)
+        checks.append(check_variant)
+
+    def validate(value, path='$'):
+        errors = []
+        for check in checks:
+            errors += check(value, path)
+            if errors:
+                # Later checks assume the earlier ones (notably the type) passed
+                break
+        return errors
+    return validate
+
+TEXT = {'type': 'string', 'minLength': 1}
+
+BLOCK_SCHEMA = {
+    'type': 'object',
+    'discriminator': 'type',
+    'variants': {
+        'paragraph': {'required': ['text'], 'properties': {'text': TEXT}},
+        'bullets': {
+            'required': ['items'],
+            'properties': {
+                'items': {
+                    'type': 'array',
+                    'minItems': 1,
+                    'items': {'anyOf': [
+                        TEXT,
+                        {
+                            'type': 'object',
+                            'required': ['text'],
+                            'properties': {
+                                'text': TEXT,
+                                'subitems': {'type': 'array', 'items': TEXT}
+                            }
+                        }
+                    ]}
+                }
+            }
+        },
+        'stats': {'required': ['items'], 'properties': {'items': {'type': 'array', 'minItems': 1, 'items': TEXT}}},
+        'conclusion': {'required': ['text'], 'properties': {'text': TEXT}},
+    }
+}
+
+SLIDE_SCHEMA = {
+    'type': 'object',
+    'required': ['title', 'content'],
+    'properties': {
+        'title': TEXT,
+        'content': {'type': 'array', 'minItems': 1, 'items': BLOCK_SCHEMA},
+        'diagram_prompt': {'type': ['string', 'null']}
+    }
+}
+
+PRESENTATION_SCHEMA = {
+    'type': 'object',
+    'required': ['title', 'slides'],
+    'properties': {
+        'title': TEXT,
+        'slides': {'type': 'array'}
+    }
+}
+
 class ContentValidator:
+    # Compiled once at import; validating is then plain function calls
+    _validate_slide = staticmethod(_compile(SLIDE_SCHEMA))
+    _validate_presentation = staticmethod(_compile(PRESENTATION_SCHEMA))
+
+    @staticmethod
+    def slide_errors(slide_content, path='$'):
+        """Schema errors for one slide in the content block format (empty if valid)"""
+        return ContentValidator._validate_slide(slide_content, path)
+
+    @staticmethod
+    def presentation_errors(content):
+        """Schema errors for the deck envelope (title and slides list; slides are checked separately)"""
+        return ContentValidator._validate_presentation(content)
+
     @staticmethod
     def validate_slide_content(slide_content):
         """Validate the content for a slide"""
-        if not isinstance(slide_content, dict):
-            raise ValueError("Slide content must be a dictionary")
-        
-        if 'title' not in slide_content:
-            raise ValueError("Slide must have a title")
-        
-        if 'content' not in slide_content:
-            raise ValueError("Slide must have content")
-        
-        if not isinstance(slide_content['content'], list):
-            raise ValueError("Slide content must be a list")
-        
+        errors = ContentValidator.slide_errors(slide_content)
+        if errors:
+            raise ValueError(f"Invalid slide content: {'; '.join(errors)}")
+
         # Ensure content isn't too long
-        from config import Config
-        
         if len(slide_content['content']) > Config.MAX_POINTS_PER_SLIDE:
             slide_content['content'] = slide_content['content'][:Config.MAX_POINTS_PER_SLIDE]
-        
+
         # Truncate long points
-        slide_content['content'] = [
-            point[:Config.MAX_POINT_LENGTH] + '...' if len(point) > Config.MAX_POINT_LENGTH else point
-            for point in slide_content['content']
-        ]
-        
-        return slide_content
\ No newline at end of file
+        def truncate(point):
+            return point[:Config.MAX_POINT_LENGTH] + '...' if len(point) > Config.MAX_POINT_LENGTH else point
+
+        for block in slide_content['content']:
+            if block['type'] in ('bullets', 'stats'):
+                block['items'] = [
+                    {**item, 'text': truncate(item['text'])} if isinstance(item, dict) else truncate(item)
+                    for item in block['items']
+                ]
+
+        return slide_content
+
+    @staticmethod
+    def split_slides(content):
+        """Partition content['slides'] into (valid slides, [(index, slide, errors)] of invalid ones)"""
+        valid, invalid = [], []
+        for index, slide in enumerate(content['slides']):
+            errors = ContentValidator.slide_errors(slide, f"$.slides[{index}]")
+            if errors:
+                invalid.append((index, slide, errors))
+            else:
+                valid.append(ContentValidator.validate_slide_content(slide))
+        return valid, invalid
@@ -0,0 +1,52 @@
+import logging
+import time
+from config import Config
+from utils.metrics import DEGRADATIONS, STAGE_DURATION
+
+logger = logging.getLogger(__name__)
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out before a stage it cannot do without"""
+
+class Deadline:
+    def __init__(self, seconds=None, started=None):
+        """Time budget of one request, passed through the pipeline stages
+
+        None means unbounded; started (time.monotonic()) defaults to now. Stages compare the remaining budget with the mean
+        observed duration of the work they are about to do (estimate) and
+        record what they leave out or cheapen (degrade); the API response
+        lists those degradations.
+        """
+        self.expires_at = None if seconds is None else (started or time.monotonic()) + seconds
+        self.degraded = []
+
+    @property
+    def bounded(self):
+        return self.expires_at is not None
+
+    def remaining(self):
+        if self.expires_at is None:
+            return float('inf')
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def fits(self, seconds):
+        return seconds <= self.remaining()
+
+    def check(self, stage):
+        """Raise DeadlineExceeded if nothing of the budget is left for stage"""
+        if self.remaining() <= 0:
+            raise DeadlineExceeded(f"Deadline exceeded before {stage}")
+
+    def timeout(self, cap):
+        """A per-call timeout that does not outlive the deadline"""
+        return min(cap, self.remaining())
+
+    @staticmethod
+    def estimate(stage, count=1):
+        """Expected seconds for count runs of stage, from STAGE_DURATION or Config.DEADLINE_STAGE_DEFAULTS"""
+        return count * STAGE_DURATION.mean(Config.DEADLINE_STAGE_DEFAULTS.get(stage, 0.0), stage=stage)
+
+    def degrade(self, stage, action, **details):
+        self.degraded.append({'stage': stage, 'action': action, **details})
+        DEGRADATIONS.inc(stage=stage, action=action)
+        logger.info(f"Deadline: {stage} {action} {details} with {self.remaining():.1f}s left")
@@ -0,0 +1,66 @@
+import logging
+import threading
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:
+    cv2 = None
+
+class ImageUpscaler:
+    METHODS = ('lanczos', 'fsrcnn')
+
+    _sr_model = None
+    _sr_lock = threading.Lock()
+
+    @staticmethod
+    def upscale(image, size, method='lanczos', sr_model_path=None):
+        """Upscale a PIL image to size (width, height)
+
+        'lanczos' is a cheap deterministic resample. 'fsrcnn' runs a small
+        OpenCV super-resolution model first and falls back to Lanczos if
+        opencv-contrib or the model file is unavailable.
+        """
+        if method not in ImageUpscaler.METHODS:
+            raise ValueError(f"Unknown upscaler '{method}'. Available: {', '.join(ImageUpscaler.METHODS)}")
+
+        if image.size == tuple(size):
+            return image
+
+        if method == 'fsrcnn' and image.width < size[0]:
+            upscaled = ImageUpscaler._super_resolve(image, sr_model_path)
+            if upscaled is not None:
+                image = upscaled
+
+        return image.resize(tuple(size), Image.LANCZOS)
+
+    @staticmethod
+    def _super_resolve(image, sr_model_path):
+        model = ImageUpscaler._get_sr_model(sr_model_path)
+        if model is None:
+            return None
+
+        with ImageUpscaler._sr_lock:
+            result = model.upsample(cv2.cvtColor(np.asarray(image.convert('RGB')), cv2.COLOR_RGB2BGR))
+        return Image.fromarray(cv2.cvtColor(result, cv2.COLOR_BGR2RGB))
+
+    @staticmethod
+    def _get_sr_model(sr_model_path):
+        with ImageUpscaler._sr_lock:
+            if ImageUpscaler._sr_model is None:
+                if cv2 is None or not hasattr(cv2, 'dnn_superres'):
+                    logger.warning("opencv-contrib-python not installed; using Lanczos upscaling")
+                    ImageUpscaler._sr_model = False
+                else:
+                    try:
+                        model = cv2.dnn_superres.DnnSuperResImpl_create()
+                        model.readModel(sr_model_path)
+                        model.setModel('fsrcnn', 2)
+                        ImageUpscaler._sr_model = model
+                    except Exception as e:
+                        logger.warning(f"Could not load super-resolution model {sr_model_path}: {str(e)}")
+                        ImageUpscaler._sr_model = False
+            return ImageUpscaler._sr_model or None
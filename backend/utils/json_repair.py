@@ -0,0 +1,132 @@
+import json
+import re
+
+_FENCE = re.compile(r'```(?:json)?\s*(.*?)```', re.DOTALL)
+
+def _scan(text):
+    """Yield (index, char, in_string) for each character, tracking JSON string state"""
+    in_string = escaped = False
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+                yield index, char, True
+                continue
+        elif char == '"':
+            in_string = True
+        yield index, char, in_string
+
+def extract_json(text):
+    """The first JSON object in an LLM reply, without surrounding prose or code fences
+
+    The object ends at the brace closing its opening one (braces inside
+    strings do not count), so trailing prose is dropped whatever it contains.
+    Without that brace the reply was cut off and everything from the start is kept.
+    """
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    start = text.find('{')
+    if start == -1:
+        raise ValueError("No JSON object found in response")
+    depth = 0
+    for index, char, in_string in _scan(text[start:]):
+        if in_string:
+            continue
+        if char in '{[':
+            depth += 1
+        elif char in '}]':
+            depth -= 1
+            if depth == 0:
+                return text[start:start + index + 1]
+    return text[start:]
+
+def strip_comments(text):
+    """Remove // and /* */ comments outside strings"""
+    result = []
+    skip_until = -1
+    for index, char, in_string in _scan(text):
+        if index < skip_until:
+            continue
+        if not in_string and text.startswith('//', index):
+            newline = text.find('\n', index)
+            skip_until = len(text) if newline == -1 else newline
+            continue
+        if not in_string and text.startswith('/*', index):
+            close = text.find('*/', index + 2)
+            skip_until = len(text) if close == -1 else close + 2
+            continue
+        result.append(char)
+    return ''.join(result)
+
+def remove_trailing_commas(text):
+    """Drop commas directly before a closing bracket, outside strings"""
+    result = []
+    pending_comma = None
+    for _, char, in_string in _scan(text):
+        if not in_string and char == ',':
+            if pending_comma is not None:
+                result.append(pending_comma)
+            pending_comma = ','
+            continue
+        if pending_comma is not None:
+            if not in_string and char.isspace():
+                pending_comma += char
+                continue
+            if in_string or char not in '}]':
+                result.append(pending_comma)
+            else:
+                result.append(pending_comma[1:])
+            pending_comma = None
+        result.append(char)
+    if pending_comma is not None:
+        result.append(pending_comma[1:])
+    return ''.join(result)
+
+def close_truncated(text, keep_depth=2):
+    """Cut a truncated document after its last complete element at keep_depth and close it
+
+    With the default depth of 2 and a document shaped {"slides": [...]}, this
+    keeps every complete slide and drops the one that was cut off.
+    """
+    stack = []
+    cut = None
+    for index, char, in_string in _scan(text):
+        if in_string:
+            continue
+        if char in '{[':
+            stack.append(char)
+        elif char in '}]':
+            if not stack:
+                break
+            stack.pop()
+            if len(stack) == keep_depth:
+                cut = (index + 1, list(stack))
+    if cut is None:
+        raise ValueError("Response was truncated before any complete element")
+
+    end, open_brackets = cut
+    closers = ''.join('}' if bracket == '{' else ']' for bracket in reversed(open_brackets))
+    return text[:end] + closers
+
+def repair_json(text):
+    """Parse an LLM JSON reply, repairing common damage; returns (value, truncated)
+
+    Repairs: surrounding prose and code fences, comments, trailing commas,
+    and truncation (complete elements are kept, see close_truncated).
+    """
+    candidate = remove_trailing_commas(strip_comments(extract_json(text)))
+    try:
+        return json.loads(candidate), False
+    except json.JSONDecodeError:
+        pass
+
+    candidate = remove_trailing_commas(close_truncated(candidate))
+    try:
+        return json.loads(candidate), True
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Could not repair JSON response: {str(e)}")
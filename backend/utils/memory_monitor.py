@@ -0,0 +1,41 @@
+import resource
+import sys
+
+class MemoryMonitor:
+    @staticmethod
+    def reset_peak_rss():
+        """Reset the kernel's peak RSS counter (VmHWM) so the next reading covers only new work"""
+        try:
+            # Writing 5 to clear_refs resets the high water mark (Linux >= 4.0)
+            with open('/proc/self/clear_refs', 'w') as f:
+                f.write('5')
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def current_rss():
+        """Current resident set size in bytes, or None if unavailable"""
+        return MemoryMonitor._read_status_field('VmRSS')
+
+    @staticmethod
+    def peak_rss():
+        """Peak resident set size in bytes since the last reset (or process start)"""
+        peak = MemoryMonitor._read_status_field('VmHWM')
+        if peak is not None:
+            return peak
+
+        # ru_maxrss is kilobytes on Linux and bytes on macOS; it cannot be reset
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+    @staticmethod
+    def _read_status_field(field):
+        try:
+            with open('/proc/self/status') as f:
+                for line in f:
+                    if line.startswith(f"{field}:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return None
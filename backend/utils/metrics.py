@@ -0,0 +1,275 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from utils.tracing import span
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"Metric {self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"]
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+class Gauge(_Metric):
+    type_name = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def mean(self, default=None, **labels):
+        """Mean observed value, or default if nothing has been observed"""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            if not state or not state[2]:
+                return default
+            return state[1] / state[2]
+
+    def quantile(self, q, min_count=1, **labels):
+        """Estimated q-quantile from the buckets (linear within a bucket), or None below min_count observations"""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            if not state or state[2] < min_count:
+                return None
+            bucket_counts, total = list(state[0]), state[2]
+        rank = q * total
+        cumulative, lower = 0, 0.0
+        for bound, bucket_count in zip(self.buckets, bucket_counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                return lower + (bound - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+            lower = bound
+        # In the +Inf bucket: the largest finite bound is the best estimate
+        return lower
+
+    def count(self, **labels):
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[2] if state else 0
+
+    def _render_sample(self, key, state):
+        bucket_counts, total, count = state
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), bucket_counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.label_names, key, ('le', _format_value(bound)))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.label_names, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        """In-process metrics rendered in the Prometheus text exposition format"""
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self._register(Counter(name, help_text, label_names))
+
+    def gauge(self, name, help_text, label_names=()):
+        return self._register(Gauge(name, help_text, label_names))
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.histogram(
+    'slidesai_stage_duration_seconds',
+    'Latency of pipeline stages (LLM, Slides/Drive calls, diffusion, image encode)',
+    ['stage']
+)
+STAGE_ERRORS = REGISTRY.counter('slidesai_stage_errors_total', 'Pipeline stages that raised', ['stage'])
+API_CALLS_PER_DECK = REGISTRY.histogram(
+    'slidesai_api_calls_per_deck',
+    'Google Slides/Drive API calls made to build one deck',
+    buckets=(5, 10, 20, 40, 80, 160, 320)
+)
+CACHE_REQUESTS = REGISTRY.counter('slidesai_cache_requests_total', 'Cache lookups by cache and result', ['cache', 'result'])
+REQUESTS_IN_FLIGHT = REGISTRY.gauge('slidesai_requests_in_flight', 'HTTP requests currently being served', ['endpoint'])
+REQUEST_DURATION = REGISTRY.histogram(
+    'slidesai_request_duration_seconds',
+    'HTTP request latency by endpoint and status',
+    ['endpoint', 'status']
+)
+COALESCED_REQUESTS = REGISTRY.counter(
+    'slidesai_coalesced_requests_total',
+    'Presentation requests by single-flight role (leader ran the pipeline, follower shared its result)',
+    ['role']
+)
+LLM_REPAIRS = REGISTRY.counter(
+    'slidesai_llm_repairs_total',
+    'LLM replies needing repair (truncated, invalid_slide) and follow-up requests (rerequest)',
+    ['kind']
+)
+LLM_TOKENS = REGISTRY.counter(
+    'slidesai_llm_tokens_total',
+    'LLM tokens by model, prompt template version, call purpose and kind (prompt, completion)',
+    ['model', 'version', 'purpose', 'kind']
+)
+LLM_DURATION = REGISTRY.histogram(
+    'slidesai_llm_request_duration_seconds',
+    'Latency of single LLM completion requests by model, prompt template version, call purpose and slides asked for',
+    ['model', 'version', 'purpose', 'slides'],
+    buckets=(0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30, 45, 60, 90, 120, 180)
+)
+LLM_SLIDES = REGISTRY.counter(
+    'slidesai_llm_slides_total',
+    'Complete slides received in LLM replies; with slidesai_llm_tokens_total gives completion tokens per slide',
+    ['model', 'version', 'purpose']
+)
+LLM_RETRIES = REGISTRY.counter('slidesai_llm_retries_total', 'LLM requests retried after a transient error', ['purpose', 'error'])
+LLM_HEDGES = REGISTRY.counter(
+    'slidesai_llm_hedges_total',
+    'Hedged LLM requests by outcome (sent, won: the hedge answered first, lost: the original did)',
+    ['purpose', 'outcome']
+)
+DEGRADATIONS = REGISTRY.counter(
+    'slidesai_deadline_degradations_total',
+    'Work cut or cheapened to meet a request deadline, by stage and action',
+    ['stage', 'action']
+)
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge('slidesai_admission_queue_depth', 'Requests waiting for admission, by lane', ['lane'])
+ADMISSION_ACTIVE = REGISTRY.gauge('slidesai_admission_active', 'Admitted requests running, by lane', ['lane'])
+ADMISSION_WAIT = REGISTRY.histogram('slidesai_admission_wait_seconds', 'Time requests spent queued for admission', ['lane'])
+ADMISSION_SERVICE_TIME = REGISTRY.histogram(
+    'slidesai_admission_service_seconds',
+    'Time admitted requests held their slot, by lane (used for wait estimates)',
+    ['lane']
+)
+ADMISSION_REJECTED = REGISTRY.counter(
+    'slidesai_admission_rejected_total',
+    'Requests rejected with 429 by lane and reason (queue_full, wait_too_long, timeout)',
+    ['lane', 'reason']
+)
+
+@contextmanager
+def track(stage, **attributes):
+    """Time a block as one observation of a pipeline stage (and a trace span when sampled)"""
+    started = time.perf_counter()
+    with span(stage, **attributes):
+        try:
+            yield
+        except BaseException:
+            STAGE_ERRORS.inc(stage=stage)
+            raise
+        finally:
+            STAGE_DURATION.observe(time.perf_counter() - started, stage=stage)
+
+def timed(stage):
+    """Decorator form of track()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_cache(cache, hits=0, misses=0):
+    if hits:
+        CACHE_REQUESTS.inc(hits, cache=cache, result='hit')
+    if misses:
+        CACHE_REQUESTS.inc(misses, cache=cache, result='miss')
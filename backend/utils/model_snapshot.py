@@ -0,0 +1,106 @@
+import json
+import logging
+from pathlib import Path
+import torch
+import diffusers
+from accelerate import init_empty_weights
+from diffusers import StableDiffusionPipeline
+from safetensors import safe_open
+from safetensors.torch import save_file
+from transformers import CLIPTextConfig, CLIPTextModel, CLIPTokenizer
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_CONFIG = "snapshot.json"
+SNAPSHOT_WEIGHTS = "model.safetensors"
+SNAPSHOT_VERSION = 1
+COMPONENTS = ('unet', 'vae', 'text_encoder')
+
+def is_snapshot(model_path):
+    """True if model_path was written by save_snapshot"""
+    return (Path(model_path) / SNAPSHOT_CONFIG).exists()
+
+def save_snapshot(pipeline, output_dir, torch_dtype=None):
+    """Write a pipeline as one safetensors file plus a precomputed config
+
+    All UNet, VAE and text encoder weights go into a single memory-mappable
+    file keyed '<component>.<parameter>'. Component and scheduler configs are
+    stored resolved in snapshot.json, so loading needs no config discovery.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    tensors = {}
+    for name in COMPONENTS:
+        for key, tensor in getattr(pipeline, name).state_dict().items():
+            if torch_dtype is not None and tensor.is_floating_point():
+                tensor = tensor.to(torch_dtype)
+            tensors[f"{name}.{key}"] = tensor.detach().cpu().contiguous()
+    save_file(tensors, str(output_dir / SNAPSHOT_WEIGHTS), metadata={'format': 'pt'})
+
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'components': {
+            'unet': {'class': type(pipeline.unet).__name__, 'config': dict(pipeline.unet.config)},
+            'vae': {'class': type(pipeline.vae).__name__, 'config': dict(pipeline.vae.config)},
+            'text_encoder': {'class': type(pipeline.text_encoder).__name__, 'config': pipeline.text_encoder.config.to_dict()},
+            'scheduler': {'class': type(pipeline.scheduler).__name__, 'config': dict(pipeline.scheduler.config)},
+        }
+    }
+    with open(output_dir / SNAPSHOT_CONFIG, 'w') as f:
+        json.dump(snapshot, f, indent=2, default=str)
+
+    pipeline.tokenizer.save_pretrained(str(output_dir / "tokenizer"))
+    logger.info(f"Wrote model snapshot with {len(tensors)} tensors to {output_dir}")
+
+def _build_component(name, spec):
+    if name == 'text_encoder':
+        return CLIPTextModel(CLIPTextConfig.from_dict(spec['config']))
+    config = {key: value for key, value in spec['config'].items() if not key.startswith('_')}
+    return getattr(diffusers, spec['class']).from_config(config)
+
+def load_snapshot(model_path, torch_dtype=torch.float32, device="cpu"):
+    """Load a snapshot written by save_snapshot into a StableDiffusionPipeline
+
+    Modules are created on the meta device and the safetensors file is
+    memory-mapped; tensors are assigned into the modules instead of being
+    copied into freshly allocated parameters.
+    """
+    model_path = Path(model_path)
+    with open(model_path / SNAPSHOT_CONFIG) as f:
+        snapshot = json.load(f)
+
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported model snapshot version {snapshot.get('version')}")
+
+    specs = snapshot['components']
+    with init_empty_weights():
+        modules = {name: _build_component(name, specs[name]) for name in COMPONENTS}
+
+    state_dicts = {name: {} for name in COMPONENTS}
+    with safe_open(str(model_path / SNAPSHOT_WEIGHTS), framework="pt", device=str(device)) as weights:
+        for key in weights.keys():
+            component, parameter = key.split('.', 1)
+            tensor = weights.get_tensor(key)
+            if tensor.is_floating_point() and tensor.dtype != torch_dtype:
+                tensor = tensor.to(torch_dtype)
+            state_dicts[component][parameter] = tensor
+
+    for name, module in modules.items():
+        module.load_state_dict(state_dicts[name], strict=True, assign=True)
+        module.eval()
+
+    scheduler_spec = specs['scheduler']
+    scheduler = getattr(diffusers, scheduler_spec['class']).from_config(scheduler_spec['config'])
+    tokenizer = CLIPTokenizer.from_pretrained(str(model_path / "tokenizer"))
+
+    return StableDiffusionPipeline(
+        vae=modules['vae'],
+        text_encoder=modules['text_encoder'],
+        tokenizer=tokenizer,
+        unet=modules['unet'],
+        scheduler=scheduler,
+        safety_checker=None,
+        feature_extractor=None,
+        requires_safety_checker=False,
+    )
@@ -0,0 +1,241 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from utils.memory_monitor import MemoryMonitor
+
+logger = logging.getLogger(__name__)
+
+MODES = ('cprofile', 'sampling')
+
+class SamplingProfiler:
+    def __init__(self, thread_id, interval=0.005):
+        """Periodically samples the stacks of a request's threads into collapsed (flamegraph) form"""
+        self.thread_ids = {thread_id}
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def add_thread(self, thread_id):
+        self.thread_ids = self.thread_ids | {thread_id}
+
+    def remove_thread(self, thread_id):
+        self.thread_ids = self.thread_ids - {thread_id}
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in self.thread_ids:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if stack:
+                    self.samples[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+class ProfileSession:
+    def __init__(self, name, mode, memory):
+        # Names include client-supplied request ids; keep them safe as file names
+        self.name = re.sub(r'[^A-Za-z0-9_.-]', '_', name)[:128]
+        self.mode = mode
+        self.memory = memory
+        self.started = time.perf_counter()
+        self.profiler = None
+        self.sampler = None
+        # cProfile profilers of worker threads joined to the session (profile_thread)
+        self.thread_profilers = []
+        self._lock = threading.Lock()
+
+class ProfilingController:
+    def __init__(self, profile_dir):
+        """Admin-controlled profiling of live requests
+
+        Profiling is armed for the next N requests or requested per request
+        via a header. cProfile (or a stack sampler) output, tracemalloc
+        snapshots and torch memory stats are written to profile_dir.
+        """
+        self.profile_dir = profile_dir
+        self._remaining = 0
+        self._mode = 'cprofile'
+        self._memory = True
+        self._cprofile_active = False
+        self._tracemalloc_users = 0
+        self._lock = threading.Lock()
+
+    def arm(self, requests, mode='cprofile', memory=True):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode '{mode}'. Available: {', '.join(MODES)}")
+        with self._lock:
+            self._remaining = max(0, int(requests))
+            self._mode = mode
+            self._memory = bool(memory)
+        logger.info(f"Profiling armed for the next {requests} request(s) ({mode})")
+
+    def status(self):
+        with self._lock:
+            return {'remaining_requests': self._remaining, 'mode': self._mode, 'memory': self._memory}
+
+    def start(self, name, header_mode=None):
+        """Start a session if this request should be profiled; returns the session or None"""
+        with self._lock:
+            if header_mode:
+                mode, memory = header_mode, self._memory
+            elif self._remaining > 0:
+                self._remaining -= 1
+                mode, memory = self._mode, self._memory
+            else:
+                return None
+
+            if mode not in MODES:
+                raise ValueError(f"Unknown profiling mode '{mode}'. Available: {', '.join(MODES)}")
+
+            # Only one deterministic profiler can be active per process
+            if mode == 'cprofile' and self._cprofile_active:
+                mode = 'sampling'
+            if mode == 'cprofile':
+                self._cprofile_active = True
+
+            if memory:
+                if self._tracemalloc_users == 0 and not tracemalloc.is_tracing():
+                    tracemalloc.start(25)
+                self._tracemalloc_users += 1
+
+        session = ProfileSession(name, mode, memory)
+        if memory:
+            MemoryMonitor.reset_peak_rss()
+        if mode == 'cprofile':
+            session.profiler = cProfile.Profile()
+            session.profiler.enable()
+        else:
+            session.sampler = SamplingProfiler(threading.get_ident())
+            session.sampler.start()
+        return session
+
+    @contextmanager
+    def profile_thread(self, session):
+        """Profile the calling thread as part of session for the duration of the block
+
+        For work a request hands to another thread (the streamed pipeline):
+        the session's own profiler only sees the thread that started it. A
+        None session profiles nothing.
+        """
+        if session is None:
+            yield
+            return
+
+        thread_id = threading.get_ident()
+        if session.sampler is not None:
+            session.sampler.add_thread(thread_id)
+            try:
+                yield
+            finally:
+                session.sampler.remove_thread(thread_id)
+            return
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ allows one profiler per process; the session's already covers every thread
+            profiler = None
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                with session._lock:
+                    session.thread_profilers.append(profiler)
+
+    def finish(self, session):
+        """Stop a session and write its artifacts; returns the written file names"""
+        os.makedirs(self.profile_dir, exist_ok=True)
+        base = os.path.join(self.profile_dir, session.name)
+        files = []
+
+        if session.profiler is not None:
+            session.profiler.disable()
+            with self._lock:
+                self._cprofile_active = False
+            summary = io.StringIO()
+            with session._lock:
+                stats = pstats.Stats(session.profiler, *session.thread_profilers, stream=summary)
+            stats.dump_stats(f"{base}.prof")
+            stats.sort_stats('cumulative').print_stats(50)
+            with open(f"{base}.txt", 'w') as f:
+                f.write(summary.getvalue())
+            files += [f"{session.name}.prof", f"{session.name}.txt"]
+        else:
+            session.sampler.stop()
+            session.sampler.write(f"{base}.folded")
+            files.append(f"{session.name}.folded")
+
+        memory = {
+            'duration_seconds': time.perf_counter() - session.started,
+            'mode': session.mode,
+            'peak_rss_bytes': MemoryMonitor.peak_rss(),
+        }
+        if session.memory:
+            snapshot = tracemalloc.take_snapshot()
+            snapshot.dump(f"{base}.tracemalloc")
+            files.append(f"{session.name}.tracemalloc")
+            memory['tracemalloc_top'] = [str(stat) for stat in snapshot.statistics('lineno')[:25]]
+            with self._lock:
+                self._tracemalloc_users -= 1
+                if self._tracemalloc_users == 0:
+                    tracemalloc.stop()
+
+        # Only report torch stats if the diffusion stack is already loaded
+        torch = sys.modules.get('torch')
+        if torch is not None and torch.cuda.is_available():
+            memory['torch_cuda'] = {
+                'max_memory_allocated': torch.cuda.max_memory_allocated(),
+                'memory_reserved': torch.cuda.memory_reserved(),
+                'stats': torch.cuda.memory_stats(),
+            }
+
+        with open(f"{base}.memory.json", 'w') as f:
+            json.dump(memory, f, indent=2, default=str)
+        files.append(f"{session.name}.memory.json")
+
+        logger.info(f"Profile written: {', '.join(files)}")
+        return files
+
+    def list_profiles(self):
+        if not os.path.isdir(self.profile_dir):
+            return []
+        return sorted(
+            (
+                {
+                    'name': name,
+                    'size': os.path.getsize(os.path.join(self.profile_dir, name)),
+                    'modified': os.path.getmtime(os.path.join(self.profile_dir, name)),
+                }
+                for name in os.listdir(self.profile_dir)
+            ),
+            key=lambda entry: entry['modified'],
+            reverse=True
+        )
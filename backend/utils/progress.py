@@ -0,0 +1,36 @@
+import json
+import queue
+
+_CLOSED = object()
+
+def format_sse(event, data):
+    """One server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+class ProgressStream:
+    def __init__(self, keepalive_seconds=15):
+        """Queue of pipeline progress events, consumed as a server-sent event stream
+
+        The pipeline (producer) calls emit() from a worker thread; the response
+        generator iterates events(). Long silent stages such as diffusion are
+        bridged with SSE comments so proxies do not drop the connection.
+        """
+        self.keepalive_seconds = keepalive_seconds
+        self._queue = queue.Queue()
+
+    def emit(self, event, **data):
+        self._queue.put((event, data))
+
+    def close(self):
+        self._queue.put(_CLOSED)
+
+    def events(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.keepalive_seconds)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            if item is _CLOSED:
+                return
+            yield format_sse(*item)
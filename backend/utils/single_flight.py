@@ -0,0 +1,65 @@
+import hashlib
+import json
+import re
+import threading
+
+def normalize_key(*parts):
+    """Stable key for request parts; strings are case- and whitespace-normalized"""
+    def normalize(value):
+        if isinstance(value, str):
+            return re.sub(r'\s+', ' ', value).strip().lower()
+        if isinstance(value, dict):
+            return {key: normalize(item) for key, item in value.items()}
+        return value
+    return hashlib.sha256(json.dumps([normalize(part) for part in parts], sort_keys=True).encode()).hexdigest()
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'followers')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+class SingleFlight:
+    def __init__(self):
+        """Coalesces concurrent calls with the same key into one execution"""
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """Run func once per key among concurrent callers; returns (result, shared)
+
+        The first caller runs func; callers arriving while it runs wait for and
+        receive the same result (or exception). shared is True for those followers.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
@@ -1,18 +1,189 @@
-from nltk.tokenize import sent_tokenize
+import math
+import re
 import nltk
+import numpy as np
+from config import Config
+
+_WORD = re.compile(r'[a-z0-9]+')
 
 class TextProcessor:
+    # Punkt sentence tokenizer, loaded once by initialize()
+    _tokenizer = None
+
     @staticmethod
     def initialize():
         nltk.download('punkt', quiet=True)
-    
+        TextProcessor._tokenizer = nltk.data.load('tokenizers/punkt/english.pickle')
+
+    @staticmethod
+    def _sentences(text):
+        if TextProcessor._tokenizer is None:
+            TextProcessor.initialize()
+        return TextProcessor._tokenizer.tokenize(text)
+
     @staticmethod
     def summarize_long_content(text, max_sentences=3):
-        """Summarize long content using NLTK"""
+        """Summarize long content to its most central sentences, in original order"""
         try:
-            sentences = sent_tokenize(text)
+            sentences = TextProcessor._sentences(text)
             if len(sentences) <= max_sentences:
                 return text
-            return ' '.join(sentences[:max_sentences])
+            scores = TextProcessor._centrality(sentences, np.zeros(len(sentences), dtype=int))
+            keep = np.sort(np.argsort(-scores, kind='stable')[:max_sentences])
+            return ' '.join(sentences[index] for index in keep)
         except Exception:
-            return text
\ No newline at end of file
+            return text
+
+    @staticmethod
+    def slide_budget(has_diagram):
+        """(characters per line, lines) that fit the body placeholder at the body font size"""
+        width, height = Config.SLIDE_BODY_SIZE_WITH_DIAGRAM if has_diagram else Config.SLIDE_BODY_SIZE
+        font_size = Config.SLIDE_BODY_FONT_SIZE
+        # Average glyph width is about half the font size; lines use 150% spacing
+        return int(width / (font_size * 0.5)), int(height / (font_size * 1.5))
+
+    @staticmethod
+    def _centrality(units, groups):
+        """TF-IDF centrality of each text unit among the units of its group, for all groups at once"""
+        tokens = [_WORD.findall(unit.lower()) for unit in units]
+        vocabulary = {word: index for index, word in enumerate(sorted({word for words in tokens for word in words}))}
+        if not vocabulary:
+            return np.zeros(len(units))
+
+        counts = np.zeros((len(units), len(vocabulary)))
+        for row, words in enumerate(tokens):
+            for word in words:
+                counts[row, vocabulary[word]] += 1
+
+        idf = np.log((1 + len(units)) / (1 + np.count_nonzero(counts, axis=0))) + 1
+        tfidf = counts * idf
+        norms = np.linalg.norm(tfidf, axis=1, keepdims=True)
+        tfidf = np.divide(tfidf, norms, out=np.zeros_like(tfidf), where=norms > 0)
+
+        # Cosine similarity to the other units of the same group
+        same_group = groups[:, None] == groups[None, :]
+        np.fill_diagonal(same_group, False)
+        similarity = (tfidf @ tfidf.T) * same_group
+        peers = same_group.sum(axis=1)
+        return np.divide(similarity.sum(axis=1), peers, out=np.ones(len(units)), where=peers > 0)
+
+    @staticmethod
+    def _units(slide):
+        """Removable text units of a slide: (block index, kind, position, text)
+
+        Paragraph sentences, bullets, sub-bullets and stats can be dropped; the
+        first unit of each block is kept so no block disappears entirely.
+        """
+        units = []
+        for block_index, block in enumerate(slide['content']):
+            if block['type'] == 'paragraph':
+                for position, sentence in enumerate(TextProcessor._sentences(block['text'])):
+                    units.append((block_index, 'sentence', position, sentence))
+            elif block['type'] == 'bullets':
+                for position, item in enumerate(block['items']):
+                    text = item['text'] if isinstance(item, dict) else item
+                    units.append((block_index, 'item', position, text))
+                    for sub_position, subitem in enumerate(item.get('subitems', []) if isinstance(item, dict) else []):
+                        units.append((block_index, 'subitem', (position, sub_position), subitem))
+            elif block['type'] == 'stats':
+                for position, item in enumerate(block['items']):
+                    units.append((block_index, 'item', position, item))
+        return units
+
+    @staticmethod
+    def _line_count(blocks, chars_per_line):
+        """Rendered body lines, following PresentationRenderer._format_content"""
+        def lines(text, indent=0):
+            return max(1, math.ceil((len(text) + indent) / chars_per_line))
+
+        # Wrapped line count per text line; None for the blank lines between blocks
+        rendered = []
+        for block in blocks:
+            if block['type'] == 'paragraph':
+                rendered += [lines(block['text']), None]
+            elif block['type'] == 'bullets':
+                for item in block['items']:
+                    if isinstance(item, dict):
+                        rendered.append(lines(item['text'], 2))
+                        rendered += [lines(subitem, 6) for subitem in item.get('subitems', [])]
+                    else:
+                        rendered.append(lines(item, 2))
+                rendered.append(None)
+            elif block['type'] == 'stats':
+                rendered += [1] + [lines(item, 2) for item in block['items']] + [None]
+            elif block['type'] == 'conclusion':
+                rendered += [None, lines(block['text'])]
+
+        # The rendered text is stripped, dropping blank lines at either end
+        while rendered and rendered[-1] is None:
+            rendered.pop()
+        while rendered and rendered[0] is None:
+            rendered.pop(0)
+        return sum(count or 1 for count in rendered)
+
+    @staticmethod
+    def _rebuild(slide, units, removed):
+        """Slide content without the removed units"""
+        dropped = {(block_index, kind, position) for block_index, kind, position, _ in (units[index] for index in removed)}
+        blocks = []
+        for block_index, block in enumerate(slide['content']):
+            block = dict(block)
+            if block['type'] == 'paragraph':
+                block['text'] = ' '.join(
+                    text for unit_block, kind, position, text in units
+                    if unit_block == block_index and (unit_block, kind, position) not in dropped
+                )
+            elif block['type'] in ('bullets', 'stats'):
+                items = []
+                for position, item in enumerate(block['items']):
+                    if (block_index, 'item', position) in dropped:
+                        continue
+                    if isinstance(item, dict):
+                        item = dict(item, subitems=[
+                            subitem for sub_position, subitem in enumerate(item.get('subitems', []))
+                            if (block_index, 'subitem', (position, sub_position)) not in dropped
+                        ])
+                    items.append(item)
+                block['items'] = items
+            blocks.append(block)
+        return blocks
+
+    @staticmethod
+    def fit_deck(content):
+        """Shorten over-long slides in place to fit their body placeholder; returns the fitted slide indices
+
+        Every unit of every overflowing slide is scored in one vectorized
+        TF-IDF pass; each slide then drops its least central units until its
+        estimated line count fits the budget for its layout.
+        """
+        overflowing = []
+        for index, slide in enumerate(content['slides']):
+            chars_per_line, max_lines = TextProcessor.slide_budget(bool(slide.get('diagram_prompt')))
+            if TextProcessor._line_count(slide['content'], chars_per_line) > max_lines:
+                overflowing.append((index, chars_per_line, max_lines, TextProcessor._units(slide)))
+        if not overflowing:
+            return []
+
+        all_units = [unit[3] for *_, units in overflowing for unit in units]
+        groups = np.concatenate([np.full(len(units), index) for index, *_, units in overflowing])
+        scores = TextProcessor._centrality(all_units, groups)
+
+        offset = 0
+        for index, chars_per_line, max_lines, units in overflowing:
+            slide = content['slides'][index]
+            slide_scores = scores[offset:offset + len(units)]
+            offset += len(units)
+
+            # First unit of each block is protected
+            protected = {next(i for i, unit in enumerate(units) if unit[0] == block) for block in {unit[0] for unit in units}}
+            removed = []
+            for candidate in np.argsort(slide_scores, kind='stable'):
+                if candidate in protected:
+                    continue
+                removed.append(int(candidate))
+                blocks = TextProcessor._rebuild(slide, units, removed)
+                if TextProcessor._line_count(blocks, chars_per_line) <= max_lines:
+                    break
+            slide['content'] = TextProcessor._rebuild(slide, units, removed)
+
+        return [index for index, *_ in overflowing]
@@ -0,0 +1,131 @@
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = 'slidesai-backend'
+REQUEST_ID_ATTRIBUTE = 'http.request_id'
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+_exporter = None
+_exporter_lock = threading.Lock()
+
+def _get_exporter():
+    """Logger writing one JSON span per line to a rotating trace file"""
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            os.makedirs(os.path.dirname(os.path.abspath(Config.TRACE_FILE)), exist_ok=True)
+            handler = RotatingFileHandler(
+                Config.TRACE_FILE,
+                maxBytes=Config.TRACE_MAX_BYTES,
+                backupCount=Config.TRACE_BACKUP_COUNT
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            _exporter = logging.getLogger('slidesai.traces')
+            _exporter.setLevel(logging.INFO)
+            _exporter.propagate = False
+            _exporter.addHandler(handler)
+        return _exporter
+
+class Span:
+    __slots__ = ('trace_id', 'span_id', 'parent_span_id', 'name', 'kind', 'start_ns', 'end_ns',
+                 'attributes', 'status_code', 'status_message')
+
+    def __init__(self, name, trace_id, parent_span_id=None, kind='INTERNAL', attributes=None):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.status_code = 'UNSET'
+        self.status_message = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_error(self, error):
+        self.status_code = 'ERROR'
+        self.status_message = str(error)
+
+    def end(self):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if self.status_code == 'UNSET':
+            self.status_code = 'OK'
+        _get_exporter().info(json.dumps(self.to_dict(), default=str))
+
+    def to_dict(self):
+        """OpenTelemetry-compatible span (OTLP JSON field names)"""
+        return {
+            'resource': {'service.name': SERVICE_NAME},
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'parentSpanId': self.parent_span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': self.start_ns,
+            'endTimeUnixNano': self.end_ns,
+            'attributes': self.attributes,
+            'status': {'code': self.status_code, 'message': self.status_message},
+        }
+
+def current_span():
+    return _current_span.get()
+
+def start_trace(name, request_id, attributes=None, sample_rate=None):
+    """Start a root span for a request; returns (span, token) or (None, None) if not sampled"""
+    sample_rate = Config.TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+    if sample_rate <= 0 or random.random() >= sample_rate:
+        return None, None
+
+    root = Span(name, uuid.uuid4().hex, kind='SERVER', attributes=attributes)
+    root.set_attribute(REQUEST_ID_ATTRIBUTE, request_id)
+    return root, _current_span.set(root)
+
+def end_trace(root, token, error=None):
+    """End a root span; token (from start_trace) is None when the trace was already detached"""
+    if root is None:
+        return
+    if error is not None:
+        root.set_error(error)
+    root.end()
+    if token is not None:
+        _current_span.reset(token)
+
+def detach_trace(token):
+    """Stop the root span from being current without ending it (a streamed response ends it later)"""
+    if token is not None:
+        _current_span.reset(token)
+
+@contextmanager
+def span(name, **attributes):
+    """Child span of the current span; a no-op when the request is not sampled"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, parent.trace_id, parent_span_id=parent.span_id, attributes=attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.set_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        child.end()
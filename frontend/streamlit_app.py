@@ -1,15 +1,18 @@
 import streamlit as st
 import streamlit.components.v1 as components
-import requests
-import json
-import time
 from config import Config
+from utils.api_client import get_client
 from utils.ui_helpers import UIHelper
 from utils.theme_previews import ThemePreviewer
 
 class PresentationApp:
+    # Read timeout (s) for a streamed generation; the backend is asked to finish MARGIN seconds sooner
+    READ_TIMEOUT = 600
+    DEADLINE_MARGIN = 15
+
     def __init__(self):
         self.api_url = 'http://127.0.0.1:5000'
+        self.api = get_client(self.api_url)
         self.setup_page()
     
     def setup_page(self):
@@ -32,16 +35,15 @@ class PresentationApp:
     
     def check_backend_health(self):
         """Check if backend service is running"""
-        try:
-            health_check = requests.get(f'{self.api_url}/health')
-            if health_check.status_code != 200:
-                st.sidebar.error("❌ Backend service is not responding properly")
-                return False
-            return True
-        except:
+        health = self.api.health()
+        if health == 'unhealthy':
+            st.sidebar.error("❌ Backend service is not responding properly")
+            return False
+        if health == 'down':
             st.sidebar.error("❌ Backend service is not running")
             st.error("Please ensure the Flask backend is running (python app.py)")
             return False
+        return True
     
     def embed_presentation(self, presentation_id):
         """Embed Google Slides presentation"""
@@ -58,104 +60,93 @@ class PresentationApp:
         """
         components.html(embed_html, height=370)
     
+    def display_slide_previews(self, previews):
+        """Display locally rendered slide thumbnails"""
+        rows = -(-len(previews) // 3)
+        components.html(UIHelper.slide_preview_grid(previews), height=rows * 150)
+    
     def display_theme_previews(self):
-        """Display clickable theme previews"""
+        """Display theme previews with selection buttons"""
         st.subheader("Select a Theme")
         
-        # Create columns for theme previews
-        cols = st.columns(3)
+        # All previews render as one memoized component instead of one iframe per theme
+        rows = -(-len(Config.PRESENTATION_THEMES) // 3)
+        components.html(
+            ThemePreviewer.theme_grid(self.api.theme_previews(), st.session_state.selected_theme),
+            height=rows * 175
+        )
         
+        cols = st.columns(3)
         for idx, (theme_id, theme) in enumerate(Config.PRESENTATION_THEMES.items()):
             with cols[idx % 3]:
-                # Create container for preview and selection indicator
-                preview_container = st.container()
-                
-                # Generate theme preview
-                preview_html = ThemePreviewer.generate_theme_preview(theme)
-                
-                # Add click handler using HTML
-                clickable_preview = f"""
-                <div onclick="parent.postMessage({{theme: '{theme_id}'}}, '*')" style="cursor: pointer; position: relative;">
-                    {preview_html}
-                    <div style="position: absolute; top: 5px; right: 5px; padding: 5px; background: {'#4CAF50' if st.session_state.selected_theme == theme_id else 'transparent'}; border-radius: 50%;">
-                        {'✓' if st.session_state.selected_theme == theme_id else ''}
-                    </div>
-                </div>
-                """
-                
-                # Display clickable preview
-                components.html(clickable_preview, height=150)
-                st.caption(theme['name'])
-                
-                # Handle click events
-                if preview_container.button("Select", key=f"theme_{theme_id}", use_container_width=True):
+                if st.button(f"Select {theme['name']}", key=f"theme_{theme_id}", use_container_width=True):
                     st.session_state.selected_theme = theme_id
                     st.rerun()
     
     def generate_presentation(self, topic, description=""):
-        """Generate presentation with dynamic layout"""
+        """Generate presentation, following the backend's progress events"""
         if not st.session_state.selected_theme:
             st.error("⚠️ Please select a theme first")
             return None
-            
-        steps = [
-            ("🔄 Initializing...", 10),
-            ("🤖 Connecting to AI service...", 20),
-            ("📝 Generating content...", 40),
-            ("🎨 Creating diagrams...", 60),
-            ("📊 Building presentation...", 80),
-            ("✅ Finalizing...", 90),
-        ]
         
         status_text = st.empty()
         progress_bar = st.progress(0)
+        preview_area = st.empty()
         
         try:
-            headers = {'Content-Type': 'application/json'}
             payload = {
                 'topic': topic,
                 'description': description,
-                'theme': st.session_state.selected_theme
+                'theme': st.session_state.selected_theme,
+                'timeout_ms': (self.READ_TIMEOUT - self.DEADLINE_MARGIN) * 1000
             }
             
-            # Use a separate thread for the request to allow progress updates
-            import threading
-
-            def make_request():
-                nonlocal response
-                response = requests.post(
-                    f'{self.api_url}/create_presentation',
-                    headers=headers,
-                    data=json.dumps(payload),
-                    timeout=10000
-                )
-
-            response = None
-            request_thread = threading.Thread(target=make_request)
-            request_thread.start()
-
-            # Update progress bar while the request is being made
-            for message, progress in steps:
-                if request_thread.is_alive():
-                    status_text.write(message)
-                    progress_bar.progress(progress)
-                    time.sleep(10)
-                else:
-                    break
-
-            request_thread.join()
-
-            if response is None or response.status_code != 200:
-                error_message = response.json().get('error', 'Unknown error occurred') if response else 'No response from server'
-                st.error(f"Server Error: {error_message}")
+            status_text.write("🔄 Initializing...")
+            response = self.api.post(
+                '/create_presentation/stream', payload, stream=True, timeout=(10, self.READ_TIMEOUT)
+            )
+            
+            if response.status_code != 200:
+                st.error(f"Server Error: {response.json().get('error', 'Unknown error occurred')}")
                 return None
             
-            result = response.json()
+            result = None
+            with response:
+                for event, data in self.api.stream_events(response):
+                    if event == 'started':
+                        status_text.write("🤖 Generating content...")
+                        progress_bar.progress(5)
+                    elif event == 'content_generated':
+                        status_text.write(f"📝 Content ready: {data['slides']} slides")
+                        progress_bar.progress(30)
+                    elif event == 'previews':
+                        # Review the slides while the Google Slides deck is still being built
+                        st.session_state.slide_previews = data['previews']
+                        with preview_area.container():
+                            self.display_slide_previews(data['previews'])
+                    elif event == 'presentation_created':
+                        status_text.write("📊 Building presentation...")
+                        progress_bar.progress(35)
+                    elif event == 'slide_created':
+                        status_text.write(f"📊 Created slide {data['completed']} of {data['total']}")
+                        progress_bar.progress(35 + int(60 * data['completed'] / data['total']))
+                    elif event in ('diagram_done', 'diagram_failed', 'diagram_skipped'):
+                        status_text.write(f"🎨 Diagram {data['completed']} of {data['total']} done")
+                    elif event == 'diagrams_queued':
+                        status_text.write(f"🎨 {data['count']} diagram(s) will be added in the background")
+                    elif event == 'error':
+                        st.error(f"Server Error: {data.get('error', 'Unknown error occurred')}")
+                        return None
+                    elif event == 'complete':
+                        result = data
+            
+            if result is None:
+                st.error("Server Error: No response from server")
+                return None
 
             # Show completion
             status_text.write("✨ Presentation ready!")
             progress_bar.progress(100)
-            time.sleep(0.5)
 
             # Update session state and trigger rerun
             st.session_state.presentation_ready = True
@@ -170,6 +161,7 @@ class PresentationApp:
         finally:
             status_text.empty()
             progress_bar.empty()
+            preview_area.empty()
         return None
     
     def run(self):
@@ -214,6 +206,10 @@ class PresentationApp:
                     self.embed_presentation(st.session_state.presentation_id)
                     st.success("✅ Presentation created successfully!")
                     st.markdown(f"🔗 [Edit Presentation]({st.session_state.presentation_url})")
+                    
+                    if st.session_state.get('slide_previews'):
+                        with st.expander("🖼️ Slide previews"):
+                            self.display_slide_previews(st.session_state.slide_previews)
         
         else:
             # Use centered layout for initial form
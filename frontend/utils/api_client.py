@@ -0,0 +1,72 @@
+import functools
+import json
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+class ApiClient:
+    def __init__(self, base_url, health_ttl=5.0, pool_size=10):
+        """Backend client sharing one keep-alive connection pool across Streamlit reruns"""
+        self.base_url = base_url.rstrip('/')
+        self.health_ttl = health_ttl
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._health = None
+        self._health_checked = 0.0
+        self._health_lock = threading.Lock()
+
+    def health(self):
+        """'healthy', 'unhealthy' (responding with an error) or 'down', cached for health_ttl seconds"""
+        with self._health_lock:
+            if self._health is not None and time.monotonic() - self._health_checked < self.health_ttl:
+                return self._health
+            try:
+                response = self.session.get(f'{self.base_url}/health', timeout=2)
+                self._health = 'healthy' if response.status_code == 200 else 'unhealthy'
+            except requests.RequestException:
+                self._health = 'down'
+            self._health_checked = time.monotonic()
+            return self._health
+
+    def get(self, path, **kwargs):
+        return self.session.get(f'{self.base_url}{path}', **kwargs)
+
+    @functools.lru_cache(maxsize=None)
+    def theme_previews(self):
+        """Theme samples as (theme_id, SVG) pairs; they only change with the backend's configuration"""
+        response = self.get('/themes/previews', timeout=10)
+        response.raise_for_status()
+        return tuple(response.json()['previews'].items())
+
+    def post(self, path, payload, **kwargs):
+        return self.session.post(
+            f'{self.base_url}{path}',
+            headers={'Content-Type': 'application/json'},
+            data=json.dumps(payload),
+            **kwargs
+        )
+
+    def stream_events(self, response):
+        """Parse a server-sent event stream into (event, data) pairs"""
+        event, data_lines = 'message', []
+        for line in response.iter_lines(decode_unicode=True):
+            if line is None:
+                continue
+            if line == '':
+                if data_lines:
+                    yield event, json.loads('\n'.join(data_lines))
+                event, data_lines = 'message', []
+            elif line.startswith(':'):
+                continue  # keep-alive comment
+            elif line.startswith('event:'):
+                event = line[len('event:'):].strip()
+            elif line.startswith('data:'):
+                data_lines.append(line[len('data:'):].strip())
+
+@functools.lru_cache(maxsize=None)
+def get_client(base_url):
+    """One client per backend URL for the whole Streamlit process"""
+    return ApiClient(base_url)
@@ -1,49 +1,32 @@
+import functools
+from config import Config
+
 class ThemePreviewer:
+    """Theme picker grid around the theme samples rendered by the backend (GET /themes/previews)"""
+
     @staticmethod
-    def generate_theme_preview(theme):
-        """Generate SVG preview for a theme"""
-        def rgb_dict_to_string(rgb_dict):
-            r = int(rgb_dict['red'] * 255)
-            g = int(rgb_dict['green'] * 255)
-            b = int(rgb_dict['blue'] * 255)
-            return f"rgb({r},{g},{b})"
-        
-        background = rgb_dict_to_string(theme['background_color'])
-        primary = rgb_dict_to_string(theme['primary_color'])
-        secondary = rgb_dict_to_string(theme.get('secondary_color', theme['primary_color']))
-        accent = rgb_dict_to_string(theme.get('accent_color', theme['primary_color']))
-        
-        gradient = ""
-        if 'gradient_color' in theme:
-            gradient_color = rgb_dict_to_string(theme['gradient_color'])
-            gradient = f"""
-                <defs>
-                    <linearGradient id="grad" x1="0%" y1="0%" x2="100%" y2="100%">
-                        <stop offset="0%" style="stop-color:{background};stop-opacity:1" />
-                        <stop offset="100%" style="stop-color:{gradient_color};stop-opacity:1" />
-                    </linearGradient>
-                </defs>
-                <rect width="200" height="150" fill="url(#grad)" />
-            """
-        else:
-            gradient = f'<rect width="200" height="150" fill="{background}" />'
-        
+    @functools.lru_cache(maxsize=None)
+    def theme_grid(previews, selected_theme=None, columns=3):
+        """All theme previews as one HTML grid, memoized per selected theme
+
+        previews is a tuple of (theme_id, SVG) pairs so it can be memoized.
+        """
+        cells = []
+        for theme_id, svg in previews:
+            theme = Config.PRESENTATION_THEMES[theme_id]
+            selected = theme_id == selected_theme
+            cells.append(f"""
+            <div style="position: relative; border: 3px solid {'#4CAF50' if selected else 'transparent'}; border-radius: 6px;">
+                {svg}
+                <div style="position: absolute; top: 5px; right: 5px; padding: 2px 7px; background: {'#4CAF50' if selected else 'transparent'}; color: white; border-radius: 50%;">
+                    {'✓' if selected else ''}
+                </div>
+                <div style="text-align: center; font-family: sans-serif; font-size: 13px; color: #555;">{theme['name']}</div>
+            </div>
+            """)
+
         return f"""
-        <svg viewBox="0 0 200 150" xmlns="http://www.w3.org/2000/svg">
-            {gradient}
-            
-            <!-- Title bar -->
-            <rect x="20" y="20" width="160" height="30" fill="{primary}" opacity="0.9" />
-            
-            <!-- Content blocks -->
-            <rect x="20" y="60" width="70" height="70" fill="{secondary}" opacity="0.7" />
-            <rect x="100" y="60" width="80" height="70" fill="{accent}" opacity="0.7" />
-            
-            <!-- Text lines representation -->
-            <rect x="30" y="25" width="80" height="4" fill="white" opacity="0.9" />
-            <rect x="30" y="70" width="50" height="2" fill="white" opacity="0.8" />
-            <rect x="30" y="80" width="40" height="2" fill="white" opacity="0.8" />
-            <rect x="110" y="70" width="60" height="2" fill="white" opacity="0.8" />
-            <rect x="110" y="80" width="50" height="2" fill="white" opacity="0.8" />
-        </svg>
-        """
\ No newline at end of file
+        <div style="display: grid; grid-template-columns: repeat({columns}, 1fr); gap: 12px;">
+            {''.join(cells)}
+        </div>
+        """
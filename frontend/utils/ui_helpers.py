@@ -15,4 +15,17 @@ class UIHelper:
         with st.expander("📊 Presentation Details"):
             st.write(f"Presentation ID: {result['presentation_id']}")
             st.write(f"Direct link: {result['presentation_url']}")
-            st.write("You can now open the presentation in Google Slides")
\ No newline at end of file
+            st.write("You can now open the presentation in Google Slides")
+    
+    @staticmethod
+    def slide_preview_grid(previews, columns=3):
+        """Slide thumbnails (SVG markup from the backend) as one HTML grid"""
+        cells = ''.join(
+            f'<div style="border: 1px solid #ddd; border-radius: 4px; overflow: hidden;">{svg}</div>'
+            for svg in previews
+        )
+        return f"""
+        <div style="display: grid; grid-template-columns: repeat({columns}, 1fr); gap: 8px;">
+            {cells}
+        </div>
+        """
@@ -0,0 +1,467 @@
+"""Reusable training pipeline for the SlidesAI diagram model.
+
+Extracted from slidesai-diagram-generator.ipynb. Training is split in two stages:
+
+1. preprocess: decode every AI2D image once, run the VAE encoder and the tokenizer,
+   and store the VAE latent distribution and the token IDs as memory-mapped .npy arrays.
+2. train: stream those arrays with several loader workers. Epochs skip image
+   decoding and VAE work entirely; only the text encoder and UNet run per step.
+   With --lora-rank only low-rank adapters on the UNet attention layers are
+   trained and saved (a few MB), for DiagramService to attach per request.
+
+Usage:
+    python diagram_training.py preprocess --output-dir ./ai2d-latents
+    python diagram_training.py train --data-dir ./ai2d-latents --output-dir ./sd-ai2d-model
+    python diagram_training.py train --data-dir ./ai2d-latents --lora-rank 8 \
+        --learning-rate 1e-4 --output-dir ../backend/models/adapters/ai2d
+"""
+import argparse
+import io
+import json
+import os
+import numpy as np
+import torch
+from torch.utils.data import Dataset, DataLoader
+from torchvision import transforms
+from datasets import load_dataset
+from PIL import Image
+from diffusers import (
+    StableDiffusionPipeline,
+    UNet2DConditionModel,
+    DDPMScheduler,
+    AutoencoderKL,
+)
+from transformers import CLIPTextModel, CLIPTokenizer
+from accelerate import Accelerator
+from tqdm.auto import tqdm
+
+try:
+    from peft import LoraConfig
+    from peft.utils import get_peft_model_state_dict
+    from diffusers.utils import convert_state_dict_to_diffusers
+except ImportError:
+    LoraConfig = None
+
+os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True")
+
+LATENTS_FILE = "latent_moments.npy"
+INPUT_IDS_FILE = "input_ids.npy"
+METADATA_FILE = "metadata.json"
+
+def build_description(item):
+    """Caption for an AI2D item, built from its question and answer options"""
+    question = item.get('question', '')
+    options = item.get('options', [])
+
+    description = f"A diagram that answers the question: {question}"
+    if isinstance(options, list) and len(options) > 0:
+        description += " Options: " + ", ".join([f"({opt})" for opt in options if opt])
+    return description
+
+class AI2DDataset(Dataset):
+    """Raw AI2D samples: decoded, transformed image plus tokenized caption"""
+
+    def __init__(self, hf_dataset, tokenizer, image_size=224):
+        self.dataset = hf_dataset
+        self.tokenizer = tokenizer
+        self.image_transforms = transforms.Compose([
+            transforms.Resize(image_size),
+            transforms.CenterCrop(image_size),
+            transforms.ToTensor(),
+            transforms.Normalize([0.5], [0.5])
+        ])
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, idx):
+        item = self.dataset[idx]
+
+        # Process image
+        image = item['image']
+        if not isinstance(image, Image.Image):
+            image = Image.open(io.BytesIO(image['bytes'])) if isinstance(image, dict) else image
+        image = self.image_transforms(image.convert("RGB"))
+
+        # Tokenize text
+        encoded_text = self.tokenizer(
+            build_description(item),
+            padding="max_length",
+            max_length=self.tokenizer.model_max_length,
+            truncation=True,
+            return_tensors="pt"
+        )
+
+        return {
+            "image": image.to(torch.float32),
+            "input_ids": encoded_text.input_ids[0],
+        }
+
+class PrecomputedLatentDataset(Dataset):
+    """Streams VAE latent moments and token IDs from the memory-mapped preprocessing output"""
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        with open(os.path.join(data_dir, METADATA_FILE)) as f:
+            self.metadata = json.load(f)
+        # Opened lazily so each loader worker maps the files itself instead of pickling arrays
+        self._latents = None
+        self._input_ids = None
+
+    def __len__(self):
+        return self.metadata['count']
+
+    def __getitem__(self, idx):
+        if self._latents is None:
+            self._latents = np.load(os.path.join(self.data_dir, LATENTS_FILE), mmap_mode='r')
+            self._input_ids = np.load(os.path.join(self.data_dir, INPUT_IDS_FILE), mmap_mode='r')
+
+        return {
+            "latent_moments": torch.from_numpy(np.array(self._latents[idx], dtype=np.float32)),
+            "input_ids": torch.from_numpy(np.array(self._input_ids[idx], dtype=np.int64)),
+        }
+
+def _load_ai2d(split="test"):
+    dataset = load_dataset("lmms-lab/ai2d")
+    if isinstance(dataset, dict):
+        dataset = dataset[split]
+    return dataset
+
+@torch.no_grad()
+def preprocess_dataset(
+    output_dir,
+    pretrained_model_name="runwayml/stable-diffusion-v1-5",
+    image_size=224,
+    batch_size=16,
+    num_workers=4,
+    split="test",
+):
+    """Encode the whole dataset once into memory-mapped latent and token-ID arrays
+
+    The VAE's latent distribution parameters (mean and log-variance) are stored
+    rather than a single sample, so training still draws a fresh latent sample
+    every epoch.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    print("Loading AI2D dataset...")
+    dataset = _load_ai2d(split)
+
+    tokenizer = CLIPTokenizer.from_pretrained(pretrained_model_name, subfolder="tokenizer")
+    vae = AutoencoderKL.from_pretrained(
+        pretrained_model_name,
+        subfolder="vae",
+        low_cpu_mem_usage=True
+    ).to(device, dtype=torch.float32).eval()
+
+    loader = DataLoader(
+        AI2DDataset(dataset, tokenizer, image_size=image_size),
+        batch_size=batch_size,
+        shuffle=False,
+        num_workers=num_workers,
+        pin_memory=device == "cuda"
+    )
+
+    latent_size = image_size // (2 ** (len(vae.config.block_out_channels) - 1))
+    count = len(dataset)
+    latents = np.lib.format.open_memmap(
+        os.path.join(output_dir, LATENTS_FILE),
+        mode='w+',
+        dtype=np.float16,
+        shape=(count, 2 * vae.config.latent_channels, latent_size, latent_size)
+    )
+    input_ids = np.lib.format.open_memmap(
+        os.path.join(output_dir, INPUT_IDS_FILE),
+        mode='w+',
+        dtype=np.int32,
+        shape=(count, tokenizer.model_max_length)
+    )
+
+    offset = 0
+    for batch in tqdm(loader, desc="Encoding"):
+        moments = vae.encode(batch["image"].to(device)).latent_dist.parameters
+        size = moments.shape[0]
+        latents[offset:offset + size] = moments.cpu().numpy().astype(np.float16)
+        input_ids[offset:offset + size] = batch["input_ids"].numpy().astype(np.int32)
+        offset += size
+
+    latents.flush()
+    input_ids.flush()
+
+    metadata = {
+        'count': count,
+        'image_size': image_size,
+        'latent_shape': list(latents.shape[1:]),
+        'scaling_factor': vae.config.scaling_factor,
+        'pretrained_model_name': pretrained_model_name,
+        'split': split,
+    }
+    with open(os.path.join(output_dir, METADATA_FILE), 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    print(f"Preprocessed {count} samples into {output_dir}")
+    return metadata
+
+def sample_latents(latent_moments, scaling_factor):
+    """Draw a latent sample from stored VAE moments (same clamping as DiagonalGaussianDistribution)"""
+    mean, logvar = torch.chunk(latent_moments, 2, dim=1)
+    std = torch.exp(0.5 * torch.clamp(logvar, -30.0, 20.0))
+    return (mean + std * torch.randn_like(mean)) * scaling_factor
+
+def _save_pipeline(pretrained_model_name, unet, text_encoder, tokenizer, noise_scheduler, output_dir):
+    # The VAE is not needed during training, so it is only loaded to assemble the pipeline
+    vae = AutoencoderKL.from_pretrained(pretrained_model_name, subfolder="vae")
+    pipeline = StableDiffusionPipeline(
+        text_encoder=text_encoder,
+        vae=vae,
+        unet=unet,
+        tokenizer=tokenizer,
+        scheduler=noise_scheduler,
+        safety_checker=None,
+        feature_extractor=None,
+        requires_safety_checker=False,
+    )
+    pipeline.save_pretrained(output_dir)
+
+def _save_lora(unet, output_dir):
+    unet_lora_layers = convert_state_dict_to_diffusers(get_peft_model_state_dict(unet))
+    StableDiffusionPipeline.save_lora_weights(
+        save_directory=output_dir,
+        unet_lora_layers=unet_lora_layers,
+        safe_serialization=True,
+    )
+
+def _save(pretrained_model_name, unet, text_encoder, tokenizer, noise_scheduler, output_dir, lora):
+    if lora:
+        _save_lora(unet, output_dir)
+    else:
+        _save_pipeline(pretrained_model_name, unet, text_encoder, tokenizer, noise_scheduler, output_dir)
+
+def train(
+    data_dir,
+    output_dir="./sd-ai2d-model",
+    num_epochs=1,
+    batch_size=8,
+    gradient_accumulation_steps=1,
+    learning_rate=1e-5,
+    mixed_precision="no",
+    save_steps=1000,
+    max_grad_norm=1.0,
+    num_workers=4,
+    lora_rank=None,
+    lora_alpha=None,
+):
+    """Fine-tune the UNet on precomputed latents (see preprocess_dataset)
+
+    With lora_rank the base UNet is frozen and only LoRA adapters on its
+    attention projections are trained; output_dir then receives a small
+    pytorch_lora_weights.safetensors instead of a full pipeline.
+    """
+    lora = bool(lora_rank)
+    if lora and LoraConfig is None:
+        raise ImportError("LoRA training requires the 'peft' package")
+
+    accelerator = Accelerator(
+        gradient_accumulation_steps=gradient_accumulation_steps,
+        mixed_precision=mixed_precision
+    )
+
+    train_dataset = PrecomputedLatentDataset(data_dir)
+    metadata = train_dataset.metadata
+    pretrained_model_name = metadata['pretrained_model_name']
+    scaling_factor = metadata['scaling_factor']
+
+    # Load components
+    print("Loading model components...")
+    tokenizer = CLIPTokenizer.from_pretrained(pretrained_model_name, subfolder="tokenizer")
+    text_encoder = CLIPTextModel.from_pretrained(
+        pretrained_model_name,
+        subfolder="text_encoder",
+        low_cpu_mem_usage=True
+    ).to(torch.float32)
+    unet = UNet2DConditionModel.from_pretrained(
+        pretrained_model_name,
+        subfolder="unet",
+        low_cpu_mem_usage=True
+    ).to(torch.float32)
+    noise_scheduler = DDPMScheduler.from_pretrained(pretrained_model_name, subfolder="scheduler")
+
+    if lora:
+        unet.requires_grad_(False)
+        unet.add_adapter(LoraConfig(
+            r=lora_rank,
+            lora_alpha=lora_alpha or lora_rank,
+            init_lora_weights="gaussian",
+            target_modules=["to_k", "to_q", "to_v", "to_out.0"],
+        ))
+    trainable_params = [param for param in unet.parameters() if param.requires_grad]
+
+    train_dataloader = DataLoader(
+        train_dataset,
+        batch_size=batch_size,
+        shuffle=True,
+        num_workers=num_workers,
+        pin_memory=True,
+        persistent_workers=num_workers > 0,
+        drop_last=True,
+    )
+
+    optimizer = torch.optim.AdamW(
+        trainable_params,
+        lr=learning_rate,
+        betas=(0.9, 0.999),
+        eps=1e-8,
+        foreach=True,
+    )
+
+    unet, optimizer, train_dataloader = accelerator.prepare(unet, optimizer, train_dataloader)
+    text_encoder = text_encoder.to(accelerator.device).eval()
+    text_encoder.requires_grad_(False)
+
+    global_step = 0
+    for epoch in range(num_epochs):
+        unet.train()
+        progress_bar = tqdm(total=len(train_dataloader), desc=f"Epoch {epoch}", disable=not accelerator.is_main_process)
+
+        for step, batch in enumerate(train_dataloader):
+            with accelerator.accumulate(unet):
+                latents = sample_latents(batch["latent_moments"], scaling_factor)
+
+                noise = torch.randn_like(latents)
+                timesteps = torch.randint(
+                    0,
+                    noise_scheduler.config.num_train_timesteps,
+                    (latents.shape[0],),
+                    device=latents.device
+                )
+                noisy_latents = noise_scheduler.add_noise(latents, noise, timesteps)
+
+                with torch.no_grad():
+                    encoder_hidden_states = text_encoder(batch["input_ids"])[0]
+
+                noise_pred = unet(noisy_latents, timesteps, encoder_hidden_states).sample
+                loss = torch.nn.functional.mse_loss(noise_pred.float(), noise.float())
+
+                accelerator.backward(loss)
+                if accelerator.sync_gradients:
+                    accelerator.clip_grad_norm_(trainable_params, max_grad_norm)
+                optimizer.step()
+                optimizer.zero_grad(set_to_none=True)
+
+            if accelerator.sync_gradients:
+                global_step += 1
+                progress_bar.update(1)
+                progress_bar.set_postfix(loss=loss.item())
+
+                if global_step % save_steps == 0 and accelerator.is_main_process:
+                    _save(
+                        pretrained_model_name,
+                        accelerator.unwrap_model(unet),
+                        text_encoder,
+                        tokenizer,
+                        noise_scheduler,
+                        os.path.join(output_dir, f"checkpoint-{global_step}"),
+                        lora
+                    )
+
+        progress_bar.close()
+
+    accelerator.wait_for_everyone()
+    if accelerator.is_main_process:
+        print("\nSaving final LoRA adapter..." if lora else "\nSaving final model...")
+        _save(
+            pretrained_model_name,
+            accelerator.unwrap_model(unet),
+            text_encoder,
+            tokenizer,
+            noise_scheduler,
+            output_dir,
+            lora
+        )
+
+    print("Training completed!")
+
+def generate_diagrams(
+    model_path,
+    prompts,
+    output_dir="./generated_diagrams",
+    num_inference_steps=50,
+    guidance_scale=7.5,
+):
+    """Render test prompts with a trained model, saving each image next to its prompt"""
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    pipeline = StableDiffusionPipeline.from_pretrained(
+        model_path,
+        torch_dtype=torch.float16 if device == "cuda" else torch.float32,
+        safety_checker=None,
+    ).to(device)
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    for i, prompt in enumerate(prompts):
+        image = pipeline(
+            prompt,
+            num_inference_steps=num_inference_steps,
+            guidance_scale=guidance_scale,
+        ).images[0]
+
+        image.save(os.path.join(output_dir, f"diagram_{i+1}.png"))
+        with open(os.path.join(output_dir, f"diagram_{i+1}.txt"), "w") as f:
+            f.write(prompt)
+
+        print(f"Generated diagram {i+1}/{len(prompts)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="SlidesAI diagram model training")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    preprocess_parser = subparsers.add_parser("preprocess", help="Encode the dataset into latent/token arrays")
+    preprocess_parser.add_argument("--output-dir", required=True)
+    preprocess_parser.add_argument("--pretrained-model-name", default="runwayml/stable-diffusion-v1-5")
+    preprocess_parser.add_argument("--image-size", type=int, default=224)
+    preprocess_parser.add_argument("--batch-size", type=int, default=16)
+    preprocess_parser.add_argument("--num-workers", type=int, default=4)
+    preprocess_parser.add_argument("--split", default="test")
+
+    train_parser = subparsers.add_parser("train", help="Fine-tune the UNet on preprocessed data")
+    train_parser.add_argument("--data-dir", required=True)
+    train_parser.add_argument("--output-dir", default="./sd-ai2d-model")
+    train_parser.add_argument("--num-epochs", type=int, default=1)
+    train_parser.add_argument("--batch-size", type=int, default=8)
+    train_parser.add_argument("--gradient-accumulation-steps", type=int, default=1)
+    train_parser.add_argument("--learning-rate", type=float, default=1e-5)
+    train_parser.add_argument("--mixed-precision", default="no", choices=["no", "fp16", "bf16"])
+    train_parser.add_argument("--save-steps", type=int, default=1000)
+    train_parser.add_argument("--num-workers", type=int, default=4)
+    train_parser.add_argument("--lora-rank", type=int, help="Train a LoRA adapter of this rank instead of the full UNet")
+    train_parser.add_argument("--lora-alpha", type=int, help="LoRA scaling alpha (defaults to the rank)")
+
+    args = parser.parse_args()
+
+    if args.command == "preprocess":
+        preprocess_dataset(
+            args.output_dir,
+            pretrained_model_name=args.pretrained_model_name,
+            image_size=args.image_size,
+            batch_size=args.batch_size,
+            num_workers=args.num_workers,
+            split=args.split,
+        )
+    else:
+        train(
+            args.data_dir,
+            output_dir=args.output_dir,
+            num_epochs=args.num_epochs,
+            batch_size=args.batch_size,
+            gradient_accumulation_steps=args.gradient_accumulation_steps,
+            learning_rate=args.learning_rate,
+            mixed_precision=args.mixed_precision,
+            save_steps=args.save_steps,
+            num_workers=args.num_workers,
+            lora_rank=args.lora_rank,
+            lora_alpha=args.lora_alpha,
+        )
+
+if __name__ == "__main__":
+    main()